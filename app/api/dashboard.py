@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Query
+from typing import Optional
 from datetime import datetime
-from backend.database import get_connection
+from backend.database import read_connection, get_pool
+from backend.cache import response_cache
+from backend.export import export_response, date_filters
+from backend.writer import writer as violation_writer
 
 router = APIRouter()
 
@@ -9,33 +13,33 @@ router = APIRouter()
 # KPI METRICS
 # =========================================================
 @router.get("/api/metrics/overview")
+@response_cache.cached()
 def metrics():
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with read_connection() as conn:
+        cursor = conn.cursor()
 
-    total_violations = cursor.execute("""
-    SELECT COUNT(*) FROM violations
-    WHERE is_geofence = 0
-    """).fetchone()[0]
+        # Aggregates come from the rollup tables (see backend/rollups.py)
+        total_violations = cursor.execute("""
+        SELECT COALESCE(SUM(count), 0) FROM violation_rollup_daily
+        WHERE is_geofence = 0
+        """).fetchone()[0]
 
-    restricted_zones = cursor.execute("""
-    SELECT COUNT(DISTINCT zone_name)
-    FROM violations
-    WHERE is_geofence = 1
-    """).fetchone()[0]
+        restricted_zones = cursor.execute("""
+        SELECT COUNT(DISTINCT NULLIF(zone_name, ''))
+        FROM violation_rollup_daily_zone
+        WHERE is_geofence = 1
+        """).fetchone()[0]
 
-    high_risk = cursor.execute("""
-    SELECT COUNT(*) FROM violations
-    WHERE is_geofence = 1
-    """).fetchone()[0]
+        high_risk = cursor.execute("""
+        SELECT COALESCE(SUM(count), 0) FROM violation_rollup_daily
+        WHERE is_geofence = 1
+        """).fetchone()[0]
 
-    active_workers = cursor.execute("""
-    SELECT COUNT(DISTINCT worker_id)
-    FROM violations
-    """).fetchone()[0]
-
-    conn.close()
+        active_workers = cursor.execute("""
+        SELECT COUNT(DISTINCT NULLIF(worker_id, ''))
+        FROM violation_rollup_daily_worker
+        """).fetchone()[0]
 
     compliance = max(0, 100 - int(total_violations * 0.5))
 
@@ -49,70 +53,95 @@ def metrics():
 
 
 # =========================================================
-# WORKER INTELLIGENCE
+# DB WRITER / CACHE / POOL HEALTH
 # =========================================================
-@router.get("/api/workers")
-def worker_intelligence():
+@router.get("/api/metrics/writer")
+def writer_stats():
+    return violation_writer.stats()
 
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    rows = cursor.execute("""
-    SELECT
-        worker_id,
-        COUNT(*) as total,
-        MAX(timestamp) as latest
-    FROM violations
-    GROUP BY worker_id
-    ORDER BY total DESC
-    """).fetchall()
+@router.get("/api/metrics/cache")
+def cache_stats():
+    return response_cache.stats()
 
-    result = []
 
-    for r in rows:
+@router.get("/api/metrics/db")
+def db_pool_stats():
+    return get_pool().stats()
 
-        common = cursor.execute("""
-        SELECT violation_type
-        FROM violations
-        WHERE worker_id = ?
-        GROUP BY violation_type
-        ORDER BY COUNT(*) DESC
-        LIMIT 1
-        """, (r["worker_id"],)).fetchone()
 
-        result.append({
+# =========================================================
+# WORKER INTELLIGENCE
+# =========================================================
+@router.get("/api/workers")
+@response_cache.cached()
+def worker_intelligence():
+
+    with read_connection() as conn:
+        cursor = conn.cursor()
+
+        # One pass: per (worker, type) counts from the worker index, then the
+        # window picks each worker's most common type and sums the total
+        rows = cursor.execute("""
+        WITH per_type AS (
+            SELECT
+                worker_id,
+                violation_type,
+                COUNT(*) as cnt,
+                MAX(timestamp) as latest
+            FROM violations
+            GROUP BY worker_id, violation_type
+        ),
+        ranked AS (
+            SELECT
+                worker_id,
+                violation_type,
+                SUM(cnt) OVER (PARTITION BY worker_id) as total,
+                MAX(latest) OVER (PARTITION BY worker_id) as latest,
+                ROW_NUMBER() OVER (
+                    PARTITION BY worker_id
+                    ORDER BY cnt DESC, violation_type
+                ) as rn
+            FROM per_type
+        )
+        SELECT worker_id, total, latest, violation_type as most_common
+        FROM ranked
+        WHERE rn = 1
+        ORDER BY total DESC
+        """).fetchall()
+
+    return [
+        {
             "id": r["worker_id"],
             "name": r["worker_id"],
             "violations": r["total"],
-            "most_common": common[0] if common else "-",
+            # `worker_id = NULL` never matched in the per-worker lookup
+            "most_common": r["most_common"] if r["worker_id"] is not None else "-",
             "status": "ACTIVE"
-        })
-
-    conn.close()
-
-    return result
+        }
+        for r in rows
+    ]
 
 
 # =========================================================
 # TOP VIOLATORS
 # =========================================================
 @router.get("/api/workers/top-violators")
+@response_cache.cached()
 def top_violators():
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    rows = cursor.execute("""
-    SELECT
-        worker_id,
-        COUNT(*) as total
-    FROM violations
-    GROUP BY worker_id
-    ORDER BY total DESC
-    LIMIT 5
-    """).fetchall()
+    with read_connection() as conn:
+        cursor = conn.cursor()
 
-    conn.close()
+        rows = cursor.execute("""
+        SELECT
+            worker_id,
+            COUNT(*) as total
+        FROM violations
+        GROUP BY worker_id
+        ORDER BY total DESC
+        LIMIT 5
+        """).fetchall()
 
     return [
         {
@@ -127,19 +156,18 @@ def top_violators():
 # LIVE FEED
 # =========================================================
 @router.get("/api/violations/feed")
+@response_cache.cached()
 def live_feed():
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    rows = cursor.execute("""
-    SELECT *
-    FROM violations
-    ORDER BY id DESC
-    LIMIT 20
-    """).fetchall()
+    with read_connection() as conn:
+        cursor = conn.cursor()
 
-    conn.close()
+        rows = cursor.execute("""
+        SELECT *
+        FROM violations
+        ORDER BY id DESC
+        LIMIT 20
+        """).fetchall()
 
     return [
         {
@@ -158,18 +186,17 @@ def live_feed():
 # SEVERITY DISTRIBUTION
 # =========================================================
 @router.get("/api/analytics/severity")
+@response_cache.cached()
 def severity_distribution():
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with read_connection() as conn:
+        cursor = conn.cursor()
 
-    rows = cursor.execute("""
-    SELECT severity_grade, COUNT(*) as total
-    FROM violations
-    GROUP BY severity_grade
-    """).fetchall()
-
-    conn.close()
+        rows = cursor.execute("""
+        SELECT severity_grade, SUM(count) as total
+        FROM violation_rollup_daily
+        GROUP BY severity_grade
+        """).fetchall()
 
     result = {
         1: 0,
@@ -203,22 +230,21 @@ def severity_distribution():
 # ZONE VIOLATIONS
 # =========================================================
 @router.get("/api/analytics/zone")
+@response_cache.cached()
 def zone_violations():
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    rows = cursor.execute("""
-    SELECT
-        zone_name,
-        COUNT(*) as total
-    FROM violations
-    WHERE is_geofence = 1
-    GROUP BY zone_name
-    ORDER BY total DESC
-    """).fetchall()
+    with read_connection() as conn:
+        cursor = conn.cursor()
 
-    conn.close()
+        rows = cursor.execute("""
+        SELECT
+            zone_name,
+            COUNT(*) as total
+        FROM violations
+        WHERE is_geofence = 1
+        GROUP BY zone_name
+        ORDER BY total DESC
+        """).fetchall()
 
     return [
         {
@@ -233,42 +259,41 @@ def zone_violations():
 # DAILY TREND
 # =========================================================
 @router.get("/api/analytics/daily")
+@response_cache.cached()
 def daily_trend():
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    rows = cursor.execute("""
-    SELECT
-        strftime('%H', timestamp) as hour,
-
-        SUM(
-            CASE
-                WHEN severity_grade = 3 THEN 1
-                ELSE 0
-            END
-        ) as critical,
-
-        SUM(
-            CASE
-                WHEN severity_grade = 2 THEN 1
-                ELSE 0
-            END
-        ) as medium,
-
-        SUM(
-            CASE
-                WHEN severity_grade = 1 THEN 1
-                ELSE 0
-            END
-        ) as minor
-
-    FROM violations
-    GROUP BY hour
-    ORDER BY hour
-    """).fetchall()
-
-    conn.close()
+    with read_connection() as conn:
+        cursor = conn.cursor()
+
+        rows = cursor.execute("""
+        SELECT
+            substr(bucket, 12, 2) as hour,
+
+            SUM(
+                CASE
+                    WHEN severity_grade = 3 THEN count
+                    ELSE 0
+                END
+            ) as critical,
+
+            SUM(
+                CASE
+                    WHEN severity_grade = 2 THEN count
+                    ELSE 0
+                END
+            ) as medium,
+
+            SUM(
+                CASE
+                    WHEN severity_grade = 1 THEN count
+                    ELSE 0
+                END
+            ) as minor
+
+        FROM violation_rollup_hourly
+        GROUP BY hour
+        ORDER BY hour
+        """).fetchall()
 
     return [
         {
@@ -285,16 +310,15 @@ def daily_trend():
 # SAFETY SCORE
 # =========================================================
 @router.get("/api/analytics/safety-score")
+@response_cache.cached()
 def get_safety_score():
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with read_connection() as conn:
+        cursor = conn.cursor()
 
-    total = cursor.execute("""
-    SELECT COUNT(*) FROM violations
-    """).fetchone()[0]
-
-    conn.close()
+        total = cursor.execute("""
+        SELECT COALESCE(SUM(count), 0) FROM violation_rollup_daily
+        """).fetchone()[0]
 
     score = max(0, 100 - int(total * 0.5))
 
@@ -318,29 +342,28 @@ def get_safety_score():
 # AI INSIGHTS
 # =========================================================
 @router.get("/api/analytics/insights")
+@response_cache.cached()
 def insights():
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    common_violation = cursor.execute("""
-    SELECT violation_type, COUNT(*) as total
-    FROM violations
-    GROUP BY violation_type
-    ORDER BY total DESC
-    LIMIT 1
-    """).fetchone()
-
-    high_zone = cursor.execute("""
-    SELECT zone_name, COUNT(*) as total
-    FROM violations
-    WHERE is_geofence = 1
-    GROUP BY zone_name
-    ORDER BY total DESC
-    LIMIT 1
-    """).fetchone()
+    with read_connection() as conn:
+        cursor = conn.cursor()
 
-    conn.close()
+        common_violation = cursor.execute("""
+        SELECT violation_type, SUM(count) as total
+        FROM violation_rollup_daily
+        GROUP BY violation_type
+        ORDER BY total DESC
+        LIMIT 1
+        """).fetchone()
+
+        high_zone = cursor.execute("""
+        SELECT zone_name, SUM(count) as total
+        FROM violation_rollup_daily_zone
+        WHERE is_geofence = 1
+        GROUP BY zone_name
+        ORDER BY total DESC
+        LIMIT 1
+        """).fetchone()
 
     return [
         {
@@ -358,22 +381,21 @@ def insights():
 # ZONE INTELLIGENCE
 # =========================================================
 @router.get("/api/zones")
+@response_cache.cached()
 def get_dashboard_zones():
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with read_connection() as conn:
+        cursor = conn.cursor()
 
-    rows = cursor.execute("""
-    SELECT
-        zone_name,
-        COUNT(*) as total
-    FROM violations
-    WHERE is_geofence = 1
-    GROUP BY zone_name
-    ORDER BY total DESC
-    """).fetchall()
-
-    conn.close()
+        rows = cursor.execute("""
+        SELECT
+            zone_name,
+            COUNT(*) as total
+        FROM violations
+        WHERE is_geofence = 1
+        GROUP BY zone_name
+        ORDER BY total DESC
+        """).fetchall()
 
     return [
         {
@@ -389,35 +411,39 @@ def get_dashboard_zones():
 # EXPORT CSV
 # =========================================================
 @router.get("/api/export/csv")
-def export_csv():
-
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    rows = cursor.execute("""
-    SELECT *
-    FROM violations
-    ORDER BY id DESC
-    """).fetchall()
-
-    conn.close()
-
-    csv_content = "worker_id,type,zone,severity,time\n"
-
-    for r in rows:
-        csv_content += (
-            f"{r['worker_id']},"
-            f"{r['violation_type']},"
-            f"{r['zone_name']},"
-            f"{r['severity_grade']},"
-            f"{r['timestamp']}\n"
-        )
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={
-            "Content-Disposition":
-            "attachment; filename=sitesafe_report.csv"
-        }
-    )
\ No newline at end of file
+def export_csv(
+    date: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    zone: Optional[str] = None,
+    worker: Optional[str] = None,
+    fmt: str = Query(default="csv", alias="format"),
+    gzip: bool = False
+):
+
+    clauses, params = date_filters("day", date, start, end)
+
+    if zone:
+        clauses.append("zone_name = ?")
+        params.append(zone)
+
+    if worker:
+        clauses.append("worker_id = ?")
+        params.append(worker)
+
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    # Rows stream from the cursor in chunks; nothing is built up in memory
+    return export_response(
+        f"""
+        SELECT worker_id, violation_type, zone_name, severity_grade, timestamp
+        FROM violations
+        {where}
+        ORDER BY id DESC
+        """,
+        params,
+        [("worker_id", "str"), ("type", "str"), ("zone", "str"), ("severity", "int"), ("time", "str")],
+        "sitesafe_report",
+        fmt,
+        gzip
+    )
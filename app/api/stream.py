@@ -2,35 +2,32 @@ from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 
 from ..services.stream import generate_frames
-from ..services.alerts import state
-from ..services import camera  # IMPORTANT
+from ..services.stream_manager import manager, DEFAULT_STREAM
 
 router = APIRouter()
 
 
 @router.get("/api/stream")
-def stream():
+async def stream():
     """
     MJPEG video stream endpoint.
     The generator will exit automatically when streaming_active becomes False.
     """
     return StreamingResponse(
-        generate_frames(),
+        generate_frames(manager.get(DEFAULT_STREAM)),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 
 @router.post("/api/start")
 def start_stream():
-    if state.get("streaming_active"):
-        return {"status": "already streaming"}
-
     try:
-        camera.open_camera()
+        started = manager.start(DEFAULT_STREAM)
     except Exception as e:
         return {"status": "camera_error", "detail": str(e)}
 
-    state["streaming_active"] = True
+    if not started:
+        return {"status": "already streaming"}
     return {"status": "streaming started"}
 
 
@@ -42,6 +39,5 @@ def stop_stream():
     - Just flip the flag
     - Generator will exit and release camera safely
     """
-    state["streaming_active"] = False
-    camera.release_camera()
+    manager.stop(DEFAULT_STREAM)
     return {"status": "streaming stopped"}
@@ -0,0 +1,139 @@
+"""
+Multi-camera stream routes: /api/streams/{stream_id}/...
+Every camera has its own capture, detections and geofence zones; all of
+them share one inference scheduler.
+"""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+
+from ..services.stream import generate_frames
+from ..services.stream_manager import manager
+from ..services.tiling import INFERENCE_MODES
+from .geofence import ZoneCreate
+
+router = APIRouter()
+
+
+def _parse_src(src):
+    """Device index ("0") or a URL / file path ("rtsp://...")"""
+    return int(src) if src.isdigit() else src
+
+
+@router.get("/api/streams")
+def list_streams():
+    """Status of every known camera stream"""
+    return {"streams": manager.status()}
+
+
+@router.get("/api/streams/stats")
+def stream_stats():
+    """Per-camera achieved inference FPS, dropped/stale frames and latency"""
+    return {"streams": manager.stats()}
+
+
+@router.post("/api/streams/{stream_id}/schedule")
+def configure_stream(
+    stream_id: str,
+    target_fps: Optional[float] = None,
+    weight: Optional[float] = None
+):
+    """Set a camera's target inference FPS (0 = unlimited) and fair-share weight"""
+    manager.configure(stream_id, target_fps, weight)
+    return {"stream": stream_id, "target_fps": target_fps, "weight": weight}
+
+
+@router.post("/api/streams/{stream_id}/inference")
+def set_inference_mode(
+    stream_id: str,
+    mode: str,
+    overlap: Optional[float] = None,
+    full_frame: Optional[bool] = None
+):
+    """
+    How a camera's frames go through the model: "full" (whole frame
+    letterboxed), "roi" (only the geofence zones' area, at native
+    resolution; needs geofencing enabled, else full frame) or "tiled"
+    (overlapping 640 tiles, for 4K cameras). `overlap` is the tile overlap
+    share, `full_frame` adds a whole-frame pass to tiled mode.
+    """
+    if mode not in INFERENCE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(INFERENCE_MODES)}")
+    if overlap is not None and not 0 <= overlap < 0.9:
+        raise HTTPException(status_code=400, detail="overlap must be in [0, 0.9)")
+
+    settings = manager.get(stream_id).settings
+    settings["inference_mode"] = mode
+    if overlap is not None:
+        settings["tile_overlap"] = overlap
+    if full_frame is not None:
+        settings["tile_full_frame"] = full_frame
+    return {"stream": stream_id, "inference_mode": mode, "overlap": overlap, "full_frame": full_frame}
+
+
+@router.post("/api/streams/{stream_id}/start")
+def start_stream(stream_id: str, src: Optional[str] = None):
+    """Open a camera; `src` defaults to the stream id when it's a device index"""
+    if src is None:
+        src = stream_id if stream_id.isdigit() else "0"
+
+    try:
+        started = manager.start(stream_id, _parse_src(src))
+    except Exception as e:
+        return {"status": "camera_error", "detail": str(e)}
+
+    if not started:
+        return {"status": "already streaming", "stream": stream_id}
+    return {"status": "streaming started", "stream": stream_id}
+
+
+@router.post("/api/streams/{stream_id}/stop")
+def stop_stream(stream_id: str):
+    if not manager.stop(stream_id):
+        return {"status": "unknown stream", "stream": stream_id}
+    return {"status": "streaming stopped", "stream": stream_id}
+
+
+@router.get("/api/streams/{stream_id}/stream")
+async def stream(stream_id: str):
+    """MJPEG video stream of one camera"""
+    return StreamingResponse(
+        generate_frames(manager.get(stream_id), viewer=f"mjpeg-{stream_id}"),
+        media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+
+@router.get("/api/streams/{stream_id}/viewers")
+def stream_viewers(stream_id: str):
+    """Connected viewers of one camera with their delivery latency"""
+    return {"stream": stream_id, "viewers": manager.get(stream_id).broadcaster.viewer_stats()}
+
+
+@router.put("/api/streams/{stream_id}/zones")
+def set_zones(stream_id: str, zones: List[ZoneCreate]):
+    """Replace the geofence zones of one camera"""
+    settings = manager.get(stream_id).settings
+    settings["zones"] = [
+        {"name": z.name, "points": z.points, "color": z.color, "alpha": z.alpha}
+        for z in zones
+    ]
+    return {"stream": stream_id, "zones_count": len(settings["zones"])}
+
+
+@router.get("/api/streams/{stream_id}/zones")
+def get_zones(stream_id: str):
+    settings = manager.get(stream_id).settings
+    return {"stream": stream_id, "zones": settings.get("zones", [])}
+
+
+@router.post("/api/streams/{stream_id}/geofence/enable")
+def enable_geofence(stream_id: str):
+    manager.get(stream_id).settings["geofence_enabled"] = True
+    return {"stream": stream_id, "status": "geofence enabled"}
+
+
+@router.post("/api/streams/{stream_id}/geofence/disable")
+def disable_geofence(stream_id: str):
+    manager.get(stream_id).settings["geofence_enabled"] = False
+    return {"stream": stream_id, "status": "geofence disabled"}
@@ -1,6 +1,8 @@
 import os
 import cv2
 import time
+import asyncio
+import threading
 import traceback
 import logging
 import subprocess
@@ -8,7 +10,13 @@ import subprocess
 from fastapi import APIRouter, UploadFile, File
 from fastapi.responses import JSONResponse
 
-from ..services.model import infer_openvino, decode_yolov8_flat
+from ..services.model import (
+    infer_async,
+    decode_yolov8_flat,
+    infer_openvino_batch,
+    decode_yolov8_batch,
+    VIDEO_BATCH,
+)
 from ..utils.helpers import extract_violations
 from ..core.settings import UPLOAD_FOLDER
 
@@ -48,8 +56,8 @@ async def upload_image(file: UploadFile = File(...)):
     try:
         frame = cv2.imread(path)
 
-        # OPENVINO INFERENCE
-        output, scale, pad_x, pad_y = infer_openvino(frame)
+        # OPENVINO INFERENCE (awaited, so the event loop keeps serving other requests)
+        output, scale, pad_x, pad_y = await asyncio.wrap_future(infer_async(frame))
 
         detections = decode_yolov8_flat(
             output,
@@ -81,30 +89,50 @@ async def upload_image(file: UploadFile = File(...)):
 
 
 # ================= VIDEO UPLOAD =================
-@router.post("/api/upload/video")
-async def upload_video(file: UploadFile = File(...)):
-    import subprocess
-    
-    input_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    
-    with open(input_path, "wb") as f:
-        f.write(await file.read())
-
+def process_video(input_path):
+    """
+    Annotate a video: batched inference on every 3rd frame, then re-encode
+    to MP4. Blocking (decode, inference, ffmpeg), so the route runs it in a
+    worker thread. Returns (violations, output file name).
+    """
     cap_vid = cv2.VideoCapture(input_path)
-    
+
     fps = int(cap_vid.get(cv2.CAP_PROP_FPS)) or 25
     w = int(cap_vid.get(cv2.CAP_PROP_FRAME_WIDTH))
     h = int(cap_vid.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-    temp_output = os.path.join(UPLOAD_FOLDER, "temp_annotated.mp4")
-    
+    # Per upload, now that uploads run side by side
+    stamp = f"{int(time.time() * 1000)}_{threading.get_ident()}"
+    temp_avi = os.path.join(UPLOAD_FOLDER, f"temp_annotated_{stamp}.avi")
+
     violations = set()
     frame_count = 0
 
     try:
         # Write frames to temp file using OpenCV
         fourcc = cv2.VideoWriter_fourcc(*"MJPG")
-        out = cv2.VideoWriter(temp_output.replace(".mp4", ".avi"), fourcc, fps, (w, h))
+        out = cv2.VideoWriter(temp_avi, fourcc, fps, (w, h))
+
+        # Frames are held until their batch is inferred so output order is kept
+        pending = []      # (frame, batch slot or None)
+        batch_frames = []
+
+        def flush():
+            if batch_frames:
+                outputs, metas = infer_openvino_batch(batch_frames, VIDEO_BATCH)
+                results = decode_yolov8_batch(outputs, [f.shape for f in batch_frames], metas)
+                for detections in results:
+                    violations.update(extract_violations(detections))
+            else:
+                results = []
+
+            for frame, slot in pending:
+                if slot is not None:
+                    frame = draw_detections(frame, results[slot])
+                out.write(frame)
+
+            pending.clear()
+            batch_frames.clear()
 
         while True:
             ret, frame = cap_vid.read()
@@ -115,29 +143,46 @@ async def upload_video(file: UploadFile = File(...)):
             frame_count += 1
 
             if frame_count % 3 == 0:
-                output, scale, pad_x, pad_y = infer_openvino(frame)
-                detections = decode_yolov8_flat(output, frame.shape, scale, pad_x, pad_y)
-                violations.update(extract_violations(detections))
-                frame = draw_detections(frame, detections)
+                pending.append((frame, len(batch_frames)))
+                batch_frames.append(frame)
+            else:
+                pending.append((frame, None))
 
-            out.write(frame)
+            if len(batch_frames) == VIDEO_BATCH:
+                flush()
 
-        cap_vid.release()
+        flush()
         out.release()
+    finally:
+        cap_vid.release()
 
-        # Convert AVI to MP4 using FFmpeg
-        out_name = f"annotated_{int(time.time())}.mp4"
-        out_path = os.path.join(UPLOAD_FOLDER, out_name)
-        
-        subprocess.run([
-            r"C:\ffmpeg-n8.0-latest-win64-gpl-8.0\bin\ffmpeg.exe", "-i", temp_output.replace(".mp4", ".avi"), 
-            "-c:v", "libx264", "-preset", "fast",
-            "-c:a", "aac", out_path, "-y"
-        ], check=True)
+    # Convert AVI to MP4 using FFmpeg
+    out_name = f"annotated_{stamp}.mp4"
+    out_path = os.path.join(UPLOAD_FOLDER, out_name)
+
+    subprocess.run([
+        r"C:\ffmpeg-n8.0-latest-win64-gpl-8.0\bin\ffmpeg.exe", "-i", temp_avi,
+        "-c:v", "libx264", "-preset", "fast",
+        "-c:a", "aac", out_path, "-y"
+    ], check=True)
+
+    # Clean up temp files
+    os.remove(input_path)
+    os.remove(temp_avi)
+
+    return violations, out_name
+
+
+@router.post("/api/upload/video")
+async def upload_video(file: UploadFile = File(...)):
+    input_path = os.path.join(UPLOAD_FOLDER, file.filename)
+    
+    with open(input_path, "wb") as f:
+        f.write(await file.read())
 
-        # Clean up temp files
-        os.remove(input_path)
-        os.remove(temp_output.replace(".mp4", ".avi"))
+    try:
+        # Off the event loop: streams and other requests keep being served
+        violations, out_name = await asyncio.to_thread(process_video, input_path)
 
         return {
             "violations": list(violations),
@@ -145,7 +190,6 @@ async def upload_video(file: UploadFile = File(...)):
         }
 
     except Exception as e:
-        cap_vid.release()
         logger.error(traceback.format_exc())
         return JSONResponse({"error": str(e)}, status_code=500)
     
@@ -15,10 +15,8 @@ except Exception:
     AIORTC_AVAILABLE = False
     logger.warning("aiortc not installed; WebRTC endpoints will be disabled. To enable, run: pip install aiortc av")
 
-import cv2
 import asyncio
-import numpy as np
-from app.services.stream import generate_frames
+from app.services.stream_manager import manager, DEFAULT_STREAM
 
 video_webrtc_router = APIRouter()
 
@@ -26,31 +24,48 @@ if AIORTC_AVAILABLE:
     class CameraVideoTrack(VideoStreamTrack):
         def __init__(self):
             super().__init__()
-            self.frame_gen = generate_frames()
+            stream = manager.get(DEFAULT_STREAM)
+            stopped = lambda: not stream.settings.get("streaming_active")
+            self.packets = stream.broadcaster.subscribe(stopped, "webrtc")
+
+        async def close(self):
+            """Close the subscription so the broadcaster stops queuing frames for us"""
+            try:
+                await self.packets.aclose()
+            except RuntimeError:
+                # recv() is still waiting on it; cancelling that runs the same cleanup
+                pass
+
+        def stop(self):
+            super().stop()
+            asyncio.ensure_future(self.close())
 
         async def recv(self):
             from av import VideoFrame
-            frame_bytes = next(self.frame_gen, None)
-            if frame_bytes is None:
-                await asyncio.sleep(0.04)
-                return None
-            # Extract JPEG bytes
-            start = frame_bytes.find(b'\r\n\r\n') + 4
-            end = frame_bytes.rfind(b'\r\n')
-            jpeg_bytes = frame_bytes[start:end]
-            arr = np.frombuffer(jpeg_bytes, dtype=np.uint8)
-            img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-            if img is None:
+            try:
+                packet = await self.packets.__anext__()
+            except StopAsyncIteration:
+                packet = None
+            if packet is None:
                 await asyncio.sleep(0.04)
                 return None
-            frame = VideoFrame.from_ndarray(img, format="bgr24")
+            # Raw annotated frame from the broadcaster, no JPEG decode needed
+            frame = VideoFrame.from_ndarray(packet.frame, format="bgr24")
             frame.pts, frame.time_base = self.next_timestamp()
             return frame
 
     @video_webrtc_router.post("/ws/webrtc-offer")
     async def webrtc_offer(offer: dict):
         pc = RTCPeerConnection()
-        pc.addTrack(CameraVideoTrack())
+        track = CameraVideoTrack()
+        pc.addTrack(track)
+
+        @pc.on("connectionstatechange")
+        async def on_connectionstatechange():
+            if pc.connectionState in ("failed", "closed"):
+                await pc.close()
+                track.stop()
+
         await pc.setRemoteDescription(RTCSessionDescription(sdp=offer["sdp"], type=offer["type"]))
         answer = await pc.createAnswer()
         await pc.setLocalDescription(answer)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import logging
-from app.services.stream import generate_frames
+from app.services.stream_manager import manager, DEFAULT_STREAM
 
 logger = logging.getLogger("sitesafeai")
 
@@ -11,18 +11,11 @@ async def video_stream_ws(ws: WebSocket):
     await ws.accept()
     logger.info("Video WebSocket client connected")
     try:
-        frame_gen = generate_frames()
-        while True:
-            frame = next(frame_gen, None)
-            if frame is None:
-                break
-            # Extract JPEG bytes from MJPEG chunk
-            # MJPEG: b"--frame\r\nContent-Type: image/jpeg\r\n\r\n...bytes...\r\n"
-            # We'll just send the JPEG bytes
-            start = frame.find(b'\r\n\r\n') + 4
-            end = frame.rfind(b'\r\n')
-            jpeg_bytes = frame[start:end]
-            await ws.send_bytes(jpeg_bytes)
+        # Already-encoded JPEGs straight from the camera's broadcaster
+        stream = manager.get(DEFAULT_STREAM)
+        stopped = lambda: not stream.settings.get("streaming_active")
+        async for packet in stream.broadcaster.subscribe(stopped, "ws"):
+            await ws.send_bytes(packet.jpeg)
     except WebSocketDisconnect:
         logger.info("Video WebSocket client disconnected")
     except Exception as e:
@@ -7,22 +7,42 @@ class GeofenceEngine:
     
     def __init__(self, ioa_threshold=0.3):
         self.ioa_threshold = ioa_threshold
-        self.masks = {} # dict of zone_name -> binary numpy mask
+        # zone_name -> (x1, y1, summed-area table of the zone mask over its bounding box)
+        self.tables = {}
         self.zone_hashes = {} # to track changes in zones
+        self._packed = None # every table in one flat buffer, rebuilt when a zone changes
 
     def _get_zone_hash(self, zone_data, frame_shape):
         """Simple hash to detect if a zone changed without rebuilding masks unnecessarily"""
         points_tuple = tuple((p[0], p[1]) for p in zone_data.get("points", []))
         return hash((zone_data["name"], points_tuple, frame_shape))
 
+    def _build_table(self, points, frame_shape):
+        """
+        Render the zone inside its bounding box (clipped to the frame) and
+        integrate it: table[y, x] = mask pixels above and left of (x, y).
+        """
+        h, w = frame_shape[:2]
+        points = np.array(points, dtype=np.int32)
+        x1, y1 = np.maximum(points.min(axis=0), 0)
+        x2, y2 = np.minimum(points.max(axis=0) + 1, (w, h))
+        x2, y2 = max(x1, x2), max(y1, y2)
+
+        if x2 == x1 or y2 == y1:
+            # Zone entirely outside the frame
+            return int(x1), int(y1), np.zeros((y2 - y1 + 1, x2 - x1 + 1), dtype=np.int32)
+
+        mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+        cv2.fillPoly(mask, [points - (x1, y1)], 1)
+        return int(x1), int(y1), cv2.integral(mask)
+
     def update_zones(self, zones_data, frame_shape):
         """
-        Renders binary masks for zones. Only computes mask if the zone is new or changed.
+        Builds the zones' summed-area tables. Only computes a table if the zone is new or changed.
         Args:
             zones_data: list of dicts like {"name": "z1", "points": [[x,y],...]}
             frame_shape: (height, width) or (height, width, channels)
         """
-        h, w = frame_shape[:2]
         current_names = set()
         
         for z in zones_data:
@@ -33,21 +53,60 @@ class GeofenceEngine:
             current_names.add(name)
             zone_hash = self._get_zone_hash(z, frame_shape)
             
-            # If mask doesn't exist or zone changed, re-render via cv2.fillPoly
-            if name not in self.masks or self.zone_hashes.get(name) != zone_hash:
-                mask = np.zeros((h, w), dtype=np.uint8)
-                points = np.array(z["points"], dtype=np.int32)
-                
-                cv2.fillPoly(mask, [points], 1)
-                
-                self.masks[name] = mask
+            # If the table doesn't exist or zone changed, re-render via cv2.fillPoly
+            if name not in self.tables or self.zone_hashes.get(name) != zone_hash:
+                self.tables[name] = self._build_table(z["points"], frame_shape)
                 self.zone_hashes[name] = zone_hash
+                self._packed = None
 
         # Clean up deleted zones
-        keys_to_remove = [k for k in self.masks.keys() if k not in current_names]
+        keys_to_remove = [k for k in self.tables.keys() if k not in current_names]
         for k in keys_to_remove:
-            del self.masks[k]
+            del self.tables[k]
             del self.zone_hashes[k]
+            self._packed = None
+
+    def _pack(self):
+        """
+        Concatenate the tables into one flat buffer (the tables become views
+        of it), with per-zone offset / row stride / origin / size arrays.
+        """
+        if self._packed is not None:
+            return self._packed
+
+        names = list(self.tables)
+        sizes = [self.tables[n][2].size for n in names]
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+        flat = np.concatenate([self.tables[n][2].ravel() for n in names])
+
+        geometry = []
+        for name, offset, size in zip(names, offsets, sizes):
+            x1, y1, table = self.tables[name]
+            th, tw = table.shape
+            self.tables[name] = (x1, y1, flat[offset:offset + size].reshape(th, tw))
+            geometry.append((offset, tw, x1, y1, tw - 1, th - 1))
+
+        # Columns: offset, stride, x1, y1, width, height; shaped (zones, 1) to broadcast
+        self._packed = (names, flat, [col[:, None] for col in np.array(geometry, dtype=np.int64).T])
+        return self._packed
+
+    def intersections(self, boxes):
+        """
+        Zone pixels inside each (x1, y1, x2, y2) box, for every zone at
+        once: four table lookups per pair. Returns (zone names, [zones, boxes]).
+        """
+        names, flat, (offset, stride, zx, zy, zw, zh) = self._pack()
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+
+        # Box corners in each zone table's coordinates
+        x1 = np.clip(boxes[:, 0] - zx, 0, zw)
+        y1 = np.clip(boxes[:, 1] - zy, 0, zh)
+        x2 = np.clip(boxes[:, 2] - zx, 0, zw)
+        y2 = np.clip(boxes[:, 3] - zy, 0, zh)
+
+        top, bottom = offset + y1 * stride, offset + y2 * stride
+        inter = flat[bottom + x2] - flat[top + x2] - flat[bottom + x1] + flat[top + x1]
+        return names, inter
 
     def process(self, detections, frame_shape, zones_data):
         """
@@ -59,42 +118,41 @@ class GeofenceEngine:
         Returns:
             Dict of zone_name -> list of violating object classes
         """
+        hits = self.process_detections(detections, frame_shape, zones_data)
+        return {zone_name: [det["class"] for det in dets] for zone_name, dets in hits.items()}
+
+    def process_detections(self, detections, frame_shape, zones_data):
+        """
+        Same check as process(), but returns zone_name -> list of the
+        violating detection dicts themselves (so callers can tell who)
+        """
         self.update_zones(zones_data, frame_shape)
         
         violations = {} 
         
-        if not self.masks or not detections:
+        detections = [det for det in detections if det.get("bbox")]
+        if not self.tables or not detections:
             return violations
             
         h, w = frame_shape[:2]
         
-        for det in detections:
-            bbox = det.get("bbox")
-            if not bbox: continue
-            
-            x1, y1, x2, y2 = bbox
-            # Constrain to frame boundaries
-            x1, y1 = max(0, int(x1)), max(0, int(y1))
-            x2, y2 = min(w, int(x2)), min(h, int(y2))
-            
-            box_area = (x2 - x1) * (y2 - y1)
-            if box_area <= 0:
-                continue
-                
-            # Vectorized overlap check using Numpy array slicing
-            for zone_name, mask in self.masks.items():
-                if rule_matches(zone_name, det["class"]):
-                    # Slice the exact part of the mask that the bbox covers
-                    box_mask = mask[y1:y2, x1:x2]
-                    
-                    # Sum the 1s to get the intersection area
-                    intersection_area = np.sum(box_mask)
-                    
-                    ioa = intersection_area / box_area
-                    
-                    if ioa > self.ioa_threshold:
-                        if zone_name not in violations:
-                            violations[zone_name] = []
-                        violations[zone_name].append(det["class"])
+        # Constrain to frame boundaries
+        boxes = np.trunc(np.array([det["bbox"] for det in detections], dtype=np.float64)).astype(np.int64)
+        np.clip(boxes, 0, [w, h, w, h], out=boxes)
+        widths, heights = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+        box_area = widths * heights
+
+        # Every detection x zone intersection in one go
+        names, inter = self.intersections(boxes)
+        ioa = inter / np.maximum(box_area, 1)
+
+        # Rules only depend on (zone, class)
+        classes, class_idx = np.unique([det["class"] for det in detections], return_inverse=True)
+        allowed = np.array([[rule_matches(name, c) for c in classes] for name in names], dtype=bool)
+
+        hits = (ioa > self.ioa_threshold) & allowed[:, class_idx] & (widths > 0) & (heights > 0)
+        # Detection-major, like checking each detection against each zone
+        for d, z in zip(*np.nonzero(hits.T)):
+            violations.setdefault(names[z], []).append(detections[d])
                         
-        return violations
\ No newline at end of file
+        return violations
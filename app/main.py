@@ -5,6 +5,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .core.settings import setup_app
 from .api.stream import router as stream_router
+from .api.streams import router as streams_router
 from .api.upload import router as upload_router
 from .api.report import router as report_router
 from .core.websocket import websocket_router
@@ -13,8 +14,14 @@ from .api.video_ws import video_ws_router
 from .api.video_webrtc import video_webrtc_router
 from .api.geofence import router as geofence_router
 from .api.dashboard import router as dashboard_router
+from backend.writer import writer as violation_writer
 app = FastAPI()
 
+# Commit queued violations before the server exits
+@app.on_event("shutdown")
+def flush_violations():
+    violation_writer.close()
+
 setup_app(app)
 
 app.add_middleware(
@@ -26,6 +33,7 @@ app.add_middleware(
 )
 
 app.include_router(stream_router)
+app.include_router(streams_router)
 app.include_router(upload_router)
 app.include_router(report_router)
 app.include_router(websocket_router)
@@ -0,0 +1,144 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("sitesafeai")
+
+# Packets kept per camera; viewers always jump to the newest one
+RING_SIZE = 4
+
+
+class FramePacket:
+    """One annotated frame, encoded once and shared by every viewer"""
+
+    __slots__ = ("seq", "ts", "frame", "jpeg")
+
+    def __init__(self, seq, ts, frame, jpeg):
+        self.seq = seq
+        self.ts = ts
+        self.frame = frame  # annotated BGR ndarray (WebRTC uses it as-is)
+        self.jpeg = jpeg    # encoded bytes (MJPEG / WebSocket)
+
+
+class Subscription:
+    """
+    One async viewer. The producer thread hands packets over with
+    call_soon_threadsafe into a latest-only asyncio queue, so a slow viewer
+    skips frames instead of building a backlog. Tracks publish → delivered
+    latency.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=1)
+        self.connected = time.time()
+
+        self.delivered = 0
+        self.skipped = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def offer(self, packet):
+        # Runs on the viewer's event loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.skipped += 1
+        self.queue.put_nowait(packet)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def record(self, packet):
+        latency = time.time() - packet.ts
+        self.delivered += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def stats(self):
+        return {
+            "viewer": self.name,
+            "connected_s": round(time.time() - self.connected, 1),
+            "delivered": self.delivered,
+            "skipped": self.skipped,
+            "avg_latency_ms": round(self.latency_sum / max(self.delivered, 1) * 1000, 1),
+            "max_latency_ms": round(self.latency_max * 1000, 1),
+        }
+
+
+class FrameBroadcaster:
+    """
+    Single-producer, many-reader ring buffer for one camera.
+    The producer thread publishes each annotated frame once; async viewers
+    get it pushed onto their event loop (sync code can use wait_next).
+    Reading costs no extra encoding, so N viewers cost the same CPU as one.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.ring = deque(maxlen=size)
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.subscribers = set()
+
+    def publish(self, frame, jpeg):
+        with self.cond:
+            self.seq += 1
+            packet = FramePacket(self.seq, time.time(), frame, jpeg)
+            self.ring.append(packet)
+            self.cond.notify_all()
+            subscribers = list(self.subscribers)
+
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, packet)
+            except RuntimeError:
+                # Viewer's loop is gone
+                self._remove(sub)
+        return packet
+
+    def latest(self):
+        with self.cond:
+            return self.ring[-1] if self.ring else None
+
+    def wait_next(self, after_seq, timeout=None):
+        """Newest packet with seq > after_seq, or None on timeout"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > after_seq, timeout):
+                return None
+            return self.ring[-1]
+
+    def _remove(self, sub):
+        with self.cond:
+            self.subscribers.discard(sub)
+
+    async def subscribe(self, stopped, name="viewer", poll=0.5):
+        """
+        Async iterator of new packets for event-loop consumers; never takes
+        a thread. `stopped` is polled so the iterator ends when the stream
+        stops. Latency is recorded once the consumer asks for the next packet,
+        i.e. after it has sent the previous one.
+        """
+        sub = Subscription(name)
+        with self.cond:
+            self.subscribers.add(sub)
+
+        try:
+            while not stopped():
+                packet = await sub.get(poll)
+                if packet is None:
+                    continue
+                yield packet
+                sub.record(packet)
+        finally:
+            self._remove(sub)
+            logger.info(f"Viewer '{name}' left: {sub.stats()}")
+
+    def viewer_stats(self):
+        with self.cond:
+            subscribers = list(self.subscribers)
+        return [sub.stats() for sub in subscribers]
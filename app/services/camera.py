@@ -4,9 +4,6 @@ import os
 import numpy as np
 import threading
 
-cap = None
-DEMO_MODE = False  # Track if using demo/fallback mode
-
 
 class ThreadedCamera:
     """
@@ -16,11 +13,12 @@ class ThreadedCamera:
     """
     def __init__(self, src=0, is_demo=False):
         self.is_demo = is_demo
-        if not is_demo:
+        if not is_demo and isinstance(src, int):
             self.cap = cv2.VideoCapture(src, cv2.CAP_DSHOW)
             # Instruct DSHOW to drop internal buffering if possible
             self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         else:
+            # Video files and network (RTSP/HTTP) cameras
             self.cap = cv2.VideoCapture(src, cv2.CAP_FFMPEG)
             
         self.ret = False
@@ -62,39 +60,38 @@ class ThreadedCamera:
         self.cap.release()
 
 
-def open_camera(src=0):
-    """
-    Open a fresh camera safely with threaded optimization.
-    Falls back to demo video or test pattern if no camera found.
-    """
-    global cap, DEMO_MODE
+class DummyCapture:
+    """Stand-in capture that makes the stream fall back to the test pattern"""
+    def isOpened(self):
+        return True
 
-    # Release old camera if any
-    if cap is not None:
-        try:
-            cap.release()
-        except Exception:
-            pass
-        cap = None
+    def read(self):
+        return False, None
+
+    def release(self):
+        pass
 
-    time.sleep(0.2)
 
+def open_capture(src=0):
+    """
+    Open a camera safely with threaded optimization.
+    Falls back to demo video or test pattern if no camera found.
+    Returns (capture, demo_mode); the caller owns the capture.
+    """
     # Try opening native camera first using Threaded implementation directly
     try:
         temp_cap = ThreadedCamera(src, is_demo=False)
         if temp_cap.isOpened():
-            DEMO_MODE = False
-            print("[CAMERA] ✅ Webcam opened successfully with zero-lag Threading")
-            cap = temp_cap
-            return cap
+            print(f"[CAMERA] ✅ Camera {src} opened successfully with zero-lag Threading")
+            return temp_cap, False
         else:
             temp_cap.release()
     except Exception as e:
         print(f"[CAMERA] ⚠️ Camera error: {e}")
 
     # Fallback: Try demo video if camera fails
-    print("[CAMERA] ⚠️ Webcam not found, trying demo video...")
-    
+    print(f"[CAMERA] ⚠️ Camera {src} not found, trying demo video...")
+
     demo_paths = [
         "demo.mp4",
         "test.mp4",
@@ -103,7 +100,7 @@ def open_camera(src=0):
         "archive/data/demo.mp4",
         "../demo.mp4"
     ]
-    
+
     for path in demo_paths:
         if os.path.exists(path):
             try:
@@ -111,34 +108,20 @@ def open_camera(src=0):
                 if temp_cap.isOpened():
                     temp_cap.release()
                     print(f"[CAMERA] 📹 Found demo video: {path}")
-                    DEMO_MODE = True
-                    cap = ThreadedCamera(path, is_demo=True)
+                    demo_cap = ThreadedCamera(path, is_demo=True)
                     print("[CAMERA] ✅ Threaded Demo video loaded")
-                    return cap
+                    return demo_cap, True
             except:
                 pass
 
     # Last resort: Return a dummy object that will trigger test pattern mode
     print("[CAMERA] 🎨 Using test pattern mode")
-    DEMO_MODE = True
-    
-    class DummyCapture:
-        def isOpened(self):
-            return True
-        def read(self):
-            return False, None
-        def release(self):
-            pass
-    
-    cap = DummyCapture()
-    return cap
+    return DummyCapture(), True
 
 
-def release_camera():
-    global cap
+def release_capture(cap):
     if cap is not None:
         try:
             cap.release()
         except Exception:
             pass
-        cap = None
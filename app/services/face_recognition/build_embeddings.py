@@ -1,39 +1,221 @@
+"""
+Enroll worker faces into the embedding store.
+
+    faces/<worker_id>/<image>  ->  embeddings.json + embeddings-<n>.f32
+
+Incremental: every source image is recorded in the store with its size,
+mtime and SHA-1. A run only embeds images that are new or whose content
+changed, tombstones the rows of changed or deleted images, and appends
+the rest, so adding one worker only costs that worker's images. Detection
+and embedding run in a process pool with one FaceAnalysis per process.
+
+    python build_embeddings.py               # incremental
+    python build_embeddings.py --full        # re-embed everything
+
+A full run (also forced after a legacy pickle import) builds the new
+generation in memory and commits it with one write at the end, so
+servers keep recognising the old gallery until it is complete.
+    python build_embeddings.py --workers 8
+"""
 import os
+import sys
+import time
+import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
 import cv2
-import pickle
-from insightface.app import FaceAnalysis
+import numpy as np
 
-BASE_DIR = os.path.dirname(__file__)
+from store import EmbeddingStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FACES_DIR = os.path.join(BASE_DIR, "faces")
-OUT_FILE = os.path.join(BASE_DIR, "embeddings.pkl")
 
-app = FaceAnalysis(name="buffalo_l", providers=["CPUExecutionProvider"])
-app.prepare(ctx_id=0)
+# Each process loads its own buffalo_l (~300 MB), so don't default to every core
+ENROLL_WORKERS = int(os.environ.get("SITESAFE_ENROLL_WORKERS", min(4, os.cpu_count() or 1)))
+# Embedded images appended to the store per write (progress survives a crash)
+APPEND_BATCH = 256
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+_face_app = None
+
+
+# ---------------- Embedding (runs in the pool) ----------------
 
-db = {}
+def _init_face_app():
+    global _face_app
+    from insightface.app import FaceAnalysis
+
+    _face_app = FaceAnalysis(name="buffalo_l", providers=["CPUExecutionProvider"])
+    _face_app.prepare(ctx_id=0)
+
+
+def _embed(path):
+    """Embedding of the first face in an image, or None"""
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    faces = _face_app.get(img)
+    if not faces:
+        return None
+    return np.asarray(faces[0].embedding, dtype=np.float32)
+
+
+# ---------------- Planning ----------------
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def scan(faces_dir):
+    """{source key: (path, worker_id, size, mtime_ns)} for every enrollment image"""
+    found = {}
+    for worker_id in sorted(os.listdir(faces_dir)):
+        person_dir = os.path.join(faces_dir, worker_id)
+        if not os.path.isdir(person_dir):
+            continue
+        for img_name in sorted(os.listdir(person_dir)):
+            if not img_name.lower().endswith(IMAGE_EXTS):
+                continue
+            path = os.path.join(person_dir, img_name)
+            st = os.stat(path)
+            found[f"{worker_id}/{img_name}"] = (path, worker_id, st.st_size, st.st_mtime_ns)
+    return found
 
-for worker_id in os.listdir(FACES_DIR):
-    person_dir = os.path.join(FACES_DIR, worker_id)
-    if not os.path.isdir(person_dir):
-        continue
 
-    embeddings = []
+def plan(sources, found):
+    """
+    Compare the images on disk with the store's sources. Returns
+    (to_embed {key: info}, stale [keys], touched {key: info}): images to
+    embed, recorded images that changed or disappeared, and images whose
+    mtime changed but whose content did not.
+    """
+    to_embed, stale, touched = {}, [], {}
 
-    for img_name in os.listdir(person_dir):
-        img_path = os.path.join(person_dir, img_name)
-        img = cv2.imread(img_path)
-        if img is None:
+    for key, (path, worker_id, size, mtime) in found.items():
+        old = sources.get(key)
+        if old and old["worker"] == worker_id and old["size"] == size and old["mtime"] == mtime:
             continue
 
-        faces = app.get(img)
-        if faces:
-            embeddings.append(faces[0].embedding)
+        info = {"worker": worker_id, "size": size, "mtime": mtime, "sha1": file_sha1(path)}
+        if old and old["worker"] == worker_id and old["sha1"] == info["sha1"]:
+            touched[key] = dict(old, size=size, mtime=mtime)
+            continue
+        if old:
+            stale.append(key)
+        to_embed[key] = dict(info, path=path)
+
+    stale.extend(key for key in sources if key not in found)
+    return to_embed, stale, touched
+
+
+# ---------------- Enrollment ----------------
+
+def _rows(results):
+    """(labels, vectors, sources) for embedded results; vectors is a list"""
+    labels, vectors, sources = [], [], {}
+    for key, info, embedding in results:
+        info = {k: v for k, v in info.items() if k != "path"}
+        if embedding is None:
+            info["rows"] = []
+        else:
+            info["rows"] = [len(vectors)]
+            labels.append(info["worker"])
+            vectors.append(embedding)
+        sources[key] = info
+    return labels, vectors, sources
+
+
+def _flush(store, results):
+    labels, vectors, sources = _rows(results)
+    if vectors:
+        store.append(labels, np.stack(vectors), sources)
+    elif sources:
+        store.update_sources(sources)
+    results.clear()
+
+
+def enroll(store, faces_dir=FACES_DIR, workers=ENROLL_WORKERS, full=False):
+    start = time.perf_counter()
+    snapshot = store.load()
+    if not full and len(snapshot) and not snapshot.sources:
+        # Imported from embeddings.pkl: no record of which image made which row
+        print("ℹ Store has no source records (legacy import), re-embedding everything")
+        full = True
+    sources = {} if full else snapshot.sources
+    to_embed, stale, touched = plan(sources, scan(faces_dir))
+
+    # Touched entries carry the current row ids: record them before the
+    # removal, whose compaction would renumber rows under them
+    if touched:
+        store.update_sources(touched)
+    if stale:
+        rows = [r for key in stale for r in sources[key].get("rows", [])]
+        store.remove_rows(rows, stale)
+        print(f"🗑 {len(stale)} changed / removed images ({len(rows)} embeddings retired)")
+
+    print(f"🔍 {len(to_embed)} images to embed, {len(sources) - len(stale)} unchanged")
+    if not to_embed and not (full and store.exists()):
+        return 0
+
+    keys = list(to_embed)
+    paths = [to_embed[key]["path"] for key in keys]
+    results, done, embedded = [], 0, 0
+
+    if workers > 1 and len(paths) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_face_app)
+        embeddings = pool.map(_embed, paths, chunksize=max(1, min(16, len(paths) // (workers * 4))))
+    else:
+        pool = None
+        if paths:
+            _init_face_app()
+        embeddings = map(_embed, paths)
+
+    try:
+        for key, embedding in zip(keys, embeddings):
+            results.append((key, to_embed[key], embedding))
+            done += 1
+            embedded += embedding is not None
+            if embedding is None:
+                print(f"⚠ No face in {key}")
+            if done % APPEND_BATCH == 0:
+                if not full:
+                    _flush(store, results)
+                print(f"… {done}/{len(keys)}")
+        if full:
+            # One new generation replacing the old one, committed only once complete
+            labels, vectors, sources = _rows(results)
+            store.write(labels, np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32), sources)
+        else:
+            _flush(store, results)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"✔ {embedded} embeddings from {done} images in {time.perf_counter() - start:.1f}s")
+    return embedded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enroll worker faces into the embedding store")
+    parser.add_argument("--faces", default=FACES_DIR, help="faces/<worker_id>/<image> directory")
+    parser.add_argument("--workers", type=int, default=ENROLL_WORKERS, help="embedding processes")
+    parser.add_argument("--full", action="store_true", help="re-embed every image")
+    args = parser.parse_args(argv)
+
+    store = EmbeddingStore()
+    enroll(store, args.faces, args.workers, args.full)
 
-    if embeddings:
-        db[worker_id] = embeddings
-        print(f"✔ {worker_id}: {len(embeddings)} embeddings")
+    snapshot = store.load()
+    print(f"\n✅ Embeddings saved to {store.meta_path} "
+          f"(generation {snapshot.generation}, {len(snapshot.worker_ids())} workers)")
 
-with open(OUT_FILE, "wb") as f:
-    pickle.dump(db, f)
 
-print("\n✅ Embeddings saved")
+if __name__ == "__main__":
+    sys.exit(main())
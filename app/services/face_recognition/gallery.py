@@ -0,0 +1,93 @@
+import os
+import numpy as np
+
+from .index import make_index, FACE_INDEX
+
+# How a worker's several enrolled vectors combine into one score:
+# "max" = best single vector, "mean" = average over all of them
+FACE_AGGREGATE = os.environ.get("SITESAFE_FACE_AGGREGATE", "max")
+
+
+def l2_normalize(x, axis=-1):
+    x = np.asarray(x, dtype=np.float32)
+    norm = np.linalg.norm(x, axis=axis, keepdims=True)
+    return x / np.maximum(norm, 1e-12)
+
+
+class FaceGallery:
+    """
+    Enrolled embeddings, pre-normalized float32, behind a search index
+    (see index.py). Matching a face scores the index's candidate rows in
+    one mat-vec and aggregates them per worker. Workers can be added and
+    removed at any time.
+    """
+
+    def __init__(self, db=None, aggregate=FACE_AGGREGATE, index=FACE_INDEX, **index_args):
+        if aggregate not in ("max", "mean"):
+            raise ValueError(f"Unknown face aggregate '{aggregate}' (use 'max' or 'mean')")
+        self.aggregate = aggregate
+        self.index_kind = index
+        self.index_args = index_args
+        self.index = None
+        self._loading = False
+        self._bulk_add((db or {}).items())
+
+    @classmethod
+    def from_snapshot(cls, snapshot, aggregate=FACE_AGGREGATE, index=FACE_INDEX, **index_args):
+        """Gallery over an EmbeddingStore snapshot (rows are stored normalized)"""
+        gallery = cls(None, aggregate, index, **index_args)
+        if not len(snapshot):
+            return gallery
+
+        gallery.index = make_index(index, snapshot.dim, **index_args)
+        if hasattr(gallery.index, "attach"):
+            # Search the memory-mapped matrix in place, shared with other processes
+            gallery.index.attach(snapshot.labels, snapshot.vectors, snapshot.live())
+        else:
+            gallery._bulk_add(snapshot.workers().items())
+        return gallery
+
+    def _bulk_add(self, items):
+        # Bulk load: fit the index to the whole gallery once at the end
+        # instead of training on the first few workers
+        self._loading = True
+        for worker_id, vectors in items:
+            self.add(worker_id, vectors)
+        self._loading = False
+        if self.index is not None and hasattr(self.index, "train"):
+            self.index.train()
+
+    def __len__(self):
+        return len(self.index) if self.index is not None else 0
+
+    def add(self, worker_id, vectors):
+        """Enroll (or extend) a worker with one or more embeddings"""
+        vectors = l2_normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if self.index is None:
+            self.index = make_index(self.index_kind, vectors.shape[1], **self.index_args)
+            if self._loading and hasattr(self.index, "defer_training"):
+                self.index.defer_training = True
+        self.index.add(worker_id, np.ascontiguousarray(vectors))
+
+    def remove(self, worker_id):
+        return self.index is not None and self.index.remove(worker_id)
+
+    def match(self, embedding):
+        """Return (worker_id, cosine score) of the best match, or (None, -1.0) if empty"""
+        if self.index is None:
+            return None, -1.0
+
+        labels, scores = self.index.search(l2_normalize(embedding))
+        if not len(labels):
+            return None, -1.0
+
+        if self.aggregate == "max":
+            best = int(np.argmax(scores))
+            return self.index.ids[labels[best]], float(scores[best])
+
+        n = len(self.index.ids)
+        counts = np.bincount(labels, minlength=n)
+        per_worker = np.bincount(labels, weights=scores, minlength=n)
+        per_worker = np.where(counts > 0, per_worker / np.maximum(counts, 1), -np.inf)
+        best = int(np.argmax(per_worker))
+        return self.index.ids[best], float(per_worker[best])
@@ -0,0 +1,273 @@
+import os
+import numpy as np
+
+# Gallery search backend: "flat" = exact, "ivf" = inverted-file approximate
+FACE_INDEX = os.environ.get("SITESAFE_FACE_INDEX", "flat")
+# IVF: lists probed per query (more = better recall, slower)
+IVF_NPROBE = int(os.environ.get("SITESAFE_FACE_NPROBE", 16))
+# IVF: train the coarse quantizer once this many vectors per list are enrolled
+IVF_MIN_PER_LIST = 16
+# IVF: k-means runs on at most this many sampled vectors per list
+IVF_TRAIN_PER_LIST = 64
+
+
+class _Labels:
+    """Worker id <-> small int label used inside the index arrays"""
+
+    def __init__(self):
+        self.ids = []
+        self.label_of = {}
+
+    def get(self, worker_id, create=False):
+        label = self.label_of.get(worker_id)
+        if label is None and create:
+            label = len(self.ids)
+            self.ids.append(worker_id)
+            self.label_of[worker_id] = label
+        return label
+
+    def drop(self, worker_id):
+        label = self.label_of.pop(worker_id, None)
+        if label is not None:
+            self.ids[label] = None
+        return label
+
+
+class _Rows:
+    """Growable (vectors, labels) buffer, appended to in amortized O(n)"""
+
+    def __init__(self, dim, capacity=64):
+        self.vectors = np.empty((capacity, dim), dtype=np.float32)
+        self.labels = np.empty(capacity, dtype=np.int32)
+        self.size = 0
+
+    @classmethod
+    def wrap(cls, vectors, labels):
+        """Use existing arrays as the buffer without copying (grows into a new one)"""
+        rows = cls.__new__(cls)
+        rows.vectors, rows.labels, rows.size = vectors, labels, len(labels)
+        return rows
+
+    def append(self, vectors, labels):
+        n = len(vectors)
+        need = self.size + n
+        cap = max(len(self.labels), 1)
+        if need > len(self.labels):
+            while cap < need:
+                cap *= 2
+            grown = _Rows(self.vectors.shape[1], cap)
+            grown.vectors[:self.size] = self.vectors[:self.size]
+            grown.labels[:self.size] = self.labels[:self.size]
+            self.vectors, self.labels = grown.vectors, grown.labels
+        self.vectors[self.size:need] = vectors
+        self.labels[self.size:need] = labels
+        self.size = need
+
+    def keep(self, mask):
+        n = int(mask.sum())
+        self.vectors[:n] = self.vectors[:self.size][mask]
+        self.labels[:n] = self.labels[:self.size][mask]
+        self.size = n
+
+    def view(self):
+        return self.labels[:self.size], self.vectors[:self.size]
+
+
+class FlatIndex:
+    """
+    Exact search: every row is scored. Rows live in one growable matrix;
+    removing a worker moves the last rows into the freed slots, so nothing
+    is ever rebuilt.
+    """
+
+    kind = "flat"
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.labels_table = _Labels()
+        self.rows = _Rows(dim)
+        self.rows_of = {}
+
+    @property
+    def ids(self):
+        return self.labels_table.ids
+
+    def __len__(self):
+        return len(self.rows_of)
+
+    def add(self, worker_id, vectors):
+        """Append normalized (n, dim) vectors for a worker"""
+        label = self.labels_table.get(worker_id, create=True)
+        start = self.rows.size
+        self.rows.append(vectors, label)
+        self.rows_of.setdefault(label, set()).update(range(start, self.rows.size))
+
+    def attach(self, worker_ids, vectors, live=None):
+        """
+        Adopt an already-normalized (n, dim) matrix, one worker id per row,
+        as the index storage without copying it (e.g. the store's memory
+        map). Rows where the `live` mask is False are dropped like a removed
+        worker, which only rewrites their slots. Only valid on an empty index.
+        """
+        if live is not None:
+            dead = object()
+            worker_ids = [w if keep else dead for w, keep in zip(worker_ids, live)]
+        labels = np.fromiter(
+            (self.labels_table.get(w, create=True) for w in worker_ids), dtype=np.int32, count=len(worker_ids)
+        )
+        self.rows = _Rows.wrap(vectors, labels)
+        for row, label in enumerate(labels.tolist()):
+            self.rows_of.setdefault(label, set()).add(row)
+        if live is not None:
+            self.remove(dead)
+
+    def remove(self, worker_id):
+        label = self.labels_table.drop(worker_id)
+        if label is None:
+            return False
+
+        # Fill each freed slot (highest first) with the current last row
+        rows = self.rows
+        for row in sorted(self.rows_of.pop(label), reverse=True):
+            last = rows.size - 1
+            if row != last:
+                moved = int(rows.labels[last])
+                rows.vectors[row] = rows.vectors[last]
+                rows.labels[row] = moved
+                slots = self.rows_of[moved]
+                slots.discard(last)
+                slots.add(row)
+            rows.size -= 1
+        return True
+
+    def search(self, query):
+        """(labels, scores) of the candidate rows for a normalized query"""
+        labels, vectors = self.rows.view()
+        return labels, vectors @ query
+
+
+class IVFIndex:
+    """
+    Inverted-file index: k-means centroids split the gallery into lists
+    and a query only scores the `nprobe` lists nearest to it. Adds go
+    straight into their nearest list and removes delete from the lists
+    that hold the worker; the quantizer is trained once enough vectors are
+    enrolled (until then it behaves as a single exact list). Call train()
+    to re-balance after the gallery has grown a lot.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim, nlist=None, nprobe=IVF_NPROBE):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.labels_table = _Labels()
+        self.centroids = None
+        self.lists = [_Rows(dim)]
+        self.lists_of = {}
+        self.count = 0
+        self.defer_training = False
+
+    @property
+    def ids(self):
+        return self.labels_table.ids
+
+    def __len__(self):
+        return len(self.lists_of)
+
+    def _assign(self, vectors):
+        if self.centroids is None:
+            return np.zeros(len(vectors), dtype=np.int64)
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def add(self, worker_id, vectors):
+        label = self.labels_table.get(worker_id, create=True)
+        assign = self._assign(vectors)
+        lists = self.lists_of.setdefault(label, set())
+
+        for li in np.unique(assign):
+            self.lists[li].append(vectors[assign == li], label)
+            lists.add(int(li))
+        self.count += len(vectors)
+
+        nlist = self.nlist or self._auto_nlist()
+        if (self.centroids is None and not self.defer_training
+                and nlist > 1 and self.count >= nlist * IVF_MIN_PER_LIST):
+            self.train()
+
+    def remove(self, worker_id):
+        label = self.labels_table.drop(worker_id)
+        if label is None:
+            return False
+        for li in self.lists_of.pop(label):
+            rows = self.lists[li]
+            keep = rows.labels[:rows.size] != label
+            self.count -= rows.size - int(keep.sum())
+            rows.keep(keep)
+        return True
+
+    def _auto_nlist(self):
+        return max(1, int(np.sqrt(max(self.count, 1))))
+
+    def train(self, iters=10, seed=0):
+        """(Re)build the centroids with spherical k-means and redistribute every vector"""
+        self.defer_training = False
+        views = [rows.view() for rows in self.lists]
+        labels = np.concatenate([l for l, _ in views])
+        vectors = np.concatenate([v for _, v in views])
+        nlist = min(self.nlist or self._auto_nlist(), len(vectors))
+        if nlist < 1:
+            return
+
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if len(vectors) > nlist * IVF_TRAIN_PER_LIST:
+            sample = vectors[rng.choice(len(vectors), nlist * IVF_TRAIN_PER_LIST, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+            filled = bounds[1:] > bounds[:-1]
+            sums = centroids.copy()
+            sums[filled] = np.add.reduceat(sample[order], bounds[:-1][filled])
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        self.centroids = centroids.astype(np.float32)
+        assign = self._assign(vectors)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+
+        self.lists = []
+        self.lists_of = {label: set() for label in self.lists_of}
+        for li in range(nlist):
+            rows = order[bounds[li]:bounds[li + 1]]
+            self.lists.append(_Rows(self.dim, max(len(rows), 16)))
+            self.lists[li].append(vectors[rows], labels[rows])
+            for label in np.unique(labels[rows]):
+                self.lists_of[int(label)].add(li)
+
+    def search(self, query):
+        if self.centroids is None:
+            probe = [0]
+        else:
+            nprobe = min(self.nprobe, len(self.centroids))
+            probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+        views = [self.lists[li].view() for li in probe]
+        labels = np.concatenate([l for l, _ in views])
+        scores = np.concatenate([v @ query for _, v in views])
+        return labels, scores
+
+
+INDEXES = {
+    "flat": FlatIndex,
+    "ivf": IVFIndex,
+}
+
+
+def make_index(kind, dim, **kwargs):
+    if kind not in INDEXES:
+        raise ValueError(f"Unknown face index '{kind}' (use one of {sorted(INDEXES)})")
+    return INDEXES[kind](dim, **kwargs)
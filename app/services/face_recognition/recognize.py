@@ -1,17 +1,29 @@
 import os
-import pickle
+import time
+import logging
 import numpy as np
 import cv2
 from insightface.app import FaceAnalysis
+from insightface.app.common import Face
 
-BASE_DIR = os.path.dirname(__file__)
-DB_FILE = os.path.join(BASE_DIR, "embeddings.pkl")
+from .gallery import FaceGallery, l2_normalize
+from .store import open_store
 
-print("📂 Loading Face DB from:", DB_FILE)
-with open(DB_FILE, "rb") as f:
-    DB = pickle.load(f)
+logger = logging.getLogger("sitesafeai")
 
-print("👥 Workers in DB:", list(DB.keys()))
+# Face DB: memory-mapped embedding store (imports embeddings.pkl on first run)
+STORE = open_store()
+print("📂 Loading Face DB from:", STORE.meta_path)
+SNAPSHOT = STORE.load()
+
+print("👥 Workers in DB:", SNAPSHOT.worker_ids())
+
+# Stored normalized; recognize_worker only does one mat-vec per face
+GALLERY = FaceGallery.from_snapshot(SNAPSHOT)
+
+# Seconds between checks for a re-enrolled store on disk (0 = never reload)
+RELOAD_INTERVAL = float(os.environ.get("SITESAFE_FACE_RELOAD", 5))
+_last_reload_check = time.monotonic()
 
 app = FaceAnalysis(name="buffalo_l", providers=["CPUExecutionProvider"])
 app.prepare(ctx_id=0)
@@ -19,8 +31,34 @@ app.prepare(ctx_id=0)
 # 🔐 STRICT threshold (very important)
 THRESHOLD = 0.55
 
-def l2_normalize(x):
-    return x / np.linalg.norm(x)
+# Detector input for person crops: a face fills far more of a crop than of
+# a whole frame, so a quarter of the full-frame detector cost is enough
+CROP_DET_SIZE = (320, 320)
+
+# Write the matched face crop to debug_face.jpg (off by default: it's a disk write per call)
+DEBUG_FACE = os.environ.get("SITESAFE_FACE_DEBUG", "0") == "1"
+
+
+def current_gallery():
+    """The gallery, swapped for a fresh one when the store has changed on disk"""
+    global GALLERY, _last_reload_check
+
+    now = time.monotonic()
+    if RELOAD_INTERVAL <= 0 or now - _last_reload_check < RELOAD_INTERVAL:
+        return GALLERY
+    _last_reload_check = now
+
+    try:
+        snapshot = STORE.refresh()
+    except Exception as e:
+        # Caught mid-rewrite (or a broken store): keep matching against the
+        # old gallery; changed() stays True so the next check retries
+        logger.warning(f"⚠ Face DB reload failed, keeping the current gallery: {e}")
+        return GALLERY
+    if snapshot is not None:
+        GALLERY = FaceGallery.from_snapshot(snapshot)
+        logger.info(f"🔄 Face DB reloaded: generation {snapshot.generation}, {len(GALLERY)} workers")
+    return GALLERY
 
 
 def recognize_worker(image):
@@ -44,30 +82,39 @@ def recognize_worker(image):
         return "UNKNOWN"
 
     # 🔍 DEBUG — overwrite every frame
-    cv2.imwrite("debug_face.jpg", face_crop)
+    if DEBUG_FACE:
+        cv2.imwrite("debug_face.jpg", face_crop)
 
-    emb = l2_normalize(face.embedding)
+    return match_embedding(face.embedding)
 
-    best_id = "UNKNOWN"
-    best_score = -1.0
 
-    for worker_id, vectors in DB.items():
-        for v in vectors:
-            v = l2_normalize(v)
-            score = float(np.dot(emb, v))
+def recognize_crop(image):
+    """
+    Identify the face in a person crop (BGR, like the enrollment images).
+    Runs only the detector, at CROP_DET_SIZE and keeping one face, and the
+    recognition model; the landmark and gender/age heads that
+    app.get() also runs are skipped.
+    """
+    bboxes, kpss = app.det_model.detect(image, input_size=CROP_DET_SIZE, max_num=1)
+    if bboxes is None or len(bboxes) == 0 or kpss is None:
+        return "UNKNOWN"
+
+    face = Face(bbox=bboxes[0, :4], kps=kpss[0], det_score=bboxes[0, 4])
+    app.models["recognition"].get(image, face)
+    return match_embedding(face.embedding)
 
-            print(f"🔍 Comparing with {worker_id}, score={score:.3f}")
 
-            if score > best_score:
-                best_score = score
-                best_id = worker_id
+def match_embedding(embedding):
+    best_id, best_score = current_gallery().match(embedding)
+    if best_id is None:
+        best_id = "UNKNOWN"
 
-    print(f"🏆 Best match: {best_id} | Score: {best_score:.3f}")
+    logger.debug(f"🏆 Best match: {best_id} | Score: {best_score:.3f}")
 
     # 🚨 HARD REJECTION
     if best_score < THRESHOLD:
-        print("🚫 Rejected → UNKNOWN")
+        logger.debug("🚫 Rejected → UNKNOWN")
         return "UNKNOWN"
 
-    print("✅ Accepted:", best_id)
+    logger.debug(f"✅ Accepted: {best_id}")
     return best_id
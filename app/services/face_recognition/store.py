@@ -0,0 +1,356 @@
+"""
+On-disk face embedding store.
+
+Two files per store (default base: face_recognition/embeddings):
+
+  embeddings-<generation>.f32   64-byte header (magic, format version, dim)
+                                followed by L2-normalized float32 rows
+  embeddings.json               sidecar: generation, data file name, row
+                                count, one worker id per row, removed rows,
+                                enrolled source images
+
+The sidecar is the commit point: it is written to a temp file and swapped
+in with os.replace, and readers only trust the first `rows` rows of the
+data file. Appends write the new rows first and then the sidecar, so a
+reader never sees a half-written enrollment. Rewrites (compact) go to a
+new generation-named data file, so a process still mapping the old one
+keeps a consistent view.
+
+Readers memory-map the matrix copy-on-write: every server process shares
+the same page-cache pages, and nothing is unpickled at start-up.
+
+Import an existing pickle once with:
+    python -m app.services.face_recognition.store --import embeddings.pkl
+"""
+import os
+import sys
+import json
+import glob
+import pickle
+import struct
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("sitesafeai")
+
+BASE_DIR = os.path.dirname(__file__)
+STORE_BASE = os.path.join(BASE_DIR, "embeddings")
+LEGACY_PICKLE = os.path.join(BASE_DIR, "embeddings.pkl")
+
+MAGIC = b"SSFE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sII")
+HEADER_SIZE = 64
+
+# Rewrite the data file once this share of rows is tombstoned
+COMPACT_RATIO = 0.25
+
+
+def _normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norm = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norm, 1e-12)
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """
+    One consistent generation of the store: worker id per row + vectors.
+    Rows keep their store row ids; tombstoned ones are still in `labels`
+    and `vectors` (so the matrix stays mapped) and are listed in `removed`.
+    """
+
+    def __init__(self, generation, dim, labels, vectors, sources, removed=()):
+        self.generation = generation
+        self.dim = dim
+        self.labels = labels
+        self.vectors = vectors
+        self.sources = sources
+        self.removed = frozenset(removed)
+
+    def __len__(self):
+        return len(self.labels) - len(self.removed)
+
+    def live(self):
+        """Bool mask of the rows that are not tombstoned, or None if all are live"""
+        if not self.removed:
+            return None
+        live = np.ones(len(self.labels), dtype=bool)
+        live[list(self.removed)] = False
+        return live
+
+    def worker_ids(self):
+        """Live worker ids, in enrollment order"""
+        return list(dict.fromkeys(
+            worker_id for i, worker_id in enumerate(self.labels) if i not in self.removed
+        ))
+
+    def workers(self):
+        """{worker_id: (n, dim) vectors} of the live rows, in enrollment order"""
+        rows = {}
+        for i, worker_id in enumerate(self.labels):
+            if i not in self.removed:
+                rows.setdefault(worker_id, []).append(i)
+        return {worker_id: self.vectors[r] for worker_id, r in rows.items()}
+
+
+class EmbeddingStore:
+    """
+    Append-only embedding matrix + JSON sidecar (see module docstring).
+    Any number of processes may read; writes are expected from a single
+    enrollment process at a time.
+    """
+
+    def __init__(self, base=STORE_BASE):
+        self.base = base
+        self.meta_path = f"{base}.json"
+        self._lock = threading.RLock()
+        self._stat = None
+
+    # ---------------- Metadata ----------------
+
+    def exists(self):
+        return os.path.exists(self.meta_path)
+
+    def _data_path(self, generation):
+        return f"{self.base}-{generation}.f32"
+
+    def _read_meta(self):
+        with open(self.meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported embedding store format {meta.get('format')} in {self.meta_path}")
+        return meta
+
+    def _stat_key(self):
+        try:
+            st = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def generation(self):
+        return self._read_meta()["generation"] if self.exists() else 0
+
+    # ---------------- Reading ----------------
+
+    def load(self):
+        """Map the current generation; returns a Snapshot (empty if there is no store)"""
+        # Taken before reading, and only recorded once the read succeeded:
+        # a failed or raced load leaves changed() True so the next refresh retries
+        stat = self._stat_key()
+        if stat is None:
+            self._stat = stat
+            return Snapshot(0, 0, [], np.empty((0, 0), dtype=np.float32), {})
+
+        meta = self._read_meta()
+        dim, rows = meta["dim"], meta["rows"]
+        if meta["data"] is None:
+            self._stat = stat
+            return Snapshot(meta["generation"], dim, [], np.empty((0, dim), dtype=np.float32), meta["sources"])
+        path = os.path.join(os.path.dirname(self.meta_path), meta["data"])
+
+        with open(path, "rb") as f:
+            magic, version, file_dim = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION or file_dim != dim:
+            raise ValueError(f"Embedding data file {path} does not match its sidecar")
+
+        if rows:
+            # Copy-on-write: shared with every other reader until someone writes
+            vectors = np.memmap(path, dtype=np.float32, mode="c", offset=HEADER_SIZE, shape=(rows, dim))
+        else:
+            vectors = np.empty((0, dim), dtype=np.float32)
+
+        self._stat = stat
+        return Snapshot(meta["generation"], dim, meta["labels"], vectors, meta["sources"], meta["removed"])
+
+    def changed(self):
+        """True if the sidecar changed on disk since the last load()"""
+        return self._stat_key() != self._stat
+
+    def refresh(self):
+        """A new Snapshot if the store changed since the last load(), else None"""
+        if not self.changed():
+            return None
+        return self.load()
+
+    # ---------------- Writing ----------------
+
+    def _empty_meta(self, dim):
+        return {
+            "format": FORMAT_VERSION, "generation": 0, "dim": dim, "data": None,
+            "rows": 0, "labels": [], "removed": [], "sources": {},
+        }
+
+    def _new_data_file(self, generation, dim, vectors):
+        path = self._data_path(generation)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, dim).ljust(HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return os.path.basename(path)
+
+    def _drop_stale_files(self, keep):
+        for path in glob.glob(f"{glob.escape(self.base)}-*.f32"):
+            if os.path.basename(path) == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # Still mapped by a reader on Windows; retried on the next rewrite
+                pass
+
+    def write(self, labels, vectors, sources=None):
+        """Replace the whole store with a new generation"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(labels):
+            vectors = _normalize(vectors)
+        with self._lock:
+            meta = self._read_meta() if self.exists() else self._empty_meta(0)
+            if vectors.ndim == 2 and vectors.shape[1]:
+                meta["dim"] = vectors.shape[1]
+            generation = meta["generation"] + 1
+
+            meta.update(
+                generation=generation, rows=len(labels), labels=list(labels), removed=[],
+                sources=sources if sources is not None else meta["sources"],
+            )
+            meta["data"] = self._new_data_file(generation, meta["dim"], vectors)
+            _write_json(self.meta_path, meta)
+            self._drop_stale_files(meta["data"])
+        logger.info(f"Embedding store generation {generation}: {len(labels)} rows")
+        return generation
+
+    def append(self, worker_ids, vectors, sources=None):
+        """
+        Add rows without touching the existing ones. `worker_ids` is one id
+        for every row or a list with one per row. `sources` ({path: info})
+        is merged into the sidecar; a "rows" list in an info gives positions
+        within `vectors` and is rewritten to store row ids. Returns the new
+        row ids.
+        """
+        vectors = _normalize(vectors)
+        if isinstance(worker_ids, str):
+            worker_ids = [worker_ids] * len(vectors)
+        if len(worker_ids) != len(vectors):
+            raise ValueError(f"{len(worker_ids)} worker ids for {len(vectors)} embeddings")
+
+        with self._lock:
+            if not self.exists() or not self._read_meta()["dim"]:
+                self.write([], np.empty((0, vectors.shape[1]), dtype=np.float32))
+            meta = self._read_meta()
+            if vectors.shape[1] != meta["dim"]:
+                raise ValueError(f"Embedding dim {vectors.shape[1]} != store dim {meta['dim']}")
+
+            path = os.path.join(os.path.dirname(self.meta_path), meta["data"])
+            start = meta["rows"]
+            with open(path, "r+b") as f:
+                # Anything past `rows` is a leftover from an interrupted append
+                f.seek(HEADER_SIZE + start * meta["dim"] * 4)
+                f.write(np.ascontiguousarray(vectors).tobytes())
+                if os.fstat(f.fileno()).st_size > f.tell():
+                    f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+
+            for source, info in (sources or {}).items():
+                if "rows" in info:
+                    info = dict(info, rows=[start + r for r in info["rows"]])
+                meta["sources"][source] = info
+            meta["rows"] = start + len(vectors)
+            meta["labels"].extend(worker_ids)
+            meta["generation"] += 1
+            _write_json(self.meta_path, meta)
+        return list(range(start, start + len(vectors)))
+
+    def update_sources(self, sources):
+        """Merge source entries that add no rows (e.g. images with no face)"""
+        with self._lock:
+            meta = self._read_meta() if self.exists() else self._empty_meta(0)
+            meta["sources"].update(sources)
+            meta["generation"] += 1
+            _write_json(self.meta_path, meta)
+
+    def remove_rows(self, rows, sources=()):
+        """Tombstone rows (and forget their source entries); compacts when many are dead"""
+        with self._lock:
+            meta = self._read_meta()
+            meta["removed"] = sorted(set(meta["removed"]) | set(rows))
+            for source in sources:
+                meta["sources"].pop(source, None)
+            meta["generation"] += 1
+            _write_json(self.meta_path, meta)
+            ratio = len(meta["removed"]) / max(meta["rows"], 1)
+
+        if ratio >= COMPACT_RATIO:
+            self.compact()
+
+    def remove_worker(self, worker_id):
+        meta = self._read_meta()
+        rows = [i for i, label in enumerate(meta["labels"]) if label == worker_id]
+        sources = [s for s, info in meta["sources"].items() if info.get("worker") == worker_id]
+        if rows:
+            self.remove_rows(rows, sources)
+        return len(rows)
+
+    def compact(self):
+        """Rewrite the data file without tombstoned rows (renumbers rows in `sources`)"""
+        snapshot = self.load()
+        live = [i for i in range(len(snapshot.labels)) if i not in snapshot.removed]
+        new_row = {old: new for new, old in enumerate(live)}
+
+        sources = {}
+        for source, info in snapshot.sources.items():
+            info = dict(info)
+            if "rows" in info:
+                info["rows"] = [new_row[r] for r in info["rows"] if r in new_row]
+            sources[source] = info
+
+        labels = [snapshot.labels[i] for i in live]
+        vectors = snapshot.vectors[live] if live else np.empty((0, snapshot.dim), dtype=np.float32)
+        return self.write(labels, vectors, sources)
+
+    def import_pickle(self, path=LEGACY_PICKLE):
+        """One-off migration from the old {worker_id: [embedding, ...]} pickle"""
+        with open(path, "rb") as f:
+            db = pickle.load(f)
+
+        labels, vectors = [], []
+        for worker_id, embeddings in db.items():
+            for embedding in embeddings:
+                labels.append(worker_id)
+                vectors.append(np.asarray(embedding, dtype=np.float32))
+
+        if not vectors:
+            raise ValueError(f"No embeddings in {path}")
+        return self.write(labels, np.stack(vectors))
+
+
+def open_store(base=STORE_BASE, legacy=LEGACY_PICKLE):
+    """The default store, importing the legacy embeddings.pkl the first time"""
+    store = EmbeddingStore(base)
+    if not store.exists() and legacy and os.path.exists(legacy):
+        logger.info(f"Importing legacy face DB {legacy} into {store.meta_path}")
+        store.import_pickle(legacy)
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--import":
+        generation = EmbeddingStore().import_pickle(sys.argv[2])
+        print(f"✅ Imported {sys.argv[2]} (generation {generation})")
+    elif len(sys.argv) == 2 and sys.argv[1] == "--compact":
+        print(f"✅ Compacted (generation {EmbeddingStore().compact()})")
+    else:
+        print("usage: python -m app.services.face_recognition.store --import embeddings.pkl | --compact")
+        sys.exit(2)
@@ -1,13 +1,15 @@
+import os
 import cv2
 import numpy as np
 import logging
-from openvino import Core
+import atexit
 import threading
+import concurrent.futures
+from openvino import Core, AsyncInferQueue, Type, Layout
+from openvino.preprocess import PrePostProcessor, ColorFormat
 
 logger = logging.getLogger("sitesafeai")
 
-infer_lock = threading.Lock()
-
 # ================= CLASS NAMES =================
 CLASS_NAMES = [
     "Hardhat",
@@ -23,15 +25,61 @@ CLASS_NAMES = [
 ]
 
 # ================= OPENVINO INIT =================
+# Number of infer requests kept in flight (0 = let OpenVINO pick the optimum)
+INFER_JOBS = int(os.getenv("SITESAFE_INFER_JOBS", "0"))
+# THROUGHPUT lets parallel requests run on separate CPU streams
+PERFORMANCE_HINT = os.getenv("SITESAFE_PERFORMANCE_HINT", "THROUGHPUT")
+
+# Fold u8 NHWC → f32 NCHW conversion and /255 into the compiled graph,
+# so the hot path hands the runtime the letterboxed uint8 frame as-is
+USE_PREPROCESS_GRAPH = os.getenv("SITESAFE_PREPROCESS_GRAPH", "0") == "1"
+# The NumPy path feeds BGR; keep it that way unless explicitly switched
+PREPROCESS_BGR_TO_RGB = os.getenv("SITESAFE_BGR_TO_RGB", "0") == "1"
+
+MODEL_PATH = "best_int8_model/best.xml"
+
 core = Core()
 
+
+def embed_preprocessing(ov_model):
+    """
+    Build the input conversion into the model with OpenVINO's
+    PrePostProcessor: u8 NHWC BGR in, f32 NCHW / 255 out. Aspect-preserving
+    letterbox resize stays in cv2 (on uint8) because decode relies on its
+    scale/pad; a graph resize would stretch the frame.
+    """
+    ppp = PrePostProcessor(ov_model)
+    ppp.input().tensor() \
+        .set_element_type(Type.u8) \
+        .set_layout(Layout("NHWC")) \
+        .set_color_format(ColorFormat.BGR)
+    ppp.input().model().set_layout(Layout("NCHW"))
+
+    steps = ppp.input().preprocess().convert_element_type(Type.f32)
+    if PREPROCESS_BGR_TO_RGB:
+        steps.convert_color(ColorFormat.RGB)
+    steps.scale(255.0)
+
+    return ppp.build()
+
+
+def compile_yolo(batch=1, preprocess_graph=USE_PREPROCESS_GRAPH, hint=PERFORMANCE_HINT):
+    """Read and compile the IR, optionally reshaped to `batch` / with embedded preprocessing"""
+    ov_model = core.read_model(MODEL_PATH)
+    if batch != 1:
+        ov_model.reshape([batch, 3, INPUT_H, INPUT_W])
+    if preprocess_graph:
+        ov_model = embed_preprocessing(ov_model)
+    return core.compile_model(ov_model, "CPU", {"PERFORMANCE_HINT": hint})
+
+
 logger.info("Loading OpenVINO YOLOv8 INT8 model...")
 
-model = core.read_model("best_int8_model/best.xml")
-compiled_model = core.compile_model(model, "CPU")
+model = core.read_model(MODEL_PATH)
+_, _, INPUT_H, INPUT_W = model.input(0).shape
 
+compiled_model = compile_yolo()
 input_layer = compiled_model.input(0)
-_, _, INPUT_H, INPUT_W = input_layer.shape
 
 output_layers = compiled_model.outputs  # IMPORTANT: multiple heads
 
@@ -71,22 +119,178 @@ def nms(detections, iou_thresh):
 
 
 # ================= INFERENCE =================
-def infer_openvino(frame):
-    img_lb, scale, pad_x, pad_y = letterbox(frame, (INPUT_W, INPUT_H))
+def preprocess(img_lb, preprocess_graph=USE_PREPROCESS_GRAPH):
+    """
+    Letterboxed HWC uint8 → model input. NCHW float32 in [0, 1], or with
+    the preprocessing graph just a zero-copy NHWC uint8 view.
+    """
+    if preprocess_graph:
+        return img_lb[np.newaxis]
 
     inp = img_lb.transpose(2, 0, 1)
-    inp = np.expand_dims(inp, axis=0).astype(np.float32) / 255.0
+    return np.expand_dims(inp, axis=0).astype(np.float32) / 255.0
+
+
+class InferenceEngine:
+    """
+    Pool of OpenVINO infer requests driven by an AsyncInferQueue.
+
+    submit() letterboxes on the caller's thread, starts an async request and
+    returns a Future that resolves to (output, scale, pad_x, pad_y) - the
+    same tuple infer_openvino returns. Up to `jobs` requests run at once, so
+    the live stream and uploads overlap instead of queueing on one lock.
+    """
+
+    def __init__(self, compiled, jobs=0, preprocess_graph=USE_PREPROCESS_GRAPH):
+        self.compiled = compiled
+        self.preprocess_graph = preprocess_graph
+        self.queue = AsyncInferQueue(compiled, jobs)
+        self.queue.set_callback(self._on_done)
+        self.jobs = len(self.queue)
+
+        # start_async blocks while every request is busy; the lock only
+        # serializes that hand-off, inference itself runs in parallel
+        self._submit_lock = threading.Lock()
 
-    with infer_lock:
-        result = compiled_model([inp])
-        output = result[compiled_model.outputs[0]]
-    
+        # Tearing the queue down while a callback is still running aborts
+        # the interpreter, so drain it on exit
+        atexit.register(self.wait_all)
 
-    # return all heads
-    return output, scale, pad_x, pad_y
+        logger.info(f"Inference engine ready with {self.jobs} infer requests")
+
+    def _on_done(self, request, userdata):
+        future, scale, pad_x, pad_y = userdata
+        try:
+            # The request is recycled as soon as we return, so copy the output
+            output = request.get_output_tensor(0).data.copy()
+            future.set_result((output, scale, pad_x, pad_y))
+        except Exception as e:
+            future.set_exception(e)
+
+    def submit(self, frame):
+        img_lb, scale, pad_x, pad_y = letterbox(frame, (INPUT_W, INPUT_H))
+        inp = preprocess(img_lb, self.preprocess_graph)
+
+        future = concurrent.futures.Future()
+        with self._submit_lock:
+            self.queue.start_async({0: inp}, (future, scale, pad_x, pad_y))
+        return future
+
+    def wait_all(self):
+        self.queue.wait_all()
+
+
+engine = InferenceEngine(compiled_model, INFER_JOBS)
+
+
+def infer_async(frame):
+    """Submit a frame, get a Future of (output, scale, pad_x, pad_y)"""
+    return engine.submit(frame)
+
+
+def infer_openvino(frame):
+    # Blocking wrapper kept for existing callers
+    return engine.submit(frame).result()
 
 
 # ================= YOLOv8 DFL DECODER =================
+def nms_boxes(boxes, scores, iou_thresh, class_ids=None):
+    """
+    Greedy NMS over integer xyxy boxes, fully in NumPy.
+    Returns kept indices ordered by descending score (ties keep input order,
+    same as the dict-based `nms`). Pass `class_ids` to make it class-aware:
+    boxes are shifted per class so different classes never overlap.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    boxes = boxes.astype(np.int64, copy=False)
+    if class_ids is not None:
+        offset = np.asarray(class_ids, dtype=np.int64) * (int(boxes.max()) + 1)
+        boxes = boxes + offset[:, None]
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        w = np.maximum(0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-6)
+        order = rest[iou < iou_thresh]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def _unletterbox(cx, cy, w, h, scale, pad_x, pad_y, img_w, img_h):
+    """
+    xywh (letterbox space) → clamped int64 xyxy (frame space).
+    scale/pad/img size are scalars, or per-row arrays shaped like cx.
+    """
+    boxes = np.empty((len(cx), 4), dtype=cx.dtype)
+    boxes[:, 0] = ((cx - w / 2) - pad_x) / scale
+    boxes[:, 1] = ((cy - h / 2) - pad_y) / scale
+    boxes[:, 2] = ((cx + w / 2) - pad_x) / scale
+    boxes[:, 3] = ((cy + h / 2) - pad_y) / scale
+
+    # Clamp, then truncate like int()
+    for col, hi in ((0, img_w), (1, img_h), (2, img_w), (3, img_h)):
+        np.clip(boxes[:, col], 0, hi, out=boxes[:, col])
+
+    return boxes.astype(np.int64)
+
+
+def decode_yolov8_arrays(
+    output,
+    frame_shape,
+    scale,
+    pad_x,
+    pad_y,
+    conf_thresh=0.25
+):
+    """
+    Array half of the decoder: confidence mask, xywh → xyxy, unletterbox, clamp.
+    Returns (boxes int64 [K, 4], confidences float32 [K], class_ids int64 [K])
+    in anchor order, before NMS.
+    """
+    img_h, img_w = frame_shape[:2]
+
+    # [1, 4 + num_classes, N] → [4 + num_classes, N] (no transpose copy)
+    preds = output[0]
+    scores = preds[4:]
+
+    # Confidence mask first so argmax / box math only touches candidates
+    confidences = scores.max(axis=0)
+    idx = np.flatnonzero(~(confidences < conf_thresh))
+
+    confidences = confidences[idx]
+    class_ids = scores[:, idx].argmax(axis=0)
+    cx, cy, w, h = preds[:4, idx]
+
+    boxes = _unletterbox(cx, cy, w, h, scale, pad_x, pad_y, img_w, img_h)
+
+    return boxes, confidences, class_ids.astype(np.int64)
+
+
+def detections_from_arrays(boxes, confidences, class_ids, keep):
+    """Build the public detection dicts for the NMS survivors only"""
+    return [
+        {
+            "class": CLASS_NAMES[int(class_ids[i])],
+            "confidence": float(confidences[i]),
+            "bbox": tuple(int(v) for v in boxes[i])
+        }
+        for i in keep
+    ]
+
+
 def decode_yolov8_flat(
     output,
     frame_shape,
@@ -94,55 +298,150 @@ def decode_yolov8_flat(
     pad_x,
     pad_y,
     conf_thresh=0.25,
-    iou_thresh=0.5
+    iou_thresh=0.5,
+    class_aware=False
 ):
     """
-    output shape: [1, N, 4 + num_classes]
+    output shape: [1, 4 + num_classes, N]
     boxes are xywh (center-based) in letterbox space
+
+    Vectorized: only the NMS survivors are turned into dicts. With the
+    default class_aware=False the result is identical to the old per-row
+    loop + `nms` (which suppressed across classes).
     """
+    boxes, confidences, class_ids = decode_yolov8_arrays(
+        output, frame_shape, scale, pad_x, pad_y, conf_thresh
+    )
 
-    img_h, img_w = frame_shape[:2]
-    output = output.squeeze(0).T
+    keep = nms_boxes(
+        boxes,
+        confidences,
+        iou_thresh,
+        class_ids=class_ids if class_aware else None
+    )
+
+    return detections_from_arrays(boxes, confidences, class_ids, keep)
+
+
+# ================= BATCHED INFERENCE =================
+# Frames per infer call for offline video processing
+VIDEO_BATCH = int(os.getenv("SITESAFE_VIDEO_BATCH", "8"))
+
+_batched_models = {}
+_batched_lock = threading.Lock()
+
+
+class _BatchedModel:
+    """A batch-N compile plus its one reusable infer request"""
+
+    def __init__(self, batch):
+        # One blocking request per call: LATENCY lets it use every core,
+        # THROUGHPUT streams would only pay off with several in flight
+        self.compiled = compile_yolo(batch, hint="LATENCY")
+        self.request = self.compiled.create_infer_request()
+        self.lock = threading.Lock()
+
+    def infer(self, tensor, n):
+        """Run the request on `tensor`; copy of the first n outputs"""
+        with self.lock:
+            self.request.infer({0: tensor})
+            return self.request.get_output_tensor(0).data[:n].copy()
 
-    boxes = output[:, :4]
-    scores = output[:, 4:]
 
-    class_ids = np.argmax(scores, axis=1)
-    confidences = scores[np.arange(len(scores)), class_ids]
+def get_batched_model(batch):
+    """
+    The exported IR is static batch 1, so compile (once per size) a copy
+    reshaped to [batch, 3, H, W].
+    """
+    with _batched_lock:
+        if batch not in _batched_models:
+            logger.info(f"Compiling batch-{batch} model...")
+            _batched_models[batch] = _BatchedModel(batch)
+        return _batched_models[batch]
 
-    detections = []
 
-    for box, cls_id, conf in zip(boxes, class_ids, confidences):
-        if conf < conf_thresh:
-            continue
+def letterbox_batch(frames, batch):
+    """
+    Letterbox frames straight into one contiguous [batch, 3, H, W] float32
+    tensor ([batch, H, W, 3] uint8 with the preprocessing graph).
+    Slots past len(frames) stay zero. Returns (tensor, [(scale, pad_x, pad_y)]).
+    """
+    if USE_PREPROCESS_GRAPH:
+        tensor = np.zeros((batch, INPUT_H, INPUT_W, 3), dtype=np.uint8)
+    else:
+        tensor = np.zeros((batch, 3, INPUT_H, INPUT_W), dtype=np.float32)
+    metas = []
 
-        cx, cy, w, h = box
+    for i, frame in enumerate(frames):
+        img_lb, scale, pad_x, pad_y = letterbox(frame, (INPUT_W, INPUT_H))
+        if USE_PREPROCESS_GRAPH:
+            tensor[i] = img_lb
+        else:
+            tensor[i] = img_lb.transpose(2, 0, 1)
+            tensor[i] /= 255.0
+        metas.append((scale, pad_x, pad_y))
 
-        # Convert xywh → xyxy (letterbox space)
-        x1 = cx - w / 2
-        y1 = cy - h / 2
-        x2 = cx + w / 2
-        y2 = cy + h / 2
+    return tensor, metas
 
-        # 🔥 UNLETTERBOX (THIS FIXES YOUR BOXES)
-        x1 = (x1 - pad_x) / scale
-        y1 = (y1 - pad_y) / scale
-        x2 = (x2 - pad_x) / scale
-        y2 = (y2 - pad_y) / scale
 
-        # Clamp
-        x1 = max(0, min(img_w, x1))
-        y1 = max(0, min(img_h, y1))
-        x2 = max(0, min(img_w, x2))
-        y2 = max(0, min(img_h, y2))
+def infer_openvino_batch(frames, batch=None):
+    """
+    Run up to `batch` frames through one infer call.
+    Returns (outputs [len(frames), 4 + num_classes, N], metas).
+    """
+    batch = batch or len(frames)
+    model = get_batched_model(batch)
+    tensor, metas = letterbox_batch(frames, batch)
 
-        detections.append({
-            "class": CLASS_NAMES[int(cls_id)],
-            "confidence": float(conf),
-            "bbox": (int(x1), int(y1), int(x2), int(y2))
-        })
+    # The request is shared between threads; letterboxing above is not
+    return model.infer(tensor, len(frames)), metas
 
-    return nms(detections, iou_thresh)
+
+def decode_yolov8_batch(
+    outputs,
+    frame_shapes,
+    metas,
+    conf_thresh=0.25,
+    iou_thresh=0.5,
+    class_aware=False
+):
+    """
+    Decode a whole [B, 4 + num_classes, N] batch at once: a single
+    confidence mask and unletterbox/clamp over every candidate of every
+    frame, then NMS per frame. Returns one detection list per frame, equal
+    to decode_yolov8_flat on each frame.
+    """
+    scores = outputs[:, 4:]
+    confidences = scores.max(axis=1)
+    frame_idx, anchor_idx = np.nonzero(~(confidences < conf_thresh))
+
+    confidences = confidences[frame_idx, anchor_idx]
+    class_ids = scores[frame_idx, :, anchor_idx].argmax(axis=1).astype(np.int64)
+    cx, cy, w, h = outputs[frame_idx, :4, anchor_idx].T
+
+    # Per-frame letterbox params as float32 so the math matches the 1-frame path
+    params = np.array(
+        [(scale, pad_x, pad_y, shape[1], shape[0])
+         for (scale, pad_x, pad_y), shape in zip(metas, frame_shapes)],
+        dtype=np.float32
+    )[frame_idx]
+    boxes = _unletterbox(cx, cy, w, h, *params.T)
+
+    # nonzero() is row-major, so each frame's candidates are contiguous
+    bounds = np.searchsorted(frame_idx, np.arange(len(outputs) + 1))
+
+    results = []
+    for b in range(len(outputs)):
+        sl = slice(bounds[b], bounds[b + 1])
+        keep = nms_boxes(
+            boxes[sl],
+            confidences[sl],
+            iou_thresh,
+            class_ids=class_ids[sl] if class_aware else None
+        )
+        results.append(detections_from_arrays(boxes[sl], confidences[sl], class_ids[sl], keep))
+
+    return results
 
 
 def letterbox(img, new_shape=(640, 640), color=(114, 114, 114)):
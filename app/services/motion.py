@@ -0,0 +1,84 @@
+import os
+import time
+import cv2
+import numpy as np
+
+# ================= MOTION GATE SETTINGS =================
+# Skip inference on static scenes (reuse the last detections / tracks)
+MOTION_GATE = os.getenv("SITESAFE_MOTION_GATE", "1") == "1"
+# Run the model at least this often even if nothing moves
+MOTION_REFRESH = float(os.getenv("SITESAFE_MOTION_REFRESH", "1.0"))  # seconds
+# Width of the grayscale thumbnail the frames are compared on
+MOTION_WIDTH = 160
+# Per-pixel change (0-255) that counts as motion, and the share of
+# thumbnail pixels that must change before the frame is inferred
+MOTION_PIXEL_DELTA = 25
+MOTION_MIN_AREA = 0.002
+
+
+class MotionGate:
+    """
+    Cheap "is it worth running the model?" check. Frames are shrunk to a
+    blurred grayscale thumbnail and compared against the thumbnail of the
+    last frame that was inferred (not the previous frame, so slow motion
+    still adds up). check() says whether to infer; call inferred() once
+    the model did run on the frame.
+    """
+
+    def __init__(self, enabled=MOTION_GATE, refresh=MOTION_REFRESH,
+                 pixel_delta=MOTION_PIXEL_DELTA, min_area=MOTION_MIN_AREA):
+        self.enabled = enabled
+        self.refresh = refresh
+        self.pixel_delta = pixel_delta
+        self.min_area = min_area
+
+        self.reference = None
+        self.reference_ts = 0
+        self.last_thumb = None
+        self.last_score = 0.0
+
+        self.checked = 0
+        self.skipped = 0
+
+    def thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (MOTION_WIDTH, max(1, h * MOTION_WIDTH // w)), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def motion(self, thumb):
+        """Share of thumbnail pixels that changed since the reference frame"""
+        if self.reference is None or self.reference.shape != thumb.shape:
+            return 1.0
+        diff = cv2.absdiff(thumb, self.reference)
+        return float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+
+    def check(self, frame, now=None):
+        """True if `frame` should go through the model"""
+        now = time.time() if now is None else now
+        self.checked += 1
+        if not self.enabled:
+            return True
+
+        self.last_thumb = self.thumbnail(frame)
+        self.last_score = self.motion(self.last_thumb)
+
+        if self.last_score >= self.min_area or now - self.reference_ts >= self.refresh:
+            return True
+        self.skipped += 1
+        return False
+
+    def inferred(self, now=None):
+        """The frame from the last check() was inferred: it is the new reference"""
+        self.reference = self.last_thumb
+        self.reference_ts = time.time() if now is None else now
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.checked, 3) if self.checked else 0.0,
+            "last_motion": round(self.last_score, 4),
+        }
@@ -5,94 +5,124 @@ import logging
 import asyncio
 import threading
 import numpy as np
-import concurrent.futures
 
-from . import camera
 from .model import infer_openvino, CLASS_NAMES
 from app.services.model import infer_openvino, decode_yolov8_flat
 from ..utils.helpers import extract_violations, record_detection
 from .alerts import state, alert_manager
 from ..core.websocket import broadcast_alert
 from ..geofence.engine import GeofenceEngine
+from .tracker import ByteTracker, ioa_matrix
+from .motion import MotionGate
+from .tiling import INFERENCE_MODE, TILE_OVERLAP, TILE_FULL_FRAME, zones_bbox, tile_grid, frame_tiles, infer_regions
 
-from app.services.face_recognition.recognize import recognize_worker
-from backend.database import get_connection
+from app.services.face_recognition.recognize import recognize_crop
+from backend.writer import writer as violation_writer
 from datetime import datetime
 
 # ================= DASHBOARD =================
 def save_violations(
     detections,
-    worker_id,
+    worker_id="UNKNOWN",
     zone_name=None,
     is_geofence=0
 ):
+    """
+    Queue violation rows for the background DB writer; never blocks the AI
+    worker. A detection's own "worker_id" (see attribute_workers) wins
+    over the `worker_id` argument.
+    """
 
     try:
 
-        conn = get_connection()
-        cursor = conn.cursor()
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = []
 
         for det in detections:
 
             violation_type = det["class"]
 
             if is_geofence == 0:
-                if "N0-" not in violation_type:
+                if not violation_type.startswith("NO-"):
                     continue
 
             severity = 3 if "Hardhat" in violation_type else 2
 
-            cursor.execute("""
-            INSERT INTO violations (
-                worker_id,
-                violation_type,
-                severity_grade,
-                zone_name,
-                is_geofence,
-                timestamp
-            )
-            VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                worker_id,
+            rows.append((
+                det.get("worker_id", worker_id),
                 violation_type,
                 severity,
                 zone_name,
                 is_geofence,
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                timestamp
             ))
 
-        conn.commit()
-        conn.close()
+        if rows:
+            violation_writer.put(rows)
 
     except Exception as e:
         print("DB ERROR:", e)
-# ================= Geofence IOA =================
-
-geofence_engine = GeofenceEngine(ioa_threshold=0.3)
-
 logger = logging.getLogger("sitesafeai")
 
 CONF_THRES = 0.25
 IOU_THRES = 0.5
 
-# ================= FACE CACHE =================
-LAST_WORKER_ID = "UNKNOWN"
-LAST_FACE_TS = 0
-FACE_INTERVAL = 4.0  # seconds
+# ================= FACE IDENTITY (per person track) =================
+FACE_INTERVAL = 4.0  # seconds between retries while a track is still UNKNOWN
+IDENTITY_TTL = 30.0  # seconds before a recognized track is re-verified
+FACES_PER_FRAME = 2  # face crops recognized per AI frame at most
+FACE_MIN_HEIGHT = 64  # px; smaller people are too far away for a usable face
+ATTRIBUTE_IOA = 0.5  # share of a violation box inside a person box to blame them
+
+# ================= VIOLATION EPISODES =================
+# A (person, violation, zone) pair unseen for this long starts a new episode
+EPISODE_GAP = 5.0  # seconds
 
 # ================= YOLO BOX PERSISTENCE =================
-BOX_CACHE = []
-BOX_CACHE_TS = 0
 BOX_TTL = 0.6  # seconds (YOLO-like)
 
 # ================= INFERENCE RATE LIMIT =================
-LAST_INFER_TS = 0
-INFER_INTERVAL = 0.06  # ~16 FPS (prevents Infer Request busy)
+INFER_INTERVAL = 0.06  # default per-stream target, ~16 FPS (see stream_manager)
+
+# ================= PER-STREAM STATE =================
+class StreamState:
+    """
+    Detection state of one camera. These used to be module globals, which
+    limited the server to a single camera.
+    """
+
+    def __init__(self, stream_id="default", settings=None):
+        self.stream_id = stream_id
 
-# ================= BACKGROUND EXECUTOR =================
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-ai_future = None
-LATEST_DETECTIONS = []
+        # streaming_active / geofence_enabled / zones
+        if settings is None:
+            settings = {"streaming_active": False, "geofence_enabled": False, "zones": []}
+        self.settings = settings
+
+        self.latest_detections = []
+        self.box_cache = []
+        self.box_cache_ts = 0
+
+        # Persistent ids for every detection; Person tracks also carry
+        # the worker identity found for them
+        self.tracker = ByteTracker()
+        self.face_checks = 0
+
+        # (owner, class, zone) -> last seen, one DB row per episode
+        self.episodes = {}
+        self.episodes_logged = 0
+
+        # Static scenes reuse the last inferred frame's results
+        self.motion_gate = MotionGate()
+        self.gated_detections = []
+        self.gate_ts = 0
+
+        # Geofence IOA (masks are per camera)
+        self.geofence_engine = GeofenceEngine(ioa_threshold=0.3)
+
+
+# Used when run_ai_task is called without a stream (tests, one-off frames)
+_standalone_state = StreamState("standalone", settings=state)
 
 
 # ================= ALERT THREAD =================
@@ -187,19 +217,18 @@ def postprocess_yolo_openvino(output, frame_shape):
 
 
 # ================= YOLO BOX STABILIZATION =================
-def stabilize_detections(detections):
-    global BOX_CACHE, BOX_CACHE_TS
+def stabilize_detections(stream, detections):
     now = time.time()
 
     if detections:
-        BOX_CACHE = detections
-        BOX_CACHE_TS = now
+        stream.box_cache = detections
+        stream.box_cache_ts = now
         return detections
 
-    if now - BOX_CACHE_TS < BOX_TTL:
-        return BOX_CACHE
+    if now - stream.box_cache_ts < BOX_TTL:
+        return stream.box_cache
 
-    BOX_CACHE = []
+    stream.box_cache = []
     return []
 
 
@@ -256,20 +285,132 @@ def draw_detections(frame, detections):
 
 
 # ================= FACE RECOGNITION =================
-def try_face_recognition(frame):
-    global LAST_WORKER_ID, LAST_FACE_TS
+def head_crop(frame, bbox):
+    """Upper half of a person box (padded sideways), where the face is"""
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = bbox
+    pad = (x2 - x1) // 10
+    x1, x2 = max(0, x1 - pad), min(w, x2 + pad)
+    y2 = min(h, y1 + (y2 - y1) // 2)
+    return np.ascontiguousarray(frame[max(0, y1):y2, x1:x2])
+
+
+def identify_tracks(frame, stream, tracks, now=None):
+    """
+    Face recognition on person crops, cached per track. A track is only
+    looked at when it is new, still UNKNOWN after FACE_INTERVAL, or its
+    identity is older than IDENTITY_TTL; at most FACES_PER_FRAME per call,
+    new tracks first.
+    """
+    now = time.time() if now is None else now
+
+    due = []
+    for t in tracks:
+        x1, y1, x2, y2 = t.bbox
+        if y2 - y1 < FACE_MIN_HEIGHT:
+            continue
+        if t.face_attempts == 0:
+            due.append((0, t))
+        elif t.worker_id == "UNKNOWN" and now - t.identity_ts >= FACE_INTERVAL:
+            due.append((1, t))
+        elif now - t.identity_ts >= IDENTITY_TTL:
+            due.append((2, t))
+    due.sort(key=lambda p: (p[0], p[1].identity_ts))
+
+    for _, t in due[:FACES_PER_FRAME]:
+        t.face_attempts += 1
+        t.identity_ts = now
+        stream.face_checks += 1
+        try:
+            worker_id = recognize_crop(head_crop(frame, t.bbox))
+        except Exception as e:
+            logger.error(f"Face recognition failed: {e}")
+            worker_id = "UNKNOWN"
 
-    now = time.time()
-    if now - LAST_FACE_TS < FACE_INTERVAL:
-        return LAST_WORKER_ID
+        # A re-check that just can't see the face keeps the known identity
+        if worker_id != "UNKNOWN" or t.worker_id is None:
+            t.worker_id = worker_id
+
+
+def attribute_workers(detections, tracks):
+    """
+    Tag each detection with the "worker_id" of the person it belongs to:
+    its own track for Person boxes, else the person box that covers most
+    of it (at least ATTRIBUTE_IOA). Unmatched detections get UNKNOWN.
+    """
+    tracks = [t for t in tracks if t.cls == "Person"]
+    by_id = {t.id: t for t in tracks}
+    others = [d for d in detections if d.get("track_id") not in by_id]
+
+    for d in detections:
+        t = by_id.get(d.get("track_id"))
+        if t is not None:
+            d["worker_id"] = t.worker_id or "UNKNOWN"
+            d["person_track"] = t.id
+
+    if not others:
+        return
+    if not tracks:
+        for d in others:
+            d["worker_id"] = "UNKNOWN"
+        return
+
+    cover = ioa_matrix([d["bbox"] for d in others], [t.bbox for t in tracks])
+    best = cover.argmax(axis=1)
+    for d, j, c in zip(others, best, cover[np.arange(len(others)), best]):
+        if c >= ATTRIBUTE_IOA:
+            d["worker_id"] = tracks[j].worker_id or "UNKNOWN"
+            d["person_track"] = tracks[j].id
+        else:
+            d["worker_id"] = "UNKNOWN"
+
+
+def new_episodes(stream, detections, zone_name=None, now=None):
+    """
+    The detections that start a violation episode. An episode is keyed by
+    who (the person track, else the detection's own track), what (class)
+    and where (zone); it starts at the first confirmed sighting and lasts
+    while the key keeps being seen with gaps under EPISODE_GAP. One person
+    standing without a hardhat is therefore one row, not one per frame.
+    """
+    now = time.time() if now is None else now
+    fresh = []
+
+    for d in detections:
+        track = stream.tracker.get(d.get("track_id"))
+        if track is None or not track.confirmed:
+            continue
+        owner = d.get("person_track", track.id)
+        key = (owner, d["class"], zone_name)
+        last = stream.episodes.get(key)
+        if last is None or now - last > EPISODE_GAP:
+            fresh.append(d)
+        stream.episodes[key] = now
 
-    LAST_FACE_TS = now
+    stream.episodes_logged += len(fresh)
+    return fresh
 
-    # Provide the FULL frame to InsightFace so it doesn't arbitrarily crop off users
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    worker_id = recognize_worker(rgb_frame)
-    LAST_WORKER_ID = worker_id
-    return worker_id
+
+def expire_episodes(stream, now):
+    stream.episodes = {k: ts for k, ts in stream.episodes.items() if now - ts <= EPISODE_GAP}
+
+
+def workers_label(detections):
+    """'wkr001, wkr007' for the workers behind some detections"""
+    return ", ".join(sorted({d.get("worker_id", "UNKNOWN") for d in detections}))
+
+
+def hold_static_scene(stream, now):
+    """
+    The motion gate skipped this frame: carry the tracks and violation
+    episodes of the last inferred frame forward to `now`, so a static
+    scene neither loses its tracks nor opens new episodes.
+    """
+    stream.tracker.hold(now)
+    for key, seen in stream.episodes.items():
+        if seen == stream.gate_ts:
+            stream.episodes[key] = now
+    stream.gate_ts = now
 
 
 # ================= TEST PATTERN GENERATOR =================
@@ -295,11 +436,37 @@ def generate_test_pattern(width=640, height=480):
 
 
 # ================= BACKGROUND AI TASK =================
-def run_ai_task(frame):
-    worker_id = try_face_recognition(frame)
+def inference_regions(frame, stream):
+    """
+    Parts of the frame the model should look at, or None for the whole
+    frame letterboxed. "roi" infers only the area around the geofence
+    zones (at native resolution, tiled if it is larger than the model
+    input), so PPE checks then cover that area only. "tiled" covers the
+    whole frame with overlapping tiles for high-resolution cameras.
+    """
+    settings = stream.settings
+    mode = settings.get("inference_mode", INFERENCE_MODE)
+    overlap = settings.get("tile_overlap", TILE_OVERLAP)
+
+    if mode == "tiled":
+        return frame_tiles(frame.shape, overlap, settings.get("tile_full_frame", TILE_FULL_FRAME))
+
+    if mode == "roi" and settings.get("geofence_enabled") and settings.get("zones"):
+        region = zones_bbox(settings["zones"], frame.shape)
+        if region is not None:
+            return tile_grid(region, overlap=overlap)
+
+    return None
+
+
+def detect_frame(frame, stream):
+    """Run the model on the frame the way the camera is configured to"""
+    regions = inference_regions(frame, stream)
+    if regions is not None:
+        return infer_regions(frame, regions, conf_thresh=0.25, iou_thresh=0.5)
+
     output, scale, pad_x, pad_y = infer_openvino(frame)
-    
-    detections = decode_yolov8_flat(
+    return decode_yolov8_flat(
         output=output,
         frame_shape=frame.shape,
         scale=scale,
@@ -308,38 +475,63 @@ def run_ai_task(frame):
         conf_thresh=0.25,
         iou_thresh=0.5,
     )
+
+
+def run_ai_task(frame, stream=None):
+    if stream is None:
+        stream = _standalone_state
+
+    # ===== MOTION GATE =====
+    now = time.time()
+    if not stream.motion_gate.check(frame, now):
+        hold_static_scene(stream, now)
+        return stream.gated_detections
+
+    detections = detect_frame(frame, stream)
+    stream.motion_gate.inferred(now)
     
+    # ===== TRACKING + WORKER IDENTITY =====
+    tracks = stream.tracker.update(detections, now)
+    identify_tracks(frame, stream, [t for t in tracks if t.cls == "Person"], now)
+    # Briefly lost people still own what is seen on them
+    attribute_workers(detections, stream.tracker.tracks)
+    expire_episodes(stream, now)
+
     # ===== PPE VIOLATIONS =====
     violations = extract_violations(detections)
-    now = time.time()
-    if not hasattr(generate_frames, "last_db_save"):
-        generate_frames.last_db_save = 0
-        
-    if now - generate_frames.last_db_save > 2:  # every 2 seconds
-        save_violations(detections, worker_id, zone_name=None, is_geofence=0)
-        generate_frames.last_db_save = now
+    fresh = new_episodes(stream, [d for d in detections if d["class"].startswith("NO-")], None, now)
+    if fresh:
+        save_violations(fresh, zone_name=None, is_geofence=0)
         
     if violations and alert_manager.can_alert():
-        msg = f"PPE violation by {worker_id}: " + ", ".join(violations)
+        offenders = workers_label([d for d in detections if d["class"].startswith("NO-")])
+        msg = f"PPE violation by {offenders}: " + ", ".join(violations)
         alert_data = alert_manager.trigger(msg)
         record_detection(msg)
         threading.Thread(target=alert_in_background, args=(alert_data,), daemon=True).start()
 
     # ===== GEOFENCE =====
-    if state.get("geofence_enabled") and state.get("zones"):
+    settings = stream.settings
+    if settings.get("geofence_enabled") and settings.get("zones"):
         try:
-            violations_dict = geofence_engine.process(detections, frame.shape, state["zones"])
-            if violations_dict:
-                for zone_name, violation_classes in violations_dict.items():
-                    if alert_manager.can_alert_geofence(zone_name):
-                        violations_str = ", ".join(violation_classes)
+            zone_hits = stream.geofence_engine.process_detections(detections, frame.shape, settings["zones"])
+            if zone_hits:
+                for zone_name, hits in zone_hits.items():
+                    fresh = new_episodes(stream, hits, zone_name, now)
+                    if fresh:
                         geo_detections = []
-                        for v in violation_classes:
+                        for d in fresh:
                             geo_detections.append({
-                                "class": v,
+                                "class": d["class"],
+                                "worker_id": d.get("worker_id", "UNKNOWN"),
                             })
                         print("GEOFENCE DB SAVE:", zone_name)
-                        save_violations(geo_detections, worker_id, zone_name, is_geofence=1)
+                        save_violations(geo_detections, zone_name=zone_name, is_geofence=1)
+
+                    if alert_manager.can_alert_geofence(zone_name):
+                        violation_classes = [d["class"] for d in hits]
+                        violations_str = ", ".join(violation_classes)
+                        worker_id = workers_label(hits)
                         
                         geofence_msg = f"Zone violation by {worker_id}: {violations_str} in '{zone_name}'"
                         alert_data = alert_manager.trigger_geofence(zone_name, {"violations": violation_classes, "worker_id": worker_id})
@@ -349,98 +541,109 @@ def run_ai_task(frame):
                         threading.Thread(target=alert_in_background, args=(alert_data,), daemon=True).start()
         except Exception as e:
             logger.error(f"[GEOFENCE] Exception in geofence processing: {e}\n{traceback.format_exc()}")
-            
+
+    stream.gated_detections = detections
+    stream.gate_ts = now
     return detections
 
-# ================= MAIN STREAM =================
+# ================= FRAME PRODUCER =================
 FPS_LIMIT = 1.0 / 30.0  # 30 FPS Lock
 
-def generate_frames():
-    global ai_future, LATEST_DETECTIONS
-    last_frame_ts = 0
 
-    logger.info("Stream generator started")
+def mjpeg_chunk(jpeg):
+    return (
+        b"--frame\r\n"
+        b"Content-Type: image/jpeg\r\n\r\n"
+        + jpeg
+        + b"\r\n"
+    )
 
-    try:
-        test_pattern_counter = 0
-        
-        while True:
-            # 🕰️ STREAM FPS LIMITER to prevent GIL starvation!
-            now = time.time()
-            if now - last_frame_ts < FPS_LIMIT:
-                time.sleep(0.01)
-                continue
-            last_frame_ts = now
 
-            # 🔴 STOP = CLOSE MJPEG CONNECTION
-            if not state.get("streaming_active"):
-                logger.info("Streaming stopped, closing MJPEG connection")
-                break
+def produce_frames(stream):
+    """
+    The one producer of a camera stream (runs on its own thread while the
+    stream is active): read a frame, offer it to the shared inference
+    scheduler, draw the latest detections and JPEG-encode it once.
+    Viewers read the result from stream.broadcaster.
+    """
+    logger.info(f"Frame producer started for camera '{stream.stream_id}'")
+
+    next_frame_ts = 0
+    last_frame = None
+    last_detections = None
+
+    while stream.settings.get("streaming_active"):
+        # 🕰️ STREAM FPS LIMITER to prevent GIL starvation!
+        now = time.time()
+        if now < next_frame_ts:
+            time.sleep(next_frame_ts - now)
+        next_frame_ts = max(next_frame_ts + FPS_LIMIT, time.time())
+
+        # ⏳ Wait until camera is opened by the start endpoint
+        cap = stream.cap
+        if cap is None or not cap.isOpened():
+            time.sleep(0.05)
+            continue
+
+        success, frame = cap.read()
 
-            # ⏳ Wait until camera is opened by /api/start
-            if camera.cap is None or not camera.cap.isOpened():
-                time.sleep(0.05)
+        # If frame read failed but we're in demo mode, generate test pattern
+        if not success:
+            if stream.demo_mode:
+                frame = generate_test_pattern(640, 480)
+            else:
+                time.sleep(0.03)
                 continue
 
-            success, frame = camera.cap.read()
-            
-            # If frame read failed but we're in demo mode, generate test pattern
-            if not success:
-                if camera.DEMO_MODE:
-                    frame = generate_test_pattern(640, 480)
-                    test_pattern_counter += 1
-                else:
-                    time.sleep(0.03)
-                    continue
+        detections = stream.latest_detections
 
-            try:
-                # Dispatch background computation seamlessly
-                if ai_future is None or ai_future.done():
-                    if ai_future is not None:
-                        try:
-                            LATEST_DETECTIONS = ai_future.result()
-                        except Exception as e:
-                            logger.error(f"AI Worker crashed: {e}")
-                    
-                    # Submit next frame instantly
-                    ai_future = executor.submit(run_ai_task, frame.copy())
-                
-                # Instantly draw and push using independent Latest State
-                # NOTE: Zone overlays are rendered by the frontend canvas, not here.
-                annotated = draw_detections(frame.copy(), LATEST_DETECTIONS)
-
-                # ===== STREAM FRAME =====
-                _, buffer = cv2.imencode(".jpg", annotated)
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n"
-                    + buffer.tobytes()
-                    + b"\r\n"
-                )
-
-            except Exception as e:
-                logger.error(f"Frame processing error: {e}\n{traceback.format_exc()}")
-                # Still yield a frame so stream doesn't break
-                try:
-                    _, buffer = cv2.imencode(".jpg", frame)
-                    yield (
-                        b"--frame\r\n"
-                        b"Content-Type: image/jpeg\r\n\r\n"
-                        + buffer.tobytes()
-                        + b"\r\n"
-                    )
-                except:
-                    pass
+        # Nothing changed since the last packet: don't redo the same work
+        if frame is last_frame and detections is last_detections:
+            continue
 
-    except GeneratorExit:
-        logger.info("Stream closed by client")
+        if frame is not last_frame:
+            # Hand the frame to the shared scheduler (replaces any frame
+            # of this camera that is still waiting)
+            stream.submit_ai(frame)
 
-    except asyncio.CancelledError:
-        logger.info("Streaming cancelled")
+        last_frame = frame
+        last_detections = detections
+
+        try:
+            # NOTE: Zone overlays are rendered by the frontend canvas, not here.
+            annotated = draw_detections(frame.copy(), detections)
+        except Exception as e:
+            logger.error(f"Frame processing error: {e}\n{traceback.format_exc()}")
+            # Still publish the raw frame so viewers don't stall
+            annotated = frame
 
-    except KeyboardInterrupt:
-        logger.info("Keyboard interrupt received")
+        ok, buffer = cv2.imencode(".jpg", annotated)
+        if ok:
+            stream.broadcaster.publish(annotated, buffer.tobytes())
 
+    logger.info(f"Frame producer stopped for camera '{stream.stream_id}'")
 
 
+# ================= MAIN STREAM =================
+async def generate_frames(stream, viewer="mjpeg"):
+    """
+    MJPEG async generator for one camera stream (see stream_manager.CameraStream).
+    Only forwards the packets the stream's producer already encoded, awaiting
+    them on the event loop instead of blocking a threadpool worker.
+    Exits when streaming_active becomes False.
+    """
+    logger.info(f"Stream generator started for camera '{stream.stream_id}'")
+
+    try:
+        stopped = lambda: not stream.settings.get("streaming_active")
+        async for packet in stream.broadcaster.subscribe(stopped, viewer):
+            yield mjpeg_chunk(packet.jpeg)
 
+        logger.info(f"Streaming stopped on '{stream.stream_id}', closing MJPEG connection")
+
+    except GeneratorExit:
+        logger.info("Stream closed by client")
+
+    except asyncio.CancelledError:
+        logger.info("Streaming cancelled")
+        raise
@@ -0,0 +1,330 @@
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+
+from .camera import open_capture, release_capture
+from .model import engine
+from .stream import StreamState, run_ai_task, produce_frames, INFER_INTERVAL
+from .tiling import INFERENCE_MODE
+from .broadcast import FrameBroadcaster
+from .alerts import state
+
+logger = logging.getLogger("sitesafeai")
+
+# Camera id used by the legacy single-camera endpoints (/api/start, /api/stream, ...)
+DEFAULT_STREAM = "default"
+
+
+# ================= SHARED INFERENCE SCHEDULER =================
+# Frames waiting longer than this are dropped instead of inferred
+STALE_FRAME_AGE = 0.5  # seconds
+# Window for the achieved-FPS figure
+STATS_WINDOW = 5.0  # seconds
+
+
+class StreamSlot:
+    """Latest-frame slot of one stream plus its scheduling state and counters"""
+
+    def __init__(self, stream, target_fps, weight):
+        self.stream = stream
+        self.target_fps = target_fps
+        self.weight = weight
+
+        self.frame = None
+        self.frame_ts = 0
+        self.busy = False
+        self.next_due = 0
+        self.vtime = 0.0
+
+        self.created = time.time()
+        self.offered = 0
+        self.inferred = 0
+        self.dropped = 0   # replaced by a newer frame before being picked
+        self.stale = 0     # too old by the time a worker was free
+        self.errors = 0
+        self.latency = 0.0
+        self.done_ts = deque()
+
+    def achieved_fps(self, now):
+        while self.done_ts and now - self.done_ts[0] > STATS_WINDOW:
+            self.done_ts.popleft()
+        window = min(STATS_WINDOW, max(now - self.created, 1e-6))
+        return len(self.done_ts) / window
+
+
+class InferenceScheduler:
+    """
+    Shared AI workers for every camera.
+
+    Each stream has a single latest-frame slot: offering a new frame
+    replaces (drops) the one still waiting, so nothing ever queues up.
+    Workers pick among streams that have a frame, are not already being
+    inferred and are due per their target FPS, using weighted fair
+    queuing (lowest virtual time first; each run costs 1 / weight).
+    """
+
+    def __init__(self, workers=1, default_fps=None):
+        self.default_fps = default_fps
+        self.slots = {}
+        self.cond = threading.Condition()
+        self.vclock = 0.0
+        self.running = True
+
+        self.threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name=f"sitesafe-ai-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+        # Let in-flight inferences finish before the interpreter tears down
+        atexit.register(self.shutdown)
+
+    def _slot(self, stream):
+        slot = self.slots.get(stream.stream_id)
+        if slot is None:
+            slot = StreamSlot(stream, self.default_fps, 1.0)
+            # Join at the current virtual time so a new camera can't hog the workers
+            slot.vtime = self.vclock
+            self.slots[stream.stream_id] = slot
+        return slot
+
+    def configure(self, stream, target_fps=None, weight=None):
+        """Set a stream's target inference FPS (0 = as fast as possible) and/or weight"""
+        with self.cond:
+            slot = self._slot(stream)
+            if target_fps is not None:
+                slot.target_fps = target_fps or None
+            if weight is not None:
+                slot.weight = max(weight, 1e-3)
+            self.cond.notify_all()
+
+    def submit(self, stream, frame):
+        """
+        Offer the newest frame of a stream. Never blocks. The frame is not
+        copied: captures hand out a new array per frame and callers draw on
+        copies. Returns False if an older waiting frame was dropped.
+        """
+        with self.cond:
+            slot = self._slot(stream)
+            dropped = slot.frame is not None
+            if dropped:
+                slot.dropped += 1
+
+            slot.frame = frame
+            slot.frame_ts = time.time()
+            slot.offered += 1
+            self.cond.notify()
+        return not dropped
+
+    def discard(self, stream_id):
+        """Drop a stopped stream's waiting frame; its settings and counters stay"""
+        with self.cond:
+            slot = self.slots.get(stream_id)
+            if slot is not None:
+                slot.frame = None
+
+    def _pick(self, now):
+        """Return (slot to run, seconds until the next stream is due)"""
+        best = None
+        wait = None
+
+        for slot in self.slots.values():
+            if slot.frame is None or slot.busy:
+                continue
+
+            if now - slot.frame_ts > STALE_FRAME_AGE:
+                slot.frame = None
+                slot.stale += 1
+                continue
+
+            if slot.next_due > now:
+                due_in = slot.next_due - now
+                wait = due_in if wait is None else min(wait, due_in)
+                continue
+
+            if best is None or slot.vtime < best.vtime:
+                best = slot
+
+        return best, wait
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                slot, wait = self._pick(time.time())
+                while slot is None and self.running:
+                    self.cond.wait(timeout=wait if wait is not None else STALE_FRAME_AGE)
+                    slot, wait = self._pick(time.time())
+
+                if not self.running:
+                    return
+
+                frame = slot.frame
+                slot.frame = None
+                slot.busy = True
+
+                start = time.time()
+                if slot.target_fps:
+                    # One period after this run: a late run earns no catch-up run
+                    slot.next_due = max(slot.next_due, start) + 1.0 / slot.target_fps
+                self.vclock = max(self.vclock, slot.vtime)
+                slot.vtime = max(slot.vtime, self.vclock) + 1.0 / slot.weight
+
+            try:
+                slot.stream.latest_detections = run_ai_task(frame, slot.stream)
+                failed = False
+            except Exception as e:
+                logger.error(f"AI Worker crashed on '{slot.stream.stream_id}': {e}")
+                failed = True
+
+            with self.cond:
+                now = time.time()
+                slot.busy = False
+                slot.latency = now - start
+                if failed:
+                    slot.errors += 1
+                else:
+                    slot.inferred += 1
+                    slot.done_ts.append(now)
+                self.cond.notify_all()
+
+    def shutdown(self, timeout=2.0):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        for t in self.threads:
+            t.join(timeout)
+
+    def stats(self):
+        """Per-stream achieved FPS, drop counts and last inference latency"""
+        now = time.time()
+        with self.cond:
+            return [
+                {
+                    "id": stream_id,
+                    "target_fps": slot.target_fps or 0,
+                    "weight": slot.weight,
+                    "achieved_fps": round(slot.achieved_fps(now), 2),
+                    "offered": slot.offered,
+                    "inferred": slot.inferred,
+                    "dropped": slot.dropped,
+                    "stale": slot.stale,
+                    "errors": slot.errors,
+                    "latency_ms": round(slot.latency * 1000, 1),
+                }
+                for stream_id, slot in self.slots.items()
+            ]
+
+
+# ================= CAMERA STREAM =================
+class CameraStream(StreamState):
+    """A camera capture plus its detection state and geofence zones"""
+
+    def __init__(self, stream_id, scheduler, settings=None):
+        super().__init__(stream_id, settings)
+        self.scheduler = scheduler
+        self.broadcaster = FrameBroadcaster()
+        self.producer = None
+        self.src = None
+        self.cap = None
+        self.demo_mode = False
+        self.lock = threading.Lock()
+
+    def start(self, src=0):
+        with self.lock:
+            if self.settings.get("streaming_active"):
+                return False
+
+            release_capture(self.cap)
+            self.src = src
+            self.cap, self.demo_mode = open_capture(src)
+            self.settings["streaming_active"] = True
+
+            # One producer per camera reads, annotates and encodes each frame
+            self.producer = threading.Thread(
+                target=produce_frames, args=(self,),
+                name=f"sitesafe-producer-{self.stream_id}", daemon=True
+            )
+            self.producer.start()
+            return True
+
+    def stop(self):
+        with self.lock:
+            # The producer and all viewers watch this flag and exit
+            self.settings["streaming_active"] = False
+            if self.producer is not None:
+                self.producer.join(timeout=1.0)
+                self.producer = None
+            release_capture(self.cap)
+            self.cap = None
+            self.latest_detections = []
+
+    def submit_ai(self, frame):
+        return self.scheduler.submit(self, frame)
+
+    def status(self):
+        return {
+            "id": self.stream_id,
+            "src": self.src,
+            "active": bool(self.settings.get("streaming_active")),
+            "demo_mode": self.demo_mode,
+            "geofence_enabled": bool(self.settings.get("geofence_enabled")),
+            "zones_count": len(self.settings.get("zones", [])),
+            "inference_mode": self.settings.get("inference_mode", INFERENCE_MODE),
+            "detections": len(self.latest_detections),
+            "tracks": len(self.tracker.tracks),
+            "face_checks": self.face_checks,
+            "violation_episodes": self.episodes_logged,
+            "motion_gate": self.motion_gate.stats(),
+            "frames_published": self.broadcaster.seq,
+        }
+
+
+# ================= STREAM MANAGER =================
+class StreamManager:
+    """Owns every camera stream on this server, keyed by camera id"""
+
+    def __init__(self, workers=1):
+        self.scheduler = InferenceScheduler(workers, default_fps=1.0 / INFER_INTERVAL)
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def get(self, stream_id):
+        """Return the stream for `stream_id`, creating an idle one if needed"""
+        with self.lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                # The default camera keeps sharing the global state dict, so the
+                # existing /api/geofence/* endpoints still configure it
+                settings = state if stream_id == DEFAULT_STREAM else None
+                stream = CameraStream(stream_id, self.scheduler, settings)
+                self.streams[stream_id] = stream
+            return stream
+
+    def start(self, stream_id, src=0):
+        return self.get(stream_id).start(src)
+
+    def stop(self, stream_id):
+        with self.lock:
+            stream = self.streams.get(stream_id)
+        if stream is None:
+            return False
+        stream.stop()
+        self.scheduler.discard(stream_id)
+        return True
+
+    def status(self):
+        with self.lock:
+            streams = list(self.streams.values())
+        return [s.status() for s in streams]
+
+    def configure(self, stream_id, target_fps=None, weight=None):
+        self.scheduler.configure(self.get(stream_id), target_fps, weight)
+
+    def stats(self):
+        return self.scheduler.stats()
+
+
+# Global instance; one AI worker per infer request the engine keeps in flight
+manager = StreamManager(workers=max(1, engine.jobs))
@@ -0,0 +1,214 @@
+import os
+import math
+import numpy as np
+
+from .model import (
+    infer_openvino,
+    infer_openvino_batch,
+    decode_yolov8_flat,
+    decode_yolov8_batch,
+    INPUT_W,
+    INPUT_H,
+)
+
+# ================= REGION INFERENCE SETTINGS =================
+# "full" = letterbox the whole frame, "roi" = only the area around the
+# geofence zones (when geofencing is on), at native resolution,
+# "tiled" = the whole frame as overlapping model-sized tiles (4K cameras)
+INFERENCE_MODE = os.getenv("SITESAFE_INFERENCE_MODE", "full")
+INFERENCE_MODES = ("full", "roi", "tiled")
+# Pixels kept around the zones so people standing on a zone edge are whole
+ROI_MARGIN = 32
+# Overlap between neighbouring tiles (share of the tile size)
+TILE_OVERLAP = float(os.getenv("SITESAFE_TILE_OVERLAP", "0.2"))
+# Tiled mode also infers the letterboxed whole frame, for people close
+# enough to the camera to be cut by every tile
+TILE_FULL_FRAME = os.getenv("SITESAFE_TILE_FULL_FRAME", "1") == "1"
+# Same-class boxes from different tiles are one object at this IoU, or,
+# when one of them is cut by a tile edge, when they cover this share of
+# the smaller box (SAHI's greedy NMM with the IoS metric)
+MERGE_IOU = 0.5
+MERGE_IOS = 0.5
+# A box this close to a tile edge inside the frame counts as cut
+EDGE_PX = 2
+# Tiles per infer call; batches are padded to a power of two up to this
+TILE_BATCH = int(os.getenv("SITESAFE_TILE_BATCH", "16"))
+
+
+# ================= GEOMETRY =================
+def zones_bbox(zones, frame_shape, margin=ROI_MARGIN):
+    """(x1, y1, x2, y2) around every zone polygon plus `margin`, clipped to the frame"""
+    h, w = frame_shape[:2]
+    points = [p for z in zones if len(z.get("points") or []) >= 3 for p in z["points"]]
+    if not points:
+        return None
+
+    points = np.asarray(points, dtype=np.float64)
+    x1, y1 = np.floor(points.min(axis=0)) - margin
+    x2, y2 = np.ceil(points.max(axis=0)) + margin
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(w, int(x2)), min(h, int(y2))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def _tile_spans(lo, hi, size, overlap):
+    """
+    Split [lo, hi) into the number of overlapping spans closest to `size`
+    each. Spans may come out a little larger or smaller than `size` (the
+    letterbox rescales them slightly) rather than adding a near-duplicate
+    tile for the last few pixels.
+    """
+    length = hi - lo
+    n = max(1, round((length - size * overlap) / (size * (1 - overlap))))
+    if n == 1:
+        return [(lo, hi)]
+    span = min(length, math.ceil(length / (n - (n - 1) * overlap)))
+    # Spread evenly so the last span ends exactly at `hi`
+    starts = [lo + round(i * (length - span) / (n - 1)) for i in range(n)]
+    return [(start, start + span) for start in starts]
+
+
+def tile_grid(region, tile=(INPUT_W, INPUT_H), overlap=TILE_OVERLAP):
+    """
+    Cover `region` (x1, y1, x2, y2) with about model-input sized tiles
+    that overlap by `overlap`. A region around a tile's size is one tile.
+    """
+    x1, y1, x2, y2 = region
+    tw, th = tile
+    return [
+        (tx1, ty1, tx2, ty2)
+        for ty1, ty2 in _tile_spans(y1, y2, th, overlap)
+        for tx1, tx2 in _tile_spans(x1, x2, tw, overlap)
+    ]
+
+
+def frame_tiles(frame_shape, overlap=TILE_OVERLAP, full_frame=TILE_FULL_FRAME):
+    """Tiled-mode regions: the tile grid over the frame, plus the frame itself"""
+    h, w = frame_shape[:2]
+    tiles = tile_grid((0, 0, w, h), overlap=overlap)
+    if full_frame and len(tiles) > 1:
+        tiles.append((0, 0, w, h))
+    return tiles
+
+
+# ================= MERGING =================
+def _overlaps(box, boxes):
+    """IoU and IoS (intersection over the smaller box) of one box against many"""
+    ix1 = np.maximum(box[0], boxes[:, 0])
+    iy1 = np.maximum(box[1], boxes[:, 1])
+    ix2 = np.minimum(box[2], boxes[:, 2])
+    iy2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.maximum(0, ix2 - ix1) * np.maximum(0, iy2 - iy1)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    iou = inter / (area + areas - inter + 1e-6)
+    ios = inter / (np.minimum(area, areas) + 1e-6)
+    return iou, ios
+
+
+def merge_detections(detections, sources, regions, frame_shape,
+                     iou_thresh=MERGE_IOU, ios_thresh=MERGE_IOS):
+    """
+    Cross-tile merge of detections found in `regions` (sources[i] is the
+    region index of detections[i]). Highest confidence first, each kept
+    box absorbs at most one same-class box from every other region: one
+    that overlaps it by `iou_thresh` IoU, or by `ios_thresh` of the smaller
+    box when either is cut by an inner tile edge. The kept box grows to
+    their union, so the halves of a worker split by a tile edge become
+    one box, while overlapping workers seen in the same tile stay apart.
+    """
+    if len(detections) < 2:
+        return detections
+
+    h, w = frame_shape[:2]
+    boxes = np.array([d["bbox"] for d in detections], dtype=np.float32)
+    conf = np.array([d["confidence"] for d in detections], dtype=np.float32)
+    classes = np.array([d["class"] for d in detections])
+    sources = np.asarray(sources)
+
+    # Cut = touching a side of its region that is not the frame border
+    rx1, ry1, rx2, ry2 = np.array(regions, dtype=np.float32)[sources].T
+    cut = (
+        ((rx1 > 0) & (boxes[:, 0] <= rx1 + EDGE_PX))
+        | ((ry1 > 0) & (boxes[:, 1] <= ry1 + EDGE_PX))
+        | ((rx2 < w) & (boxes[:, 2] >= rx2 - EDGE_PX))
+        | ((ry2 < h) & (boxes[:, 3] >= ry2 - EDGE_PX))
+    )
+
+    merged = []
+    taken = np.zeros(len(detections), dtype=bool)
+    for i in np.argsort(-conf, kind="stable"):
+        if taken[i]:
+            continue
+        taken[i] = True
+        box, box_cut, used = boxes[i].copy(), cut[i], {sources[i]}
+
+        while True:
+            candidates = np.flatnonzero(
+                ~taken & (classes == classes[i]) & ~np.isin(sources, list(used))
+            )
+            if not len(candidates):
+                break
+            iou, ios = _overlaps(box, boxes[candidates])
+            ok = (iou >= iou_thresh) | ((box_cut | cut[candidates]) & (ios >= ios_thresh))
+            if not ok.any():
+                break
+            j = candidates[ok][np.argmax(ios[ok])]
+            taken[j] = True
+            used.add(sources[j])
+            box[:2] = np.minimum(box[:2], boxes[j, :2])
+            box[2:] = np.maximum(box[2:], boxes[j, 2:])
+            box_cut = box_cut or cut[j]
+
+        det = dict(detections[i])
+        if len(used) > 1:
+            det["bbox"] = tuple(int(v) for v in box)
+        merged.append(det)
+
+    return merged
+
+
+# ================= INFERENCE =================
+def _batch_size(n):
+    """Pad to a power of two so only a few batch sizes ever get compiled"""
+    return min(TILE_BATCH, 1 << (n - 1).bit_length())
+
+
+def infer_regions(frame, regions, conf_thresh=0.25, iou_thresh=0.5):
+    """
+    Run the model on each (x1, y1, x2, y2) region of the frame: one region
+    goes through the shared async engine, several are batched through
+    infer_openvino_batch. Boxes come back in frame coordinates, merged
+    across regions.
+    """
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+
+    if len(crops) == 1:
+        output, scale, pad_x, pad_y = infer_openvino(crops[0])
+        per_region = [decode_yolov8_flat(
+            output=output, frame_shape=crops[0].shape, scale=scale, pad_x=pad_x, pad_y=pad_y,
+            conf_thresh=conf_thresh, iou_thresh=iou_thresh,
+        )]
+    else:
+        per_region = []
+        for start in range(0, len(crops), TILE_BATCH):
+            part = crops[start:start + TILE_BATCH]
+            outputs, metas = infer_openvino_batch(part, batch=_batch_size(len(part)))
+            per_region.extend(decode_yolov8_batch(
+                outputs, [c.shape for c in part], metas,
+                conf_thresh=conf_thresh, iou_thresh=iou_thresh,
+            ))
+
+    detections, sources = [], []
+    for r, ((x0, y0, _, _), dets) in enumerate(zip(regions, per_region)):
+        for d in dets:
+            x1, y1, x2, y2 = d["bbox"]
+            d["bbox"] = (x1 + x0, y1 + y0, x2 + x0, y2 + y0)
+            detections.append(d)
+            sources.append(r)
+
+    if len(regions) == 1:
+        return detections
+    return merge_detections(detections, sources, regions, frame.shape)
@@ -0,0 +1,197 @@
+import time
+import itertools
+import numpy as np
+
+# ================= TRACKER SETTINGS =================
+# ByteTrack-style two passes: confident detections are matched first, the
+# low-confidence rest may only extend tracks that are still unmatched
+TRACK_HIGH = 0.5
+TRACK_LOW = 0.25
+# Classes (prefixes) whose weak detections may also start tracks: a PPE
+# violation seen steadily at low confidence must still be logged
+TRACK_LOW_START = ("NO-",)
+# Minimum IoU (against the motion-predicted box) to continue a track
+TRACK_IOU = 0.3
+TRACK_IOU_LOW = 0.5
+# Sightings before a track counts as confirmed (filters one-frame flicker)
+TRACK_MIN_HITS = 2
+# A lost track is kept this long so a briefly occluded object keeps its id
+TRACK_BUFFER = 2.0  # seconds
+# Smoothing of the per-track box velocity (0..1, higher = more reactive)
+VELOCITY_ALPHA = 0.5
+
+_track_ids = itertools.count(1)
+
+
+def _intersections(a, b):
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.maximum(0, ix2 - ix1) * np.maximum(0, iy2 - iy1)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter, area_a, area_b
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of xyxy boxes a [N, 4] and b [M, 4] → [N, M]"""
+    inter, area_a, area_b = _intersections(a, b)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def ioa_matrix(a, b):
+    """Share of each box in a [N, 4] covered by each box in b [M, 4] → [N, M]"""
+    inter, area_a, _ = _intersections(a, b)
+    return inter / (area_a[:, None] + 1e-6)
+
+
+def greedy_match(scores, thresh):
+    """
+    Pairs (row, col) by descending score, each row / col used once, only
+    pairs with score >= thresh. Returns (matches, unmatched_rows, unmatched_cols).
+    """
+    n, m = scores.shape
+    matches = []
+    if n and m:
+        rows, cols = np.nonzero(scores >= thresh)
+        order = np.argsort(-scores[rows, cols], kind="stable")
+        used_r, used_c = set(), set()
+        for k in order:
+            r, c = int(rows[k]), int(cols[k])
+            if r in used_r or c in used_c:
+                continue
+            used_r.add(r)
+            used_c.add(c)
+            matches.append((r, c))
+
+    matched_r = {r for r, _ in matches}
+    matched_c = {c for _, c in matches}
+    return (
+        matches,
+        [r for r in range(n) if r not in matched_r],
+        [c for c in range(m) if c not in matched_c],
+    )
+
+
+class Track:
+    """One tracked object; also carries the identity found for it"""
+
+    def __init__(self, det, now):
+        self.id = next(_track_ids)
+        self.cls = det["class"]
+        self.bbox = det["bbox"]
+        self.confidence = det["confidence"]
+        self.hits = 1
+        self.first_seen = now
+        self.last_seen = now
+        self.velocity = np.zeros(4, dtype=np.float32)  # px / s per box edge
+
+        # Face recognition result, cached for the life of the track
+        self.worker_id = None
+        self.identity_ts = 0
+        self.face_attempts = 0
+
+    @property
+    def confirmed(self):
+        return self.hits >= TRACK_MIN_HITS
+
+    def predict(self, now):
+        """Constant-velocity guess of the box at `now`"""
+        return np.asarray(self.bbox, dtype=np.float32) + self.velocity * (now - self.last_seen)
+
+    def update(self, det, now):
+        dt = now - self.last_seen
+        if dt > 0:
+            step = (np.asarray(det["bbox"], dtype=np.float32) - np.asarray(self.bbox, dtype=np.float32)) / dt
+            self.velocity = VELOCITY_ALPHA * step + (1 - VELOCITY_ALPHA) * self.velocity
+        self.bbox = det["bbox"]
+        self.confidence = det["confidence"]
+        self.hits += 1
+        self.last_seen = now
+
+
+class ByteTracker:
+    """
+    Multi-object tracker in the SORT / ByteTrack mould, without a Kalman
+    filter: tracks predict their box with a smoothed constant velocity,
+    association is one vectorized IoU matrix per pass (same class only)
+    plus greedy matching, and low-confidence detections get a second pass
+    against the still-unmatched tracks instead of being thrown away.
+
+    update() tags every tracked detection with "track_id" and returns the
+    tracks seen in this frame.
+    """
+
+    def __init__(self, classes=None, buffer=TRACK_BUFFER, low_start=TRACK_LOW_START):
+        self.classes = set(classes) if classes else None
+        self.buffer = buffer
+        self.low_start = tuple(low_start)
+        self.tracks = []
+        self.by_id = {}
+        self.last_update = None
+
+    def _associate(self, tracks, dets, now, thresh):
+        if not tracks or not dets:
+            return [], list(range(len(tracks))), list(range(len(dets)))
+        scores = iou_matrix(np.stack([t.predict(now) for t in tracks]), [d["bbox"] for d in dets])
+        same_class = np.array([t.cls for t in tracks])[:, None] == np.array([d["class"] for d in dets])[None, :]
+        return greedy_match(np.where(same_class, scores, 0.0), thresh)
+
+    def update(self, detections, now=None):
+        now = time.time() if now is None else now
+
+        dets = [d for d in detections if self.classes is None or d["class"] in self.classes]
+        high = [d for d in dets if d["confidence"] >= TRACK_HIGH]
+        low = [d for d in dets if TRACK_LOW <= d["confidence"] < TRACK_HIGH]
+
+        # Pass 1: confident detections against every live track
+        matches, rest, new = self._associate(self.tracks, high, now, TRACK_IOU)
+        for r, c in matches:
+            self.tracks[r].update(high[c], now)
+            high[c]["track_id"] = self.tracks[r].id
+
+        # Pass 2: weak detections only keep existing tracks alive
+        rest = [self.tracks[r] for r in rest]
+        matches, _, unmatched = self._associate(rest, low, now, TRACK_IOU_LOW)
+        for r, c in matches:
+            rest[r].update(low[c], now)
+            low[c]["track_id"] = rest[r].id
+
+        # New tracks: unmatched confident detections, plus weak ones of the
+        # low_start classes (they still need TRACK_MIN_HITS to confirm)
+        starts = [high[c] for c in new]
+        starts += [low[c] for c in unmatched if self.low_start and low[c]["class"].startswith(self.low_start)]
+        for det in starts:
+            track = Track(det, now)
+            self.tracks.append(track)
+            self.by_id[track.id] = track
+            det["track_id"] = track.id
+
+        # Unconfirmed tracks get no grace period: one missed frame ends them
+        alive = []
+        for t in self.tracks:
+            if t.last_seen == now or (t.confirmed and now - t.last_seen <= self.buffer):
+                alive.append(t)
+            else:
+                del self.by_id[t.id]
+        self.tracks = alive
+        self.last_update = now
+        return [t for t in self.tracks if t.last_seen == now]
+
+    def hold(self, now):
+        """
+        No new detections because the scene is static (motion gate): treat
+        the tracks seen in the last update as still seen, in place.
+        """
+        for t in self.tracks:
+            if t.last_seen == self.last_update:
+                t.last_seen = now
+        self.last_update = now
+
+    def get(self, track_id):
+        return self.by_id.get(track_id)
@@ -0,0 +1,156 @@
+"""
+SiteSafeAI — Dashboard Response Cache
+TTL cache for the polled dashboard routes, keyed by route function, path
+and query params.
+Entries hold the serialized body and its ETag, so a hit skips the queries
+and the JSON encoding, and a matching If-None-Match gets a bodyless 304.
+The violation writer clears the cache whenever a batch lands; writes made
+by another process (the AI app and the :8001 backend service each have
+their own cache) are caught by a database version check on every lookup.
+"""
+
+import os
+import json
+import time
+import hashlib
+import inspect
+import threading
+from functools import wraps
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from backend.writer import writer
+from backend.database import db_version
+
+CACHE_TTL = float(os.environ.get("SITESAFE_DASHBOARD_CACHE_TTL", 5.0))  # seconds
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "expires")
+
+    def __init__(self, body, etag, expires):
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+
+class ResponseCache:
+
+    def __init__(self, ttl=CACHE_TTL, version=None):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        # Bumped on invalidation so a query that raced a write isn't stored
+        self.generation = 0
+        # Callable returning a data version; a change drops every entry
+        self.version = version
+        self.seen_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def invalidate(self, *_):
+        """Drop every entry (also usable as a writer listener)"""
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def _check_version(self):
+        if self.version is None:
+            return
+        current = self.version()
+        if current != self.seen_version:
+            if self.seen_version is not None:
+                self.invalidate()
+            self.seen_version = current
+
+    def _lookup(self, key, now):
+        self._check_version()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires > now:
+                return entry, self.generation
+            return None, self.generation
+
+    def _store(self, key, entry, generation):
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = entry
+
+    def _respond(self, request, entry):
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == entry.etag:
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def cached(self, ttl=None):
+        """
+        Decorator for sync JSON routes. Place it under the @router.get line so
+        FastAPI registers the wrapper (which also takes the Request).
+        """
+        ttl = self.ttl if ttl is None else ttl
+
+        def decorator(func):
+            signature = inspect.signature(func)
+            # Both dashboard routers serve the same paths from this cache
+            route = (func.__module__, func.__qualname__)
+
+            @wraps(func)
+            def wrapper(request: Request, **kwargs):
+                key = (route, request.url.path, tuple(sorted(request.query_params.multi_items())))
+                now = time.time()
+
+                entry, generation = self._lookup(key, now)
+                if entry is not None:
+                    self.hits += 1
+                    return self._respond(request, entry)
+
+                self.misses += 1
+                result = func(**kwargs)
+                body = json.dumps(
+                    jsonable_encoder(result),
+                    ensure_ascii=False,
+                    allow_nan=False,
+                    separators=(",", ":"),
+                ).encode("utf-8")
+                etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+                entry = CacheEntry(body, etag, now + ttl)
+                self._store(key, entry, generation)
+                return self._respond(request, entry)
+
+            params = [
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            ]
+            params += [
+                p.replace(kind=inspect.Parameter.KEYWORD_ONLY)
+                for p in signature.parameters.values()
+            ]
+            wrapper.__signature__ = signature.replace(parameters=params)
+            return wrapper
+
+        return decorator
+
+    def stats(self):
+        with self.lock:
+            size = len(self.entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": size,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / max(lookups, 1), 3),
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global instance shared by both dashboard routers
+response_cache = ResponseCache(version=db_version)
+writer.add_listener(response_cache.invalidate)
@@ -1,25 +1,285 @@
 """
 SiteSafeAI — SQLite Database Layer
-Creates and manages the sitesafe.db database with workers, zones, and violations tables.
+Creates and manages the sitesafe.db database with workers, zones, violations and rollup tables.
 """
 
 import sqlite3
 import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+from backend.rollups import ensure_rollups
 
 DB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database")
 DB_PATH = os.path.join(DB_DIR, "sitesafe.db")
 
+# Per-connection tuning (journal_mode=WAL is persistent and set in init_db)
+CACHE_SIZE_KB = int(os.environ.get("SITESAFE_DB_CACHE_KB", 32 * 1024))
+MMAP_SIZE = int(os.environ.get("SITESAFE_DB_MMAP", 256 * 1024 * 1024))
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+# Pooled read-only connections for the API routes
+POOL_READERS = int(os.environ.get("SITESAFE_DB_READERS", 4))
+POOL_TIMEOUT = 10.0  # seconds to wait for a free connection
+
+# Dashboard filters hit these; `day` is a generated column so date filters
+# and GROUP BY day can use an index instead of DATE(timestamp) on every row
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_violations_day ON violations(day, severity_grade, worker_id)",
+    "CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations(timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_violations_worker ON violations(worker_id, violation_type, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_violations_zone ON violations(zone_id, day)",
+    "CREATE INDEX IF NOT EXISTS idx_violations_geofence ON violations(is_geofence, zone_name)",
+]
+
+
+def _tune(conn):
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def get_connection():
+    """A new, unpooled connection (schema setup, scripts). Routes use read_connection()."""
+    return _tune(sqlite3.connect(DB_PATH, check_same_thread=False))
+
+
+def open_reader(path):
+    """A new read-only connection to `path`"""
+    uri = f"file:{path}?mode=ro"
+    conn = _tune(sqlite3.connect(uri, uri=True, check_same_thread=False))
+    conn.execute("PRAGMA query_only=ON")
     return conn
 
 
+class ConnectionPool:
+    """
+    Reusable connections for one database file: up to `readers` read-only
+    connections handed out LIFO, plus a single writer connection behind a
+    lock. PRAGMAs are applied once, when a connection is opened.
+    """
+
+    def __init__(self, path, readers=POOL_READERS, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.max_readers = readers
+        self.timeout = timeout
+
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        self.writes = 0
+        self.write_wait_time = 0.0
+
+    def _open_reader(self):
+        return open_reader(self.path)
+
+    def _checkout(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if self.opened < self.max_readers:
+                self.opened += 1
+                opening = True
+            else:
+                opening = False
+
+        if opening:
+            try:
+                return self._open_reader()
+            except Exception:
+                with self.lock:
+                    self.opened -= 1
+                raise
+
+        start = time.perf_counter()
+        try:
+            conn = self.idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"no database connection free after {self.timeout}s"
+            ) from None
+        with self.lock:
+            self.waits += 1
+            self.wait_time += time.perf_counter() - start
+        return conn
+
+    @contextmanager
+    def read(self):
+        conn = self._checkout()
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+        try:
+            yield conn
+        finally:
+            # A reader never commits; end any read transaction left open
+            if conn.in_transaction:
+                conn.rollback()
+            with self.lock:
+                self.in_use -= 1
+            self.idle.put(conn)
+
+    @contextmanager
+    def write(self):
+        """The single writer connection; the block runs as one transaction"""
+        start = time.perf_counter()
+        with self.writer_lock:
+            self.write_wait_time += time.perf_counter() - start
+            if self.writer is None:
+                self.writer = _tune(sqlite3.connect(self.path, check_same_thread=False))
+            self.writes += 1
+            with self.writer:
+                yield self.writer
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self.writer_lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+        with self.lock:
+            self.opened = self.in_use
+
+    def stats(self):
+        with self.lock:
+            return {
+                "readers_max": self.max_readers,
+                "readers_open": self.opened,
+                "readers_in_use": self.in_use,
+                "readers_peak": self.max_in_use,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "avg_wait_ms": round(self.wait_time / max(self.waits, 1) * 1000, 2),
+                "writer_open": self.writer is not None,
+                "writes": self.writes,
+                "avg_write_wait_ms": round(self.write_wait_time / max(self.writes, 1) * 1000, 2),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool for DB_PATH (rebuilt if DB_PATH is repointed)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def read_connection():
+    """`with read_connection() as conn:` — pooled read-only connection"""
+    return get_pool().read()
+
+
+def db_version():
+    """
+    Cheap change marker for the database file, valid across processes:
+    (mtime, size) of the file and of its WAL. Any commit, from any
+    process, appends to the WAL (or rewrites the file), so it changes.
+    """
+    version = []
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            st = os.stat(path)
+            version += [st.st_mtime_ns, st.st_size]
+        except OSError:
+            version += [0, 0]
+    return tuple(version)
+
+
+@contextmanager
+def export_connection():
+    """
+    `with export_connection() as conn:` — a read-only connection of its own,
+    outside the pool, for streamed exports: those last as long as the
+    client takes to download and would starve the pool's readers.
+    """
+    conn = open_reader(DB_PATH)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def write_connection():
+    """`with write_connection() as conn:` — the writer connection, one transaction"""
+    return get_pool().write()
+
+
+def migrate(conn):
+    """
+    Bring an existing database up to the current schema.
+    Safe to run on every start: each step checks before it changes anything.
+    """
+    # table_xinfo also lists generated columns
+    columns = {r[1] for r in conn.execute("PRAGMA table_xinfo(violations)")}
+
+    if "zone_id" not in columns:
+        conn.execute("ALTER TABLE violations ADD COLUMN zone_id INTEGER")
+
+    if "day" not in columns:
+        conn.execute("""
+        ALTER TABLE violations ADD COLUMN day TEXT
+        GENERATED ALWAYS AS (substr(timestamp, 1, 10)) VIRTUAL
+        """)
+
+    for sql in INDEXES:
+        conn.execute(sql)
+
+    ensure_rollups(conn)
+
+
 def init_db():
     conn = get_connection()
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
 
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS workers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        role TEXT DEFAULT 'Worker',
+        registration_date TEXT,
+        is_active INTEGER DEFAULT 1
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS zones (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        zone_type TEXT,
+        risk_level TEXT,
+        coordinates TEXT,
+        created_at TEXT
+    )
+    """)
+
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS violations (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -28,11 +288,16 @@ def init_db():
         severity_grade INTEGER,
         zone_name TEXT,
         is_geofence INTEGER DEFAULT 0,
-        timestamp TEXT
+        timestamp TEXT,
+        zone_id INTEGER,
+        day TEXT GENERATED ALWAYS AS (substr(timestamp, 1, 10)) VIRTUAL
     )
     """)
 
+    migrate(conn)
+
     conn.commit()
+    conn.execute("PRAGMA optimize")
     conn.close()
 
 
@@ -0,0 +1,181 @@
+"""
+SiteSafeAI — Streaming Violation Export
+Streams query results straight from a cursor in fixed-size chunks,
+so memory stays flat no matter how many rows are exported. CSV is always
+available (optionally gzipped); Parquet and Arrow IPC need pyarrow.
+"""
+
+import io
+import csv
+import zlib
+import logging
+from datetime import datetime
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from backend.database import export_connection
+
+logger = logging.getLogger("sitesafeai")
+
+# pyarrow is optional; only the parquet/arrow formats need it
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except Exception:
+    pa = pq = None
+    PYARROW_AVAILABLE = False
+
+EXPORT_CHUNK_ROWS = 5000
+
+# format: (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+
+def date_filters(column, date=None, start=None, end=None):
+    """WHERE clauses + params for a single day or an inclusive day range"""
+    clauses, params = [], []
+    if date:
+        clauses.append(f"{column} = ?")
+        params.append(date)
+    if start:
+        clauses.append(f"{column} >= ?")
+        params.append(start)
+    if end:
+        clauses.append(f"{column} <= ?")
+        params.append(end)
+    return clauses, params
+
+
+def iter_chunks(sql, params, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Row chunks from one cursor. The connection is held until the stream
+    ends, so it is a dedicated one rather than a pooled reader.
+    """
+    with export_connection() as conn:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+
+
+def iter_csv(chunks, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([name for name, _ in columns])
+
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+
+    # Header only, when there were no rows
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+class _Sink:
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+        self.pos = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_arrow(chunks, columns, parquet=False):
+    types = {"int": pa.int64(), "str": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _Sink()
+
+    if parquet:
+        writer = pq.ParquetWriter(sink, schema)
+        write = writer.write_table
+        to_table = lambda batch: pa.Table.from_batches([batch])
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+        to_table = lambda batch: batch
+
+    for rows in chunks:
+        arrays = [
+            pa.array([r[i] for r in rows], type=field.type)
+            for i, field in enumerate(schema)
+        ]
+        write(to_table(pa.RecordBatch.from_arrays(arrays, schema=schema)))
+        data = sink.drain()
+        if data:
+            yield data
+
+    writer.close()
+    yield sink.drain()
+
+
+def iter_gzip(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip container
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(sql, params, columns, name, fmt="csv", gzip=False):
+    """
+    StreamingResponse for an export query.
+    `columns` is [(header, "int" | "str")]; the kinds type the Arrow schema.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format '{fmt}'")
+    if fmt != "csv" and not PYARROW_AVAILABLE:
+        raise HTTPException(
+            status_code=501,
+            detail=f"{fmt} export needs pyarrow. To enable, run: pip install pyarrow"
+        )
+
+    chunks = iter_chunks(sql, params)
+    if fmt == "csv":
+        body = iter_csv(chunks, columns)
+    else:
+        body = iter_arrow(chunks, columns, parquet=(fmt == "parquet"))
+
+    media_type, ext = EXPORT_FORMATS[fmt]
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d')}.{ext}"
+    if gzip:
+        body = iter_gzip(body)
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
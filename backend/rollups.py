@@ -0,0 +1,128 @@
+"""
+SiteSafeAI — Violation Rollups
+Hourly and daily violation counts, kept current by triggers on every
+insert into `violations`. Dashboard aggregates read these instead of
+scanning the raw table.
+
+Each table rolls up one set of dimensions (severity/type, worker, zone)
+rather than their full cross product, which would have about as many
+rows as the raw table.
+
+Rebuild from the raw table (after bulk edits/deletes or a restore):
+Usage: python -m backend.rollups --backfill
+"""
+
+import sys
+import time
+
+HOUR = 13  # bucket = 'YYYY-MM-DD HH'
+DAY = 10   # bucket = 'YYYY-MM-DD'
+
+# table: (bucket width, {column: (type, default for NULL)})
+ROLLUPS = {
+    "violation_rollup_hourly": (HOUR, {
+        "severity_grade": ("INTEGER", 0),
+        "violation_type": ("TEXT", "''"),
+        "is_geofence": ("INTEGER", 0),
+    }),
+    "violation_rollup_daily": (DAY, {
+        "severity_grade": ("INTEGER", 0),
+        "violation_type": ("TEXT", "''"),
+        "is_geofence": ("INTEGER", 0),
+    }),
+    "violation_rollup_daily_worker": (DAY, {
+        "worker_id": ("TEXT", "''"),
+    }),
+    "violation_rollup_daily_zone": (DAY, {
+        "zone_id": ("INTEGER", 0),
+        "zone_name": ("TEXT", "''"),
+        "is_geofence": ("INTEGER", 0),
+    }),
+}
+
+
+def _keys(dims):
+    return "bucket, " + ", ".join(dims)
+
+
+def _values(src, width, dims):
+    # Key columns can't be NULL (NULLs never collide in a UNIQUE key), so
+    # missing values are stored as ''/0 and readers use NULLIF where it matters
+    values = [f"ifnull(substr({src}.timestamp, 1, {width}), '')"]
+    values += [f"ifnull({src}.{col}, {default})" for col, (_, default) in dims.items()]
+    return ", ".join(values)
+
+
+def ensure_rollups(conn):
+    """
+    Create the rollup tables and their insert triggers.
+    A freshly created table is backfilled from existing violations.
+    """
+    existing = {
+        r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    created = []
+
+    for table, (width, dims) in ROLLUPS.items():
+        if table not in existing:
+            columns = ",\n".join(f"{col} {kind} NOT NULL" for col, (kind, _) in dims.items())
+            conn.execute(f"""
+            CREATE TABLE {table} (
+                bucket TEXT NOT NULL,
+                {columns},
+                count INTEGER NOT NULL,
+                PRIMARY KEY ({_keys(dims)})
+            ) WITHOUT ROWID
+            """)
+            created.append(table)
+
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}
+        AFTER INSERT ON violations
+        BEGIN
+            INSERT INTO {table} ({_keys(dims)}, count)
+            VALUES ({_values("NEW", width, dims)}, 1)
+            ON CONFLICT ({_keys(dims)}) DO UPDATE SET count = count + 1;
+        END
+        """)
+
+    if created:
+        backfill(conn, created)
+
+
+def backfill(conn, tables=None):
+    """Rebuild rollup tables (all by default) from the raw violations table"""
+    for table in tables or ROLLUPS:
+        width, dims = ROLLUPS[table]
+        group = ", ".join(str(i) for i in range(1, len(dims) + 2))
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"""
+        INSERT INTO {table} ({_keys(dims)}, count)
+        SELECT {_values("violations", width, dims)}, COUNT(*)
+        FROM violations
+        GROUP BY {group}
+        """)
+
+
+def main():
+    from backend.database import get_connection
+
+    if "--backfill" not in sys.argv[1:]:
+        print(__doc__.strip())
+        return
+
+    conn = get_connection()
+    start = time.perf_counter()
+    with conn:
+        backfill(conn)
+    rows = {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ROLLUPS
+    }
+    conn.close()
+
+    print(f"✅ Rollups rebuilt in {time.perf_counter() - start:.1f}s: {rows}")
+
+
+if __name__ == "__main__":
+    main()
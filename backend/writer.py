@@ -0,0 +1,188 @@
+"""
+SiteSafeAI — Background Violation Writer
+Takes violation rows off the AI worker threads and writes them in batched
+executemany transactions on the pool's single writer connection.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from backend.database import write_connection
+
+logger = logging.getLogger("sitesafeai")
+
+WRITER_QUEUE_SIZE = 10000     # rows buffered before new ones are dropped
+WRITER_BATCH_SIZE = 500       # max rows per transaction
+WRITER_FLUSH_INTERVAL = 0.5   # seconds a row may wait for its batch to fill
+
+INSERT_VIOLATION = """
+INSERT INTO violations (
+    worker_id,
+    violation_type,
+    severity_grade,
+    zone_name,
+    is_geofence,
+    timestamp
+)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_STOP = object()
+
+
+class ViolationWriter:
+    """
+    Bounded in-memory queue + one writer thread.
+    put() never blocks the caller: if the queue is full the rows are
+    dropped and counted. Rows are grouped by size or time into a single
+    transaction each.
+    """
+
+    def __init__(
+        self,
+        max_queue=WRITER_QUEUE_SIZE,
+        batch_size=WRITER_BATCH_SIZE,
+        flush_interval=WRITER_FLUSH_INTERVAL
+    ):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.thread = None
+        self.lock = threading.Lock()
+        self.listeners = []
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_batch_rows = 0
+        self.write_time_total = 0.0
+        self.write_time_max = 0.0
+
+    # ---------- producer side ----------
+    def put(self, rows):
+        """Queue (worker_id, violation_type, severity_grade, zone_name, is_geofence, timestamp) tuples"""
+        self._ensure_started()
+        for row in rows:
+            try:
+                self.queue.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+
+    def add_listener(self, callback):
+        """callback(rows) runs on the writer thread after each committed batch"""
+        self.listeners.append(callback)
+
+    def flush(self):
+        """Block until every queued row is committed"""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """Flush and stop the writer thread (app shutdown / interpreter exit)"""
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is None:
+            return
+        self.queue.put(_STOP)
+        thread.join()
+
+    # ---------- writer thread ----------
+    def _ensure_started(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="sitesafe-db-writer", daemon=True
+                )
+                self.thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            batch = []
+            taken = 1
+
+            if item is _STOP:
+                stopping = True
+            else:
+                batch.append(item)
+
+            # Fill the batch until it is full or the oldest row has waited long enough
+            deadline = time.time() + self.flush_interval
+            while not stopping and len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            # Shutting down: drain whatever is left into the final batch
+            while stopping:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is not _STOP:
+                    batch.append(item)
+
+            if batch:
+                self._write(batch)
+
+            for _ in range(taken):
+                self.queue.task_done()
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            with write_connection() as conn:
+                conn.executemany(INSERT_VIOLATION, batch)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"DB writer failed on {len(batch)} rows: {e}")
+            return
+
+        elapsed = time.perf_counter() - start
+        self.written += len(batch)
+        self.batches += 1
+        self.last_batch_rows = len(batch)
+        self.write_time_total += elapsed
+        self.write_time_max = max(self.write_time_max, elapsed)
+
+        for callback in self.listeners:
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.error(f"DB writer listener failed: {e}")
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "batches": self.batches,
+            "last_batch_rows": self.last_batch_rows,
+            "avg_write_ms": round(self.write_time_total / max(self.batches, 1) * 1000, 2),
+            "max_write_ms": round(self.write_time_max * 1000, 2),
+        }
+
+
+# Global instance
+writer = ViolationWriter()
+atexit.register(writer.close)
@@ -0,0 +1,75 @@
+"""
+Offline-video throughput on CPU for batch sizes 1/4/8/16.
+Run from the project root: python test/bench_batch.py [video.mp4]
+(without a video, synthetic 1280x720 frames are used)
+"""
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.model import (
+    infer_openvino,
+    decode_yolov8_flat,
+    infer_openvino_batch,
+    decode_yolov8_batch,
+)
+
+NUM_FRAMES = 96
+
+
+def load_frames(path=None):
+    if path:
+        cap = cv2.VideoCapture(path)
+        frames = []
+        while len(frames) < NUM_FRAMES:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        return frames
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(NUM_FRAMES)]
+
+
+def run_single(frames):
+    for frame in frames:
+        output, scale, pad_x, pad_y = infer_openvino(frame)
+        decode_yolov8_flat(output, frame.shape, scale, pad_x, pad_y)
+
+
+def run_batched(frames, batch):
+    for i in range(0, len(frames), batch):
+        block = frames[i:i + batch]
+        outputs, metas = infer_openvino_batch(block, batch)
+        decode_yolov8_batch(outputs, [f.shape for f in block], metas)
+
+
+def main():
+    frames = load_frames(sys.argv[1] if len(sys.argv) > 1 else None)
+
+    # Batched decode must agree with the 1-frame path
+    block = frames[:4]
+    outputs, metas = infer_openvino_batch(block, 4)
+    for frame, detections in zip(block, decode_yolov8_batch(outputs, [f.shape for f in block], metas)):
+        output, scale, pad_x, pad_y = infer_openvino(frame)
+        assert detections == decode_yolov8_flat(output, frame.shape, scale, pad_x, pad_y)
+
+    start = time.perf_counter()
+    run_single(frames)
+    print(f"sync   batch  1: {len(frames) / (time.perf_counter() - start):6.1f} frames/s")
+
+    for batch in (1, 4, 8, 16):
+        run_batched(frames[:batch], batch)  # warm-up / compile
+        start = time.perf_counter()
+        run_batched(frames, batch)
+        print(f"batched batch {batch:2d}: {len(frames) / (time.perf_counter() - start):6.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark: dashboard query timings on a seeded 1M-row violations table,
+original schema + DATE(timestamp) filters vs migrated schema (indexes,
+generated `day` column) + range predicates.
+Uses a temporary database; the project DB is not touched.
+Run from the project root: python test/bench_db.py [rows]
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.database import migrate, CACHE_SIZE_KB, MMAP_SIZE
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+DAYS = 365
+RUNS = 5
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+WEEK_AGO = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+TWO_WEEKS_AGO = (datetime.now() - timedelta(days=14)).strftime("%Y-%m-%d")
+NINETY_AGO = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
+
+# (name, original SQL, rewritten SQL, params)
+QUERIES = [
+    ("violations today",
+     "SELECT COUNT(*) FROM violations WHERE DATE(timestamp) = ?",
+     "SELECT COUNT(*) FROM violations WHERE day = ?",
+     (TODAY,)),
+    ("critical today",
+     "SELECT COUNT(*) FROM violations WHERE DATE(timestamp) = ? AND severity_grade = 3",
+     "SELECT COUNT(*) FROM violations WHERE day = ? AND severity_grade = 3",
+     (TODAY,)),
+    ("violators today",
+     "SELECT COUNT(DISTINCT worker_id) FROM violations WHERE DATE(timestamp) = ?",
+     "SELECT COUNT(DISTINCT worker_id) FROM violations WHERE day = ?",
+     (TODAY,)),
+    ("daily trend 14d",
+     """SELECT DATE(timestamp) as date,
+               SUM(CASE WHEN severity_grade = 3 THEN 1 ELSE 0 END), COUNT(*)
+        FROM violations WHERE DATE(timestamp) >= ?
+        GROUP BY DATE(timestamp) ORDER BY date""",
+     """SELECT day as date,
+               SUM(CASE WHEN severity_grade = 3 THEN 1 ELSE 0 END), COUNT(*)
+        FROM violations WHERE day >= ?
+        GROUP BY day ORDER BY date""",
+     (TWO_WEEKS_AGO,)),
+    ("calendar 90d",
+     "SELECT DATE(timestamp) as date, COUNT(*) FROM violations WHERE DATE(timestamp) >= ? GROUP BY DATE(timestamp) ORDER BY date",
+     "SELECT day as date, COUNT(*) FROM violations WHERE day >= ? GROUP BY day ORDER BY date",
+     (NINETY_AGO,)),
+    ("previous week",
+     "SELECT COUNT(*) FROM violations WHERE DATE(timestamp) >= ? AND DATE(timestamp) < ?",
+     "SELECT COUNT(*) FROM violations WHERE day >= ? AND day < ?",
+     (TWO_WEEKS_AGO, WEEK_AGO)),
+    ("live feed",
+     "SELECT * FROM violations ORDER BY timestamp DESC LIMIT 20",
+     "SELECT * FROM violations ORDER BY timestamp DESC LIMIT 20",
+     ()),
+    ("zone today",
+     "SELECT zone_id, COUNT(*) FROM violations WHERE DATE(timestamp) = ? GROUP BY zone_id",
+     "SELECT zone_id, COUNT(*) FROM violations WHERE day = ? GROUP BY zone_id",
+     (TODAY,)),
+]
+
+
+def seed(path):
+    conn = sqlite3.connect(path)
+    # The schema as it was before the migration
+    conn.execute("""
+    CREATE TABLE violations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        worker_id TEXT,
+        violation_type TEXT,
+        severity_grade INTEGER,
+        zone_name TEXT,
+        is_geofence INTEGER DEFAULT 0,
+        timestamp TEXT,
+        zone_id INTEGER
+    )
+    """)
+
+    rng = random.Random(0)
+    start = datetime.now() - timedelta(days=DAYS)
+    span = DAYS * 86400
+    types = ["NO-Hardhat", "NO-Mask", "NO-Safety Vest", "Restricted Zone Entry"]
+
+    def rows():
+        for _ in range(ROWS):
+            ts = start + timedelta(seconds=rng.randrange(span))
+            zone = rng.randrange(1, 11)
+            yield (
+                str(rng.randrange(300)),
+                rng.choice(types),
+                rng.choice((1, 2, 3)),
+                f"Zone {zone}",
+                rng.randrange(2),
+                ts.strftime("%Y-%m-%d %H:%M:%S"),
+                zone,
+            )
+
+    conn.executemany(
+        "INSERT INTO violations (worker_id, violation_type, severity_grade, zone_name, is_geofence, timestamp, zone_id) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows()
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_query(conn, sql, params):
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = conn.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def tune(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+
+        start = time.perf_counter()
+        seed(path)
+        print(f"Seeded {ROWS} rows in {time.perf_counter() - start:.1f}s")
+
+        conn = sqlite3.connect(path)
+        before = {name: time_query(conn, old, params) for name, old, _, params in QUERIES}
+
+        start = time.perf_counter()
+        migrate(conn)
+        conn.commit()
+        conn.execute("ANALYZE")
+        tune(conn)
+        print(f"Migration (indexes + generated column) took {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'query':<18}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        for name, _, new, params in QUERIES:
+            t_old, r_old = before[name]
+            t_new, r_new = time_query(conn, new, params)
+            if name != "live feed":
+                assert r_old == r_new, f"{name}: results differ"
+            print(f"{name:<18}{t_old * 1000:>12.2f}{t_new * 1000:>12.2f}{t_old / max(t_new, 1e-9):>9.1f}x")
+
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: peak Python memory of the violations export, fetchall() +
+in-memory CSV vs the chunked streaming exporter, at growing row counts.
+Uses a temporary database; the project DB is not touched.
+Run from the project root: python test/bench_export.py [rows ...]
+"""
+import io
+import os
+import sys
+import csv
+import time
+import random
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import backend.database as database
+from backend.export import iter_chunks, iter_csv, iter_gzip
+
+SIZES = [int(a) for a in sys.argv[1:]] or [100_000, 500_000]
+
+SQL = """
+SELECT id, worker_id, zone_name, violation_type, severity_grade, timestamp
+FROM violations ORDER BY id DESC
+"""
+COLUMNS = [("ID", "int"), ("Worker", "str"), ("Zone", "str"),
+           ("Violation Type", "str"), ("Severity Grade", "int"), ("Timestamp", "str")]
+
+
+def seed(n):
+    rng = random.Random(0)
+    start = datetime.now() - timedelta(days=365)
+    rows = (
+        (str(rng.randrange(300)), rng.choice(["NO-Hardhat", "NO-Mask"]), rng.choice((1, 2, 3)),
+         f"Zone {rng.randrange(10)}", (start + timedelta(seconds=rng.randrange(365 * 86400))).strftime("%Y-%m-%d %H:%M:%S"))
+        for _ in range(n)
+    )
+    conn = database.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO violations (worker_id, violation_type, severity_grade, zone_name, timestamp) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+    conn.close()
+
+
+def export_fetchall():
+    """The pre-streaming export, kept as the reference"""
+    with database.read_connection() as conn:
+        rows = conn.execute(SQL).fetchall()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([name for name, _ in COLUMNS])
+    for r in rows:
+        writer.writerow(list(r))
+    return [output.getvalue().encode("utf-8")]
+
+
+def export_stream():
+    return iter_csv(iter_chunks(SQL, ()), COLUMNS)
+
+
+def measure(make_body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    total = 0
+    for block in make_body():
+        total += len(block)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total, peak, elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+
+        seeded = 0
+        print(f"{'rows':>9}  {'variant':<16}{'bytes':>12}{'peak MB':>10}{'seconds':>9}")
+        for n in SIZES:
+            seed(n - seeded)
+            seeded = n
+
+            results = [
+                ("fetchall", measure(export_fetchall)),
+                ("stream", measure(export_stream)),
+                ("stream + gzip", measure(lambda: iter_gzip(export_stream()))),
+            ]
+            assert results[0][1][0] == results[1][1][0], "CSV sizes differ"
+            for name, (size, peak, elapsed) in results:
+                print(f"{n:>9}  {name:<16}{size:>12}{peak / 1e6:>10.1f}{elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: face DB start-up and enrollment, embeddings.pkl (unpickle +
+build gallery, full rewrite per new worker) vs the memory-mapped
+EmbeddingStore (map + attach, append per new worker). Also checks that
+incremental enrollment keeps source rows right across a compaction.
+Uses a temporary directory. Run from the project root:
+    python test/bench_face_store.py [workers ...]
+"""
+import os
+import sys
+import time
+import pickle
+import hashlib
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# build_embeddings.py runs as a script next to store.py
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app", "services", "face_recognition")))
+
+from app.services.face_recognition.gallery import FaceGallery
+from app.services.face_recognition.store import EmbeddingStore
+
+SIZES = [int(a) for a in sys.argv[1:]] or [2_000, 20_000]
+DIM = 512
+VECTORS_PER_WORKER = 5
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def fake_embed(path):
+    """Deterministic stand-in for InsightFace: a vector derived from the file bytes"""
+    with open(path, "rb") as f:
+        seed = int.from_bytes(hashlib.sha1(f.read()).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def check_enroll_compaction():
+    """
+    Workers a-d with 2 images each; delete a (25% of rows tombstoned, so
+    the store compacts) and touch d/0.jpg without changing it. Every
+    source must still point at its own worker's row afterwards.
+    """
+    import build_embeddings
+
+    build_embeddings._init_face_app = lambda: None
+    build_embeddings._embed = fake_embed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        faces = os.path.join(tmp, "faces")
+        for worker in "abcd":
+            os.makedirs(os.path.join(faces, worker))
+            for i in range(2):
+                with open(os.path.join(faces, worker, f"{i}.jpg"), "wb") as f:
+                    f.write(f"{worker}{i}".encode())
+
+        store = build_embeddings.EmbeddingStore(os.path.join(tmp, "embeddings"))
+        build_embeddings.enroll(store, faces, workers=1)
+
+        for i in range(2):
+            os.remove(os.path.join(faces, "a", f"{i}.jpg"))
+        os.rmdir(os.path.join(faces, "a"))
+        touched = os.path.join(faces, "d", "0.jpg")
+        os.utime(touched, ns=(os.stat(touched).st_atime_ns, os.stat(touched).st_mtime_ns + 10**9))
+        build_embeddings.enroll(store, faces, workers=1)
+
+        snapshot = store.load()
+        assert len(snapshot) == 6, len(snapshot)
+        for key, info in snapshot.sources.items():
+            path = os.path.join(faces, *key.split("/"))
+            for row in info["rows"]:
+                assert row < len(snapshot), (key, info["rows"])
+                assert snapshot.labels[row] == info["worker"], (key, row)
+                assert np.allclose(snapshot.vectors[row], fake_embed(path) / np.linalg.norm(fake_embed(path)), atol=1e-5), key
+    print("enroll + compaction: source rows ok")
+
+
+def main():
+    check_enroll_compaction()
+
+    rng = np.random.default_rng(0)
+    print(f"{'workers':>8}  {'variant':<8}{'start ms':>10}{'enroll 1 ms':>13}{'MB on disk':>12}")
+
+    for workers in SIZES:
+        db = {
+            f"W{i:06d}": list(rng.standard_normal((VECTORS_PER_WORKER, DIM)).astype(np.float32))
+            for i in range(workers)
+        }
+        new = list(rng.standard_normal((VECTORS_PER_WORKER, DIM)).astype(np.float32))
+        query = db["W000000"][0]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pkl = os.path.join(tmp, "embeddings.pkl")
+            with open(pkl, "wb") as f:
+                pickle.dump(db, f)
+
+            def start_pickle():
+                with open(pkl, "rb") as f:
+                    return FaceGallery(pickle.load(f))
+
+            def enroll_pickle():
+                with open(pkl, "rb") as f:
+                    data = pickle.load(f)
+                data["NEW"] = new
+                with open(pkl, "wb") as f:
+                    pickle.dump(data, f)
+
+            store = EmbeddingStore(os.path.join(tmp, "embeddings"))
+            store.import_pickle(pkl)
+
+            gallery, t_pickle = timed(start_pickle)
+            _, e_pickle = timed(enroll_pickle)
+            assert gallery.match(query)[0] == "W000000"
+
+            gallery, t_store = timed(lambda: FaceGallery.from_snapshot(store.load()))
+            _, e_store = timed(lambda: store.append("NEW", np.stack(new)))
+            assert gallery.match(query)[0] == "W000000"
+            assert FaceGallery.from_snapshot(store.load()).match(new[0])[0] == "NEW"
+
+            size_pickle = os.path.getsize(pkl) / 1e6
+            size_store = sum(os.path.getsize(os.path.join(tmp, n)) for n in os.listdir(tmp) if n != "embeddings.pkl") / 1e6
+            print(f"{workers:>8}  {'pickle':<8}{t_pickle:>10.1f}{e_pickle:>13.1f}{size_pickle:>12.1f}")
+            print(f"{workers:>8}  {'store':<8}{t_store:>10.1f}{e_store:>13.1f}{size_store:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
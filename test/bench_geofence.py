@@ -0,0 +1,100 @@
+"""
+Benchmark: geofence IoA per frame, per-pair mask sums (the previous
+engine) vs summed-area tables with one vectorized lookup for every
+detection x zone pair. Also checks both give the same hits.
+Run from the project root: python test/bench_geofence.py [zones people]
+"""
+import os
+import sys
+import time
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.geofence.engine import GeofenceEngine
+from app.geofence.rules import rule_matches
+
+ZONES = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+PEOPLE = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+FRAMES = 50
+
+
+def mask_sum_hits(masks, detections, frame_shape, threshold):
+    """The previous engine's loop: np.sum over the box slice of every zone mask"""
+    h, w = frame_shape[:2]
+    hits = {}
+    for det in detections:
+        x1, y1, x2, y2 = det["bbox"]
+        x1, y1 = max(0, int(x1)), max(0, int(y1))
+        x2, y2 = min(w, int(x2)), min(h, int(y2))
+        box_area = (x2 - x1) * (y2 - y1)
+        if box_area <= 0:
+            continue
+        for name, mask in masks.items():
+            if rule_matches(name, det["class"]) and np.sum(mask[y1:y2, x1:x2]) / box_area > threshold:
+                hits.setdefault(name, []).append(det)
+    return hits
+
+
+def scene(frame_shape, rng):
+    h, w = frame_shape[:2]
+    zones = []
+    for i in range(ZONES):
+        cx, cy = rng.uniform(0, w), rng.uniform(0, h)
+        r = rng.uniform(0.05, 0.25) * h
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 6))
+        points = np.stack([cx + r * np.cos(angles), cy + r * np.sin(angles)], axis=1).astype(int)
+        zones.append({"name": f"zone-{i}", "points": points.tolist()})
+
+    frames = []
+    for _ in range(FRAMES):
+        dets = []
+        for _ in range(PEOPLE):
+            ph = rng.uniform(0.1, 0.5) * h
+            x, y = rng.uniform(0, w), rng.uniform(0, h)
+            dets.append({"class": "Person", "bbox": (x, y, x + ph / 3, y + ph)})
+            dets.append({"class": "NO-Hardhat", "bbox": (x, y, x + ph / 6, y + ph / 8)})
+        frames.append(dets)
+    return zones, frames
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{ZONES} zones, {PEOPLE} people (+ as many PPE boxes) per frame")
+    print(f"{'frame':>10}{'mask sums ms':>14}{'SAT ms':>9}{'speedup':>9}{'build ms':>10}{'tables MB':>11}{'masks MB':>10}")
+
+    for frame_shape in [(1080, 1920), (2160, 3840)]:
+        zones, frames = scene(frame_shape, rng)
+
+        engine = GeofenceEngine(ioa_threshold=0.3)
+        start = time.perf_counter()
+        engine.update_zones(zones, frame_shape)
+        engine._pack()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        masks = {}
+        for z in zones:
+            mask = np.zeros(frame_shape[:2], dtype=np.uint8)
+            cv2.fillPoly(mask, [np.array(z["points"], dtype=np.int32)], 1)
+            masks[z["name"]] = mask
+
+        start = time.perf_counter()
+        expected = [mask_sum_hits(masks, dets, frame_shape, 0.3) for dets in frames]
+        old_ms = (time.perf_counter() - start) * 1000 / FRAMES
+
+        start = time.perf_counter()
+        got = [engine.process_detections(dets, frame_shape, zones) for dets in frames]
+        new_ms = (time.perf_counter() - start) * 1000 / FRAMES
+
+        assert all({k: [id(d) for d in v] for k, v in a.items()} == {k: [id(d) for d in v] for k, v in b.items()}
+                   for a, b in zip(expected, got)), "hits differ"
+
+        tables_mb = engine._pack()[1].nbytes / 1e6
+        masks_mb = sum(m.nbytes for m in masks.values()) / 1e6
+        label = f"{frame_shape[1]}x{frame_shape[0]}"
+        print(f"{label:>10}{old_ms:>14.2f}{new_ms:>9.3f}{old_ms / new_ms:>8.0f}x{build_ms:>10.1f}{tables_mb:>11.1f}{masks_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+NumPy preprocessing vs the embedded OpenVINO PrePostProcessor graph.
+Reports Python-side preprocess time, end-to-end latency and bytes allocated
+per frame. Run from the project root: python test/bench_preprocess.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.model import INPUT_W, INPUT_H, compile_yolo, letterbox, preprocess
+
+NUM_FRAMES = 100
+
+
+def run(compiled, frames, preprocess_graph):
+    request = compiled.create_infer_request()
+    prep_s = total_s = 0.0
+    peak = 0
+    output = None
+
+    for frame in frames:
+        tracemalloc.start()
+        start = time.perf_counter()
+
+        img_lb, _, _, _ = letterbox(frame, (INPUT_W, INPUT_H))
+        inp = preprocess(img_lb, preprocess_graph)
+        prep_s += time.perf_counter() - start
+
+        request.infer({0: inp})
+        output = request.get_output_tensor(0).data
+        total_s += time.perf_counter() - start
+
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    n = len(frames)
+    return prep_s / n * 1000, total_s / n * 1000, peak, output.copy()
+
+
+def main():
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(NUM_FRAMES)]
+
+    results = {}
+    for preprocess_graph in (False, True):
+        compiled = compile_yolo(1, preprocess_graph)
+        run(compiled, frames[:5], preprocess_graph)  # warm-up
+        results[preprocess_graph] = run(compiled, frames, preprocess_graph)
+
+    for preprocess_graph, (prep_ms, total_ms, peak, _) in results.items():
+        name = "graph" if preprocess_graph else "numpy"
+        print(f"{name}: preprocess {prep_ms:6.2f} ms | preprocess+infer {total_ms:7.2f} ms | peak alloc {peak / 1e6:6.2f} MB/frame")
+
+    diff = np.abs(results[False][3] - results[True][3]).max()
+    print(f"max |output difference| between modes: {diff:.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: dashboard aggregates from the raw violations table vs the
+hourly/daily rollups, at growing history sizes. Also reports the insert
+overhead of the rollup triggers and the backfill time.
+Uses a temporary database; the project DB is not touched.
+Run from the project root: python test/bench_rollups.py [rows ...]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import backend.database as database
+from backend.rollups import ROLLUPS, backfill
+
+SIZES = [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000]
+VIOLATIONS_PER_DAY = 3000
+RUNS = 5
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+TWO_WEEKS_AGO = (datetime.now() - timedelta(days=14)).strftime("%Y-%m-%d")
+
+# (name, raw SQL, rollup SQL, params)
+QUERIES = [
+    ("today by severity",
+     "SELECT severity_grade, COUNT(*) FROM violations WHERE day = ? GROUP BY 1 ORDER BY 1",
+     "SELECT severity_grade, SUM(count) FROM violation_rollup_daily WHERE bucket = ? GROUP BY 1 ORDER BY 1",
+     (TODAY,)),
+    ("violators today",
+     "SELECT COUNT(DISTINCT worker_id) FROM violations WHERE day = ?",
+     "SELECT COUNT(DISTINCT NULLIF(worker_id, '')) FROM violation_rollup_daily_worker WHERE bucket = ?",
+     (TODAY,)),
+    ("daily trend 14d",
+     "SELECT day, COUNT(*) FROM violations WHERE day >= ? GROUP BY day ORDER BY day",
+     "SELECT bucket, SUM(count) FROM violation_rollup_daily WHERE bucket >= ? GROUP BY bucket ORDER BY bucket",
+     (TWO_WEEKS_AGO,)),
+    ("severity all-time",
+     "SELECT severity_grade, COUNT(*) FROM violations GROUP BY 1 ORDER BY 1",
+     "SELECT severity_grade, SUM(count) FROM violation_rollup_daily GROUP BY 1 ORDER BY 1",
+     ()),
+    ("top zone today",
+     "SELECT zone_id, COUNT(*) c FROM violations WHERE day = ? GROUP BY 1 ORDER BY c DESC, 1 LIMIT 1",
+     "SELECT zone_id, SUM(count) c FROM violation_rollup_daily_zone WHERE bucket = ? GROUP BY 1 ORDER BY c DESC, 1 LIMIT 1",
+     (TODAY,)),
+    ("workers all-time",
+     "SELECT COUNT(DISTINCT worker_id) FROM violations",
+     "SELECT COUNT(DISTINCT NULLIF(worker_id, '')) FROM violation_rollup_daily_worker",
+     ()),
+    ("geofence total",
+     "SELECT COUNT(*) FROM violations WHERE is_geofence = 1",
+     "SELECT SUM(count) FROM violation_rollup_daily WHERE is_geofence = 1",
+     ()),
+    ("most common type",
+     "SELECT violation_type, COUNT(*) c FROM violations GROUP BY 1 ORDER BY c DESC, 1 LIMIT 1",
+     "SELECT violation_type, SUM(count) c FROM violation_rollup_daily GROUP BY 1 ORDER BY c DESC, 1 LIMIT 1",
+     ()),
+    ("hour of day",
+     "SELECT strftime('%H', timestamp) h, COUNT(*) FROM violations GROUP BY h ORDER BY h",
+     "SELECT substr(bucket, 12, 2) h, SUM(count) FROM violation_rollup_hourly GROUP BY h ORDER BY h",
+     ()),
+]
+
+TYPES = ["NO-Hardhat", "NO-Mask", "NO-Safety Vest", "Restricted Zone Entry"]
+
+
+def rows(n, rng):
+    # A fixed daily rate, so a bigger table means a longer history
+    days = max(1, n // VIOLATIONS_PER_DAY)
+    start = datetime.now() - timedelta(days=days - 1)
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(n):
+        ts = start + timedelta(seconds=rng.randrange(days * 86400))
+        zone = rng.randrange(1, 9)
+        geo = rng.randrange(2)
+        yield (
+            str(rng.randrange(1, 41)),
+            rng.choice(TYPES),
+            rng.choice((1, 2, 3)),
+            f"Zone {zone}" if geo else None,
+            geo,
+            ts.strftime("%Y-%m-%d %H:%M:%S"),
+            zone,
+        )
+
+
+def timed(conn, sql, params):
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = conn.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best, [tuple(r) for r in result]
+
+
+def run(n, tmp):
+    database.DB_PATH = os.path.join(tmp, f"bench_{n}.db")
+    database.init_db()
+    conn = database.get_connection()
+
+    start = time.perf_counter()
+    with conn:
+        conn.executemany(
+            "INSERT INTO violations (worker_id, violation_type, severity_grade, zone_name, is_geofence, timestamp, zone_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows(n, random.Random(0))
+        )
+    t_insert = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with conn:
+        backfill(conn)
+    t_backfill = time.perf_counter() - start
+    conn.execute("ANALYZE")
+
+    rollup_rows = sum(
+        conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ROLLUPS
+    )
+    print(f"\n{n} rows ({n // VIOLATIONS_PER_DAY} days): insert with triggers {t_insert:.1f}s, "
+          f"backfill {t_backfill:.1f}s, {rollup_rows} rollup rows")
+    print(f"{'query':<20}{'raw ms':>10}{'rollup ms':>12}")
+
+    for name, raw, rollup, params in QUERIES:
+        t_raw, r_raw = timed(conn, raw, params)
+        t_roll, r_roll = timed(conn, rollup, params)
+        assert r_raw == r_roll, f"{name}: {r_raw[:3]} != {r_roll[:3]}"
+        print(f"{name:<20}{t_raw * 1000:>10.2f}{t_roll * 1000:>12.2f}")
+
+    conn.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in SIZES:
+            run(n, tmp)
+
+
+if __name__ == "__main__":
+    main()
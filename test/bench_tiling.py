@@ -0,0 +1,212 @@
+"""
+Benchmark: full-frame vs ROI vs tiled (SAHI-style) inference on 4K
+frames. Reports model images per frame, infer calls, time per frame and
+recall of people / hardhat-sized boxes for each mode, over the whole
+frame and inside the geofence zone (what ROI mode is for). One model
+image is one 640x640 pass, so recall per image is recall per FLOP.
+
+    python test/bench_tiling.py                 # synthetic 4K site frames
+    python test/bench_tiling.py clip.mp4        # recorded footage
+
+With the model weights present frames go through the real model (on
+recorded footage there is no ground truth, so only cost and detection
+counts are printed). Without them a size-limited stand-in detector is
+used: it finds an object when at least MIN_SIDE model-input pixels of it
+are visible in a crop, which is the effect the tiling is meant to fix;
+its boxes still go through the real tiling / merge code.
+"""
+import os
+import sys
+import time
+import types
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.tracker import iou_matrix
+
+FRAMES = 20
+SIZE = (2160, 3840)
+# Smallest object side (in model-input pixels) the stand-in detector sees
+MIN_SIDE = 10
+# Share of workers with a second one standing partly behind them
+OCCLUDED = 0.3
+# Assumed model cost per 640x640 image when the model can't be loaded
+ASSUMED_INFER_MS = 25.0
+
+# A zone over the far half of the yard, for ROI mode
+ZONE = {"name": "far yard", "points": [[600, 500], [3300, 500], [3300, 1300], [600, 1300]]}
+
+MODES = [
+    ("full", {"inference_mode": "full"}),
+    ("roi", {"inference_mode": "roi", "geofence_enabled": True, "zones": [ZONE]}),
+    ("tiled 0.2", {"inference_mode": "tiled", "tile_overlap": 0.2, "tile_full_frame": False}),
+    ("tiled 0.2 +full", {"inference_mode": "tiled", "tile_overlap": 0.2, "tile_full_frame": True}),
+    ("tiled 0.1 +full", {"inference_mode": "tiled", "tile_overlap": 0.1, "tile_full_frame": True}),
+]
+
+
+def load_model():
+    try:
+        from app.services import stream
+    except Exception:
+        return None
+    return stream
+
+
+def synthetic_frames(rng):
+    """
+    Yard seen by a 4K camera: workers far away (small, top of the frame)
+    to close by (tall, bottom). Yields (frame, [(class, box)]).
+    """
+    h, w = SIZE
+    background = cv2.GaussianBlur(rng.integers(40, 120, (h, w, 3), dtype=np.uint8), (0, 0), 3)
+
+    for _ in range(FRAMES):
+        frame = background.copy()
+        truth = []
+        for _ in range(rng.integers(15, 30)):
+            y = rng.uniform(400, 1900)
+            # Perspective: height grows from ~40 px at the back to ~700 px in front
+            ph = int(40 + (y - 400) / 1500 * 660)
+            pw = max(8, ph // 3)
+            x = int(rng.uniform(0, w - pw))
+            y1 = int(min(y, h - ph))
+            person = (x, y1, x + pw, y1 + ph)
+            hat = (x + pw // 4, y1, x + pw - pw // 4, y1 + max(4, ph // 8))
+            people = [(person, hat)]
+            if rng.random() < OCCLUDED:
+                # A second worker partly behind the first
+                dx = int(pw * rng.uniform(0.3, 0.5))
+                people.append(((x + dx, y1, x + dx + pw, y1 + ph), (hat[0] + dx, hat[1], hat[2] + dx, hat[3])))
+            for person, hat in people:
+                truth.append(("Person", person))
+                truth.append(("NO-Hardhat", hat))
+                cv2.rectangle(frame, person[:2], person[2:], (200, 180, 60), -1)
+                cv2.rectangle(frame, hat[:2], hat[2:], (30, 30, 220), -1)
+        yield frame, truth
+
+
+def video_frames(path):
+    cap = cv2.VideoCapture(path)
+    for _ in range(FRAMES):
+        ok, frame = cap.read()
+        if not ok:
+            break
+        yield frame, None
+    cap.release()
+
+
+def stand_in_detect(truth, regions):
+    """What a detector with a MIN_SIDE limit finds in each region, merged like the real path"""
+    from app.services.tiling import merge_detections
+    detections = []
+    sources = []
+    for r, (x0, y0, x1, y1) in enumerate(regions):
+        scale = min(640 / (x1 - x0), 640 / (y1 - y0))
+        for cls, (a, b, c, d) in truth:
+            vx1, vy1, vx2, vy2 = max(a, x0), max(b, y0), min(c, x1), min(d, y1)
+            if vx2 <= vx1 or vy2 <= vy1:
+                continue
+            visible = (vx2 - vx1) * (vy2 - vy1) / ((c - a) * (d - b))
+            if visible < 0.3 or min(vx2 - vx1, vy2 - vy1) * scale < MIN_SIDE:
+                continue
+            detections.append({"class": cls, "confidence": 0.5 + 0.4 * visible, "bbox": (vx1, vy1, vx2, vy2)})
+            sources.append(r)
+    if len(regions) == 1:
+        return detections
+    return merge_detections(detections, sources, regions, SIZE)
+
+
+def in_zone(truth):
+    zone = np.array(ZONE["points"], dtype=np.float32)
+    return [(c, b) for c, b in truth
+            if cv2.pointPolygonTest(zone, ((b[0] + b[2]) / 2, (b[1] + b[3]) / 2), False) >= 0]
+
+
+def recall(found, truth, cls):
+    truth = [b for c, b in truth if c == cls]
+    found = [d["bbox"] for d in found if d["class"] == cls]
+    if not truth:
+        return 1.0
+    if not found:
+        return 0.0
+    return float((iou_matrix(truth, found).max(axis=1) >= 0.5).mean())
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    stream = load_model()
+    if stream is None:
+        # Only the region planning is needed from stream.py here
+        sys.modules.setdefault("app.services.model", types.SimpleNamespace(
+            infer_openvino=None, decode_yolov8_flat=None, infer_openvino_batch=None,
+            decode_yolov8_batch=None, CLASS_NAMES=[], INPUT_W=640, INPUT_H=640, VIDEO_BATCH=8))
+        sys.modules.setdefault("app.services.face_recognition.recognize", types.SimpleNamespace(recognize_crop=None))
+        from app.services import stream as planner
+    else:
+        planner = stream
+    from app.services.tiling import TILE_BATCH
+
+    rng = np.random.default_rng(0)
+    frames = list(video_frames(path) if path else synthetic_frames(rng))
+    if stream is None and path:
+        print("no model weights: recorded footage needs the model")
+        return
+
+    print(f"frames: {len(frames)} ({SIZE[1]}x{SIZE[0]} synthetic)" if not path else f"clip: {path}")
+    print(f"detector: {'model' if stream else f'stand-in (min side {MIN_SIDE} px)'}")
+    print(f"{'':<17}{'':>7}{'':>6}{'':>10}{'':>7}{'whole frame':>26}{'in zone':>24}")
+    print(f"{'mode':<17}{'images':>7}{'calls':>6}{'ms/frame':>10}{'dets':>7}"
+          f"{'person R':>10}{'hat R':>8}{'extra':>8}{'person R':>10}{'hat R':>8}{'R/img':>6}")
+
+    for name, settings in MODES:
+        state = types.SimpleNamespace(settings=dict(settings))
+        images = calls = dets = extra = 0
+        elapsed = 0.0
+        recalls = []
+
+        for frame, truth in frames:
+            regions = planner.inference_regions(frame, state) or [(0, 0, frame.shape[1], frame.shape[0])]
+            images += len(regions)
+            calls += 1 if len(regions) == 1 else -(-len(regions) // TILE_BATCH)
+
+            start = time.perf_counter()
+            if stream is not None:
+                found = stream.detect_frame(frame, state)
+            else:
+                found = stand_in_detect(truth, regions)
+            elapsed += time.perf_counter() - start
+            dets += len(found)
+
+            if truth is not None:
+                zone_truth = in_zone(truth)
+                recalls.append([recall(found, truth, "Person"), recall(found, truth, "NO-Hardhat"),
+                                recall(found, zone_truth, "Person"), recall(found, zone_truth, "NO-Hardhat")])
+                matched = iou_matrix([d["bbox"] for d in found], [b for _, b in truth]).max(axis=1) >= 0.5 \
+                    if found else np.zeros(0, bool)
+                extra += int((~matched).sum())
+
+        n = len(frames)
+        ms = elapsed / n * 1000
+        if stream is None:
+            # Stand-in detection is free; add the assumed model cost
+            ms += images / n * ASSUMED_INFER_MS
+        if recalls:
+            person, hat, zone_person, zone_hat = np.mean(recalls, axis=0)
+            # In-zone hardhat recall per 640x640 model pass
+            scores = (f"{person:>10.3f}{hat:>8.3f}{extra / n:>8.1f}"
+                      f"{zone_person:>10.3f}{zone_hat:>8.3f}{zone_hat / (images / n):>6.2f}")
+        else:
+            scores = f"{'n/a':>10}{'n/a':>8}{'n/a':>8}{'n/a':>10}{'n/a':>8}{'n/a':>6}"
+        print(f"{name:<17}{images / n:>7.1f}{calls / n:>6.1f}{ms:>10.1f}{dets / n:>7.1f}{scores}")
+
+    if stream is None:
+        print(f"ms/frame assumes {ASSUMED_INFER_MS:.0f} ms per 640x640 image (no batching gain)")
+    print("extra = detections matching no true object (split or fused boxes); "
+          "R/img = in-zone hat recall per model image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: tracker stage on a synthetic scene (people walking, some
+without hardhats, detector jitter / dropouts / confidence dips).
+Reports tracker cost per frame, id switches, and violation rows written
+by the old "every 2 s, every violation in the frame" policy vs one row
+per track episode, plus violators the episode log never recorded (some
+missing hardhats are only ever detected at low confidence).
+Run from the project root: python test/bench_tracker.py [people ...]
+"""
+import os
+import sys
+import time
+import types
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.tracker import ByteTracker
+
+# stream.py pulls in the model and InsightFace; only its pure helpers are needed here
+sys.modules.setdefault("app.services.model", types.SimpleNamespace(
+    infer_openvino=None, decode_yolov8_flat=None, infer_openvino_batch=None, decode_yolov8_batch=None,
+    CLASS_NAMES=[], INPUT_W=640, INPUT_H=640, VIDEO_BATCH=8))
+sys.modules.setdefault("app.services.face_recognition.recognize", types.SimpleNamespace(recognize_crop=None))
+from app.services import stream as stream_mod  # noqa: E402
+
+SIZES = [int(a) for a in sys.argv[1:]] or [5, 30]
+FPS = 16
+SECONDS = 120
+DROPOUT = 0.1      # share of frames a detection is missed
+LOW_CONF = 0.15    # share of sightings with a weak (0.3-0.5) confidence
+JITTER = 4         # px
+WEAK_HAT = 0.25    # share of people without a hardhat whose box stays at 0.25-0.5
+
+
+def scene(people, rng):
+    """Per-frame detection lists + the true person index of each detection"""
+    pos = rng.uniform([0, 100], [1800, 700], (people, 2))
+    vel = rng.uniform(-40, 40, (people, 2))
+    no_hat = rng.random(people) < 0.4
+    weak_hat = no_hat & (rng.random(people) < WEAK_HAT)
+    frames = []
+
+    for _ in range(FPS * SECONDS):
+        pos += vel / FPS
+        # Bounce off the frame edges
+        out = (pos < [0, 100]) | (pos > [1800, 700])
+        vel[out] *= -1
+        dets = []
+        for p in range(people):
+            x, y = pos[p] + rng.normal(0, JITTER, 2)
+            items = [("Person", (x, y, x + 80, y + 240))]
+            if no_hat[p]:
+                items.append(("NO-Hardhat", (x + 20, y, x + 60, y + 40)))
+            for cls, box in items:
+                if rng.random() < DROPOUT:
+                    continue
+                weak = rng.random() < LOW_CONF or (cls == "NO-Hardhat" and weak_hat[p])
+                conf = rng.uniform(0.3, 0.5) if weak else rng.uniform(0.6, 0.95)
+                dets.append(({"class": cls, "confidence": float(conf),
+                              "bbox": tuple(int(v) for v in box)}, p))
+        frames.append(dets)
+    return frames, no_hat
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'people':>7}{'frames':>8}{'ms/frame':>10}{'id switches':>13}{'rows old':>10}{'rows new':>10}{'violators':>11}{'unlogged':>10}")
+
+    for people in SIZES:
+        frames, no_hat = scene(people, rng)
+        stream = types.SimpleNamespace(tracker=ByteTracker(), episodes={}, episodes_logged=0)
+
+        owner = {}
+        switches = 0
+        rows_old = rows_new = 0
+        last_save = -1e9
+        logged = set()
+        elapsed = 0.0
+
+        for i, tagged in enumerate(frames):
+            now = i / FPS
+            detections = [d for d, _ in tagged]
+
+            start = time.perf_counter()
+            stream.tracker.update(detections, now)
+            stream_mod.attribute_workers(detections, stream.tracker.tracks)
+            stream_mod.expire_episodes(stream, now)
+            fresh = stream_mod.new_episodes(stream, [d for d in detections if d["class"].startswith("NO-")], None, now)
+            elapsed += time.perf_counter() - start
+            logged.update(p for d, p in tagged if any(d is f for f in fresh))
+
+            rows_new += len(fresh)
+            if now - last_save > 2:
+                rows_old += sum(d["class"].startswith("NO-") for d in detections)
+                last_save = now
+
+            for d, p in tagged:
+                if d["class"] == "Person" and "track_id" in d:
+                    if owner.get(p, d["track_id"]) != d["track_id"]:
+                        switches += 1
+                    owner[p] = d["track_id"]
+
+        ms = elapsed / len(frames) * 1000
+        violators = int(no_hat.sum())
+        print(f"{people:>7}{len(frames):>8}{ms:>10.3f}{switches:>13}{rows_old:>10}{rows_new:>10}"
+              f"{violators:>11}{violators - len(logged):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark: worker list endpoints, per-worker "most common violation"
+follow-up queries (N+1) vs the single windowed query.
+Uses a temporary database; the project DB is not touched.
+Run from the project root: python test/bench_workers.py [workers] [rows]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import backend.database as database
+from app.api.dashboard import worker_intelligence as cached_worker_intelligence
+from backend.routes.dashboard import get_workers as cached_get_workers
+
+# Time the queries, not the response cache
+worker_intelligence = cached_worker_intelligence.__wrapped__
+get_workers = cached_get_workers.__wrapped__
+
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+ROWS = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+RUNS = 3
+
+TYPES = ["NO-Hardhat", "NO-Mask", "NO-Safety Vest", "Restricted Zone Entry", "Multiple PPE Violations"]
+
+
+def seed():
+    conn = database.get_connection()
+    rng = random.Random(0)
+
+    conn.executemany(
+        "INSERT INTO workers (name, role, registration_date, is_active) VALUES (?, ?, ?, ?)",
+        [(f"Worker {i}", "Worker", "2025-01-01", 1) for i in range(WORKERS)]
+    )
+
+    start = datetime.now() - timedelta(days=365)
+    # Skewed per-worker type preferences so each worker has a clear mode
+    prefs = [rng.sample(TYPES, len(TYPES)) for _ in range(WORKERS)]
+
+    def rows():
+        for _ in range(ROWS):
+            w = rng.randrange(WORKERS)
+            vtype = prefs[w][min(int(rng.expovariate(1.0)), len(TYPES) - 1)]
+            ts = start + timedelta(seconds=rng.randrange(365 * 86400))
+            yield (str(w + 1), vtype, rng.choice((1, 2, 3)), ts.strftime("%Y-%m-%d %H:%M:%S"))
+
+    conn.executemany(
+        "INSERT INTO violations (worker_id, violation_type, severity_grade, timestamp) VALUES (?, ?, ?, ?)",
+        rows()
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+# ---------- the endpoints as they were, kept as the reference ----------
+def worker_intelligence_n1():
+    conn = database.get_connection()
+    rows = conn.execute("""
+    SELECT worker_id, COUNT(*) as total, MAX(timestamp) as latest
+    FROM violations GROUP BY worker_id ORDER BY total DESC
+    """).fetchall()
+
+    result = []
+    for r in rows:
+        common = conn.execute("""
+        SELECT violation_type FROM violations WHERE worker_id = ?
+        GROUP BY violation_type ORDER BY COUNT(*) DESC LIMIT 1
+        """, (r["worker_id"],)).fetchone()
+        result.append({
+            "id": r["worker_id"],
+            "violations": r["total"],
+            "most_common": common[0] if common else "-",
+        })
+    conn.close()
+    return result
+
+
+def get_workers_n1():
+    conn = database.get_connection()
+    rows = conn.execute("""
+        SELECT w.id, COUNT(v.id) as violation_count, MAX(v.timestamp) as last_seen
+        FROM workers w LEFT JOIN violations v ON w.id = v.worker_id
+        GROUP BY w.id ORDER BY violation_count DESC
+    """).fetchall()
+
+    result = []
+    for r in rows:
+        most_common = conn.execute(
+            "SELECT violation_type, COUNT(*) as cnt FROM violations WHERE worker_id = ? GROUP BY violation_type ORDER BY cnt DESC LIMIT 1",
+            (r["id"],)
+        ).fetchone()
+        result.append({
+            "id": r["id"],
+            "violation_count": r["violation_count"],
+            "most_common_violation": most_common["violation_type"] if most_common else None,
+            "last_seen": r["last_seen"],
+        })
+    conn.close()
+    return result
+
+
+def type_counts():
+    conn = database.get_connection()
+    counts = defaultdict(Counter)
+    for r in conn.execute("SELECT worker_id, violation_type, COUNT(*) FROM violations GROUP BY 1, 2"):
+        counts[str(r[0])][r[1]] = r[2]
+    conn.close()
+    return counts
+
+
+def check_mode(counts, worker_id, chosen):
+    # Ties may resolve differently; the chosen type only has to be a mode
+    c = counts[str(worker_id)]
+    assert c[chosen] == max(c.values()), f"worker {worker_id}: {chosen} is not the most common"
+
+
+def timed(fn):
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+
+        start = time.perf_counter()
+        seed()
+        print(f"Seeded {WORKERS} workers, {ROWS} violations in {time.perf_counter() - start:.1f}s\n")
+
+        counts = type_counts()
+
+        t_old, old = timed(worker_intelligence_n1)
+        t_new, new = timed(worker_intelligence)
+        assert {(r["id"], r["violations"]) for r in old} == {(r["id"], r["violations"]) for r in new}
+        for r in new:
+            check_mode(counts, r["id"], r["most_common"])
+        print(f"app    /api/workers   N+1 {t_old * 1000:8.1f} ms   windowed {t_new * 1000:8.1f} ms   {t_old / t_new:5.1f}x")
+
+        t_old, old = timed(get_workers_n1)
+        t_new, new = timed(get_workers)
+        assert {(r["id"], r["violation_count"], r["last_seen"]) for r in old} == \
+               {(r["id"], r["violation_count"], r["last_seen"]) for r in new}
+        for r in new:
+            check_mode(counts, r["id"], r["most_common_violation"])
+        print(f"backend /api/workers  N+1 {t_old * 1000:8.1f} ms   windowed {t_new * 1000:8.1f} ms   {t_old / t_new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
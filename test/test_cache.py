@@ -0,0 +1,75 @@
+import os
+import sys
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.cache import ResponseCache
+
+
+def make_route(module, calls):
+    """A route function like the dashboard ones; same qualname for every module"""
+    def overview(days: int = 7):
+        calls.append(days)
+        return {"module": module, "days": days, "calls": len(calls)}
+    overview.__module__ = module
+    return overview
+
+
+def make_client(cache, *modules):
+    """One app mounting a router per module, all serving /overview from `cache`"""
+    app = FastAPI()
+    calls = {}
+    for i, module in enumerate(modules):
+        calls[module] = []
+        router = APIRouter()
+        router.get("/overview")(cache.cached()(make_route(module, calls[module])))
+        app.include_router(router, prefix=f"/r{i}")
+    return TestClient(app), calls
+
+
+def test_routes_with_the_same_name_and_path_do_not_share_entries():
+    # app/api/dashboard.py and backend/routes/dashboard.py define the same
+    # functions for the same paths and share the global cache
+    cache = ResponseCache(ttl=60)
+    app_client, _ = make_client(cache, "app.api.dashboard")
+    backend_client, _ = make_client(cache, "backend.routes.dashboard")
+
+    assert app_client.get("/r0/overview").json()["module"] == "app.api.dashboard"
+    assert backend_client.get("/r0/overview").json()["module"] == "backend.routes.dashboard"
+    assert app_client.get("/r0/overview").json()["module"] == "app.api.dashboard"
+    assert len(cache.entries) == 2
+
+
+def test_hits_query_params_and_etag():
+    cache = ResponseCache(ttl=60)
+    client, calls = make_client(cache, "dashboard")
+
+    first = client.get("/r0/overview?days=7")
+    assert client.get("/r0/overview?days=7").json() == first.json()
+    assert calls["dashboard"] == [7]
+    client.get("/r0/overview?days=30")
+    assert calls["dashboard"] == [7, 30]
+
+    etag = first.headers["etag"]
+    not_modified = client.get("/r0/overview?days=7", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert cache.stats()["hits"] == 2 and cache.stats()["not_modified"] == 1
+
+
+def test_invalidation_and_version_change():
+    version = [1]
+    cache = ResponseCache(ttl=60, version=lambda: version[0])
+    client, calls = make_client(cache, "dashboard")
+
+    client.get("/r0/overview")
+    cache.invalidate()
+    client.get("/r0/overview")
+    assert len(calls["dashboard"]) == 2
+
+    # Another process wrote to the database
+    version[0] = 2
+    assert client.get("/r0/overview").json()["calls"] == 3
+    assert client.get("/r0/overview").json()["calls"] == 3
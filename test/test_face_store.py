@@ -0,0 +1,94 @@
+import os
+import sys
+import glob
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.face_recognition.store import EmbeddingStore
+from app.services.face_recognition.gallery import FaceGallery
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore(str(tmp_path / "embeddings"))
+
+
+def vectors(n, dim=8, seed=0):
+    v = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def test_append_and_load_round_trip(store):
+    v = vectors(5)
+    assert store.append(["a", "a", "b", "c", "c"], v[:5], {"a/0.jpg": {"worker": "a", "rows": [0]}}) == [0, 1, 2, 3, 4]
+    assert store.append("d", v[:2] * 3) == [5, 6]
+
+    snapshot = store.load()
+    assert len(snapshot) == 7 and snapshot.dim == 8
+    assert snapshot.worker_ids() == ["a", "b", "c", "d"]
+    assert isinstance(snapshot.vectors, np.memmap)
+    # Stored normalized
+    assert np.allclose(snapshot.vectors[:5], v) and np.allclose(snapshot.vectors[5:], v[:2], atol=1e-6)
+    assert snapshot.sources["a/0.jpg"]["rows"] == [0]
+
+
+def test_removed_rows_stay_mapped_and_are_not_matched(store):
+    v = vectors(20)
+    store.append([f"w{i}" for i in range(20)], v)
+    store.remove_rows([3, 7])
+
+    snapshot = store.load()
+    assert len(snapshot) == 18 and snapshot.removed == {3, 7}
+    assert isinstance(snapshot.vectors, np.memmap)
+    assert "w3" not in snapshot.worker_ids() and "w3" not in snapshot.workers()
+
+    gallery = FaceGallery.from_snapshot(snapshot)
+    assert len(gallery) == 18
+    assert gallery.match(v[3])[0] != "w3"
+    assert gallery.match(v[5]) == ("w5", pytest.approx(1.0, abs=1e-5))
+
+
+def test_compact_renumbers_source_rows(store):
+    v = vectors(4)
+    store.append(["a", "b", "c", "d"], v, {
+        f"{w}/0.jpg": {"worker": w, "rows": [i]} for i, w in enumerate("abcd")
+    })
+    # Half the rows tombstoned: remove_rows compacts on its own
+    store.remove_rows([0, 2], ["a/0.jpg", "c/0.jpg"])
+
+    snapshot = store.load()
+    assert snapshot.labels == ["b", "d"] and not snapshot.removed
+    assert snapshot.sources == {"b/0.jpg": {"worker": "b", "rows": [0]}, "d/0.jpg": {"worker": "d", "rows": [1]}}
+    assert np.allclose(snapshot.vectors, v[[1, 3]])
+    # Only the new generation's data file is left
+    assert len(glob.glob(f"{store.base}-*.f32")) == 1
+
+
+def test_refresh_only_after_a_change(store):
+    store.append("a", vectors(1))
+    store.load()
+    assert store.refresh() is None
+
+    store.append("b", vectors(1, seed=1))
+    snapshot = store.refresh()
+    assert snapshot is not None and snapshot.worker_ids() == ["a", "b"]
+    assert store.refresh() is None
+
+
+def test_failed_load_is_retried(store):
+    store.append("a", vectors(1))
+    store.load()
+
+    # Rewrite, then lose the data file (as when racing a compaction)
+    store.write(["b"], vectors(1, seed=1))
+    for path in glob.glob(f"{store.base}-*.f32"):
+        os.remove(path)
+    with pytest.raises(OSError):
+        store.refresh()
+    assert store.changed()
+
+    store.write(["c"], vectors(1, seed=2))
+    assert store.refresh().worker_ids() == ["c"]
@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.tiling import merge_detections, frame_tiles
+
+REGIONS = [(0, 0, 640, 640), (512, 0, 1152, 640)]
+FRAME = (640, 1152)
+
+
+def det(cls, bbox, confidence=0.9):
+    return {"class": cls, "bbox": bbox, "confidence": confidence}
+
+
+def test_merge_joins_a_worker_cut_by_a_tile_edge():
+    detections = [
+        det("Person", (480, 100, 640, 400), 0.8),   # cut by the right edge of tile 0
+        det("Person", (512, 100, 700, 400), 0.7),   # cut by the left edge of tile 1
+    ]
+    merged = merge_detections(detections, [0, 1], REGIONS, FRAME)
+    assert [d["bbox"] for d in merged] == [(480, 100, 700, 400)]
+    assert merged[0]["confidence"] == 0.8
+
+
+def test_merge_keeps_classes_and_same_tile_boxes_apart():
+    detections = [
+        det("Person", (100, 100, 200, 400), 0.9),
+        det("Person", (110, 100, 210, 400), 0.8),
+        det("NO-Hardhat", (100, 100, 200, 400), 0.7),
+    ]
+    assert merge_detections(detections, [0, 0, 0], REGIONS, FRAME) == detections
+
+
+def test_frame_tiles_cover_the_frame():
+    tiles = frame_tiles((2160, 3840), overlap=0.2, full_frame=True)
+    assert tiles[-1] == (0, 0, 3840, 2160)
+    grid = tiles[:-1]
+    assert min(t[0] for t in grid) == 0 and max(t[2] for t in grid) == 3840
+    assert min(t[1] for t in grid) == 0 and max(t[3] for t in grid) == 2160
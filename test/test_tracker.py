@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.tracker import ByteTracker, TRACK_BUFFER
+
+
+def det(cls, bbox, confidence=0.9):
+    return {"class": cls, "bbox": bbox, "confidence": confidence}
+
+
+def test_tracker_keeps_ids_and_ends_tracks():
+    tracker = ByteTracker()
+    first = det("Person", (100, 100, 150, 250))
+    tracker.update([first, det("Person", (400, 100, 450, 250))], now=0.0)
+
+    # Moved a little, and seen only weakly: still the same track
+    moved = det("Person", (105, 100, 155, 250), confidence=0.3)
+    seen = tracker.update([moved, det("Person", (402, 100, 452, 250))], now=0.1)
+    assert moved["track_id"] == first["track_id"] and len(seen) == 2
+    assert tracker.get(first["track_id"]).confirmed
+
+    # A confirmed track survives a gap shorter than the buffer, then ends
+    assert tracker.update([], now=0.1 + TRACK_BUFFER / 2) == []
+    assert tracker.get(first["track_id"]) is not None
+    tracker.update([], now=0.2 + TRACK_BUFFER)
+    assert tracker.get(first["track_id"]) is None
+
+
+def test_tracker_starts_weak_tracks_only_for_violations():
+    tracker = ByteTracker()
+    weak_person = det("Person", (0, 0, 50, 150), confidence=0.3)
+    weak_hat = det("NO-Hardhat", (10, 0, 40, 20), confidence=0.3)
+    tracker.update([weak_person, weak_hat], now=0.0)
+    assert "track_id" not in weak_person and "track_id" in weak_hat
+    # Unconfirmed tracks end on the first missed frame
+    tracker.update([], now=0.1)
+    assert tracker.get(weak_hat["track_id"]) is None
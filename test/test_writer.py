@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend import database
+from backend.writer import ViolationWriter
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the pool at a fresh database for the test"""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    yield database.DB_PATH
+    database.get_pool().close()
+
+
+def rows(n, worker="W1"):
+    return [(worker, "NO-Hardhat", 2, "zone", 0, f"2026-01-01 08:00:{i:02d}") for i in range(n)]
+
+
+def count_violations():
+    with database.read_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM violations").fetchone()[0]
+
+
+def test_rows_are_written_in_batches(temp_db):
+    writer = ViolationWriter(batch_size=3, flush_interval=0.05)
+    batches = []
+    writer.add_listener(lambda batch: batches.append(len(batch)))
+
+    writer.put(rows(7))
+    writer.flush()
+
+    assert count_violations() == 7
+    assert sum(batches) == 7 and max(batches) <= 3
+    stats = writer.stats()
+    assert stats["written"] == 7 and stats["batches"] == len(batches) and stats["errors"] == 0
+    writer.close()
+
+
+def test_close_flushes_and_put_restarts(temp_db):
+    writer = ViolationWriter(flush_interval=10)
+    writer.put(rows(2))
+    # close() must not wait out the flush interval or lose the queued rows
+    writer.close()
+    assert writer.thread is None
+    assert count_violations() == 2
+
+    writer.flush_interval = 0.05
+    writer.put(rows(3, "W2"))
+    writer.flush()
+    assert count_violations() == 5
+    writer.close()
+
+
+def test_full_queue_drops_instead_of_blocking(temp_db):
+    writer = ViolationWriter(max_queue=1, flush_interval=0.01)
+    writer.put(rows(50))
+    writer.flush()
+
+    stats = writer.stats()
+    assert stats["written"] + stats["dropped"] == 50
+    assert count_violations() == stats["written"]
+    writer.close()